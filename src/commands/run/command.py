@@ -11,6 +11,19 @@ class RunCommand(Command):
             action="store_true",
             help="Muestra información sobre el comando 'run'.",
         )
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help=(
+                "En las empresas con 'incremental: true' omite los asientos sin CFDI "
+                "por asociar en su ventana de fechas (requiere una corrida exitosa previa)."
+            ),
+        )
+        parser.add_argument(
+            "--recalibrar",
+            action="store_true",
+            help="Descarta la escala de pantalla calibrada y la vuelve a detectar.",
+        )
 
     def execute(self, args):
         if args.info:
@@ -21,13 +34,25 @@ class RunCommand(Command):
             print("\nUso:")
             print("    python contabot.py run")
             print("\nOpciones:")
-            print("    --info      Muestra esta ayuda.")
+            print("    --info          Muestra esta ayuda.")
+            print(
+                "    --incremental   Omite los asientos sin CFDI por asociar en las empresas"
+            )
+            print("                    con 'incremental: true' en su configuración.")
+            print(
+                "    --recalibrar    Descarta la escala de pantalla calibrada y la vuelve"
+            )
+            print("                    a detectar durante la corrida.")
             print("\nDescripción:")
             print(
                 "    Al ejecutar este comando, el bot realizará las acciones necesarias"
             )
             print("    para procesar los asientos de la empresa configurada.")
-            print("    No se requieren argumentos adicionales.")
+            print("    Con --incremental, antes de abrir el contabilizador se cuentan en la")
+            print("    base de datos los CFDI sin asociar de la ventana de fechas de cada")
+            print("    asiento. Solo aplica a empresas con una corrida exitosa previa y cuyo")
+            print("    esquema del ADD se pudo verificar; los asientos omitidos se listan")
+            print("    al final de la corrida.")
             return
 
         print("Ejecutando RunCommand.execute()")
@@ -36,7 +61,9 @@ class RunCommand(Command):
         contabot = Contabot(app_path)
 
         try:
-            contabot.ejecutar_robot()
+            contabot.ejecutar_robot(
+                incremental=args.incremental, recalibrar=args.recalibrar
+            )
 
             print("El bot ha sido ejecutado correctamente.")
 
@@ -0,0 +1,202 @@
+import os
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from typing import Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+INICIADO = "iniciado"
+POLIZA_GENERADA = "poliza_generada"
+SIN_POLIZAS = "sin_polizas"
+ERROR_MANEJADO = "error_manejado"
+FALLIDO = "fallido"
+
+TERMINADOS = frozenset({POLIZA_GENERADA, SIN_POLIZAS, ERROR_MANEJADO})
+
+
+class CheckpointJournal:
+    """
+    Bitácora local de avance por empresa y asiento para reanudar una corrida interrumpida.
+
+    Se guarda en SQLite con journal_mode=WAL y synchronous=FULL: cada registro es una
+    transacción confirmada en disco, de modo que un cierre forzado del bot o de
+    CONTPAQi pierde como mucho el asiento en curso, que queda como "iniciado" y se
+    repite al reanudar.
+
+    Las marcas valen dentro de una corrida. Una corrida que no terminó se reanuda si
+    empezó hace menos de max_run_age segundos; en cualquier otro caso se abre una nueva
+    y todo se vuelve a procesar.
+    """
+
+    def __init__(self, path=None, max_run_age=12 * 3600.0, clock=time.time):
+        self.path = path or os.path.join(os.getcwd(), "contabot_checkpoint.db")
+        self.max_run_age = max_run_age
+        self.clock = clock
+        self.run_id = None
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS corridas (
+                run_id TEXT PRIMARY KEY,
+                iniciada REAL NOT NULL,
+                terminada REAL
+            );
+            CREATE TABLE IF NOT EXISTS asientos (
+                run_id TEXT NOT NULL,
+                empresa TEXT NOT NULL,
+                asiento TEXT NOT NULL,
+                estado TEXT NOT NULL,
+                detalle TEXT,
+                actualizado REAL NOT NULL,
+                PRIMARY KEY (run_id, empresa, asiento)
+            );
+            """
+        )
+
+    def begin_run(self) -> str:
+        """
+        Reanuda la última corrida inconclusa o abre una nueva.
+
+        Returns:
+            str: Identificador de la corrida.
+        """
+        now = self.clock()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT run_id, iniciada FROM corridas WHERE terminada IS NULL "
+                "ORDER BY iniciada DESC LIMIT 1"
+            ).fetchone()
+            if row is not None and now - row[1] < self.max_run_age:
+                self.run_id = row[0]
+                terminados = self._conn.execute(
+                    "SELECT COUNT(*) FROM asientos WHERE run_id = ? AND estado IN (?, ?, ?)",
+                    (self.run_id, *sorted(TERMINADOS)),
+                ).fetchone()[0]
+                logger.info(
+                    f"Reanudando la corrida {self.run_id}: {terminados} asientos ya terminados."
+                )
+                return self.run_id
+            self.run_id = uuid.uuid4().hex
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.execute(
+                    "UPDATE corridas SET terminada = ? WHERE terminada IS NULL", (now,)
+                )
+                self._conn.execute(
+                    "INSERT INTO corridas (run_id, iniciada) VALUES (?, ?)", (self.run_id, now)
+                )
+        return self.run_id
+
+    def finish_run(self) -> None:
+        """Marca la corrida actual como terminada; la siguiente empieza desde cero."""
+        if self.run_id is None:
+            return
+        with self._lock:
+            self._conn.execute(
+                "UPDATE corridas SET terminada = ? WHERE run_id = ?", (self.clock(), self.run_id)
+            )
+        self.run_id = None
+
+    def record(self, empresa: str, asiento, estado: str, detalle: Optional[str] = None) -> None:
+        """
+        Registra el estado de un asiento en la corrida actual.
+
+        Args:
+            empresa: Alias de la base de datos de la empresa.
+            asiento: Código del asiento.
+            estado: INICIADO, POLIZA_GENERADA, SIN_POLIZAS, ERROR_MANEJADO o FALLIDO.
+            detalle: Texto libre (por ejemplo, el error).
+        """
+        if self.run_id is None:
+            self.begin_run()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO asientos "
+                "(run_id, empresa, asiento, estado, detalle, actualizado) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (self.run_id, empresa, str(asiento), estado, detalle, self.clock()),
+            )
+
+    def states(self, empresa: str) -> Dict[str, str]:
+        """Estado de cada asiento de una empresa en la corrida actual."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT asiento, estado FROM asientos WHERE run_id = ? AND empresa = ?",
+                (self.run_id, empresa),
+            ).fetchall()
+        return dict(rows)
+
+    def finished(self, empresa: str) -> Set[str]:
+        """Códigos de los asientos de una empresa que ya no hay que repetir."""
+        return {
+            asiento for asiento, estado in self.states(empresa).items() if estado in TERMINADOS
+        }
+
+    def is_finished(self, empresa: str, asiento) -> bool:
+        return str(asiento) in self.finished(empresa)
+
+    def last_success(self, empresa: str) -> Optional[float]:
+        """
+        Última vez que un asiento de la empresa generó pólizas o terminó sin pendientes,
+        en cualquier corrida.
+
+        Returns:
+            float: Marca de tiempo (segundos desde la época), o None si nunca.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(actualizado) FROM asientos WHERE empresa = ? AND estado IN (?, ?)",
+                (empresa, POLIZA_GENERADA, SIN_POLIZAS),
+            ).fetchone()
+        return row[0] if row else None
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+if __name__ == "__main__":
+    import subprocess
+    import sys
+    import tempfile
+
+    # Simula una corrida que muere a la mitad: el proceso hijo registra asientos y
+    # termina con os._exit sin cerrar la conexión ni la corrida.
+    hijo = """
+import os, sys
+sys.path.insert(0, os.path.dirname(sys.argv[2]))
+from checkpoint import CheckpointJournal, INICIADO, POLIZA_GENERADA
+journal = CheckpointJournal(sys.argv[1])
+journal.begin_run()
+for codigo in range(1, 11):
+    journal.record("ctEmpresa", codigo, INICIADO)
+    if codigo == 6:
+        os._exit(9)
+    journal.record("ctEmpresa", codigo, POLIZA_GENERADA)
+"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "checkpoint.db")
+        subprocess.run([sys.executable, "-c", hijo, path, os.path.abspath(__file__)])
+
+        journal = CheckpointJournal(path)
+        run_id = journal.begin_run()
+        terminados = journal.finished("ctEmpresa")
+        assert terminados == {str(codigo) for codigo in range(1, 6)}, terminados
+        assert journal.states("ctEmpresa")["6"] == INICIADO
+        pendientes = [c for c in range(1, 11) if not journal.is_finished("ctEmpresa", c)]
+        assert pendientes == [6, 7, 8, 9, 10], pendientes
+        for codigo in pendientes:
+            journal.record("ctEmpresa", codigo, POLIZA_GENERADA)
+        journal.finish_run()
+
+        assert journal.begin_run() != run_id
+        assert journal.finished("ctEmpresa") == set()
+        assert journal.last_success("ctEmpresa") is not None
+        journal.close()
+        print(f"Reanudación tras cierre forzado: se repitieron {pendientes}. OK")
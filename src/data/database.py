@@ -1,14 +1,18 @@
 import pyodbc
 from contextlib import contextmanager
-from typing import List, Dict, Any, Optional, TypeVar, Generic
-from queue import Queue
+from typing import List, Dict, Any, Callable, Optional, TypeVar, Generic
+from queue import Empty, LifoQueue, Queue
 import logging
+import re
+import threading
+import time
 import os
 import sys
 from dotenv import load_dotenv
 from datetime import datetime, date
 from dataclasses import dataclass
 from abc import abstractmethod
+from src.data.query_cache import QueryCache
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -162,13 +166,67 @@ class ConnectionPool(Generic[T]):
 
 
 class SQLServerConnectionPool(ConnectionPool[pyodbc.Connection]):
-    def __init__(self, pool_size: int = 5, config: Optional[ConnectionConfig] = None):
-        self.config = config or ConnectionConfig()
-        self.pools: Dict[str, Queue[pyodbc.Connection]] = {}
+    """
+    Pool de conexiones por base de datos que crece bajo demanda hasta pool_size.
+
+    Las conexiones se crean solo cuando no hay una libre, se validan al entregarse si
+    estuvieron inactivas más de validate_after segundos, y se cierran si pasan más de
+    idle_ttl segundos sin usarse. Las libres se entregan de la más reciente a la más
+    antigua (LIFO), así las que sobran tras un pico quedan al fondo y envejecen; al
+    devolver una conexión se cierran las inactivas, como mucho cada evict_interval
+    segundos. connect_factory(database) permite sustituir
+    pyodbc.connect (por ejemplo, con conexiones simuladas en pruebas).
+
+    Con shared_server=True un solo pool a nivel de servidor atiende todas las bases de
+    datos: cada conexión se abre contra server_database y cambia de contexto con USE
+    solo cuando se entrega para una base distinta a la última que usó. Así el total de
+    conexiones queda acotado por pool_size aunque la corrida recorra decenas de empresas.
+    """
+
+    SERVER_KEY = "__server__"
+    _DATABASE_NAME = re.compile(r"^[A-Za-z0-9_\-]+$")
+
+    def __init__(
+        self,
+        pool_size: int = 5,
+        config: Optional[ConnectionConfig] = None,
+        connect_factory: Optional[Callable[[str], Any]] = None,
+        idle_ttl: float = 300.0,
+        validate_after: float = 30.0,
+        checkout_timeout: float = 5.0,
+        evict_interval: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+        shared_server: bool = False,
+        server_database: str = "master",
+    ):
+        self.connect_factory = connect_factory
+        self.shared_server = shared_server
+        self.server_database = server_database
+        self._current_database: Dict[int, str] = {}
+        self.config = config or (ConnectionConfig() if connect_factory is None else None)
+        self.pools: Dict[str, Queue] = {}
         self.size = pool_size
+        self.idle_ttl = idle_ttl
+        self.validate_after = validate_after
+        self.checkout_timeout = checkout_timeout
+        self.evict_interval = evict_interval
+        self.clock = clock
+        self._next_eviction = clock() + evict_interval
+        self._open: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            "created": 0,
+            "reused": 0,
+            "waits": 0,
+            "evicted_idle": 0,
+            "evicted_broken": 0,
+            "switches": 0,
+        }
 
     def _create_connection(self, database: str) -> pyodbc.Connection:
         """Crea la conexión a la base de datos."""
+        if self.connect_factory is not None:
+            return self.connect_factory(database)
         try:
             connection_string = self.config.get_connection_string(database)
             return pyodbc.connect(connection_string)
@@ -176,49 +234,214 @@ class SQLServerConnectionPool(ConnectionPool[pyodbc.Connection]):
             logger.error(f"Error creating connection to database {database}: {e}")
             raise DatabaseError(f"Could not create connection: {e}")
 
-    def get_connection(self, database: str) -> pyodbc.Connection:
-        if database not in self.pools:
-            self.pools[database] = Queue(maxsize=self.size)
-            for _ in range(self.size):
-                self.pools[database].put(self._create_connection(database))
-            logger.debug(f"Created new connection pool for database {database}")
+    @staticmethod
+    def _is_alive(connection) -> bool:
+        try:
+            cursor = connection.cursor()
+            try:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            finally:
+                cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _count(self, key: str, amount: int = 1) -> None:
+        with self._lock:
+            self.stats[key] += amount
 
+    def _pool_key(self, database: str) -> str:
+        return self.SERVER_KEY if self.shared_server else database
+
+    def _use_database(self, database: str, connection) -> None:
+        """Cambia el contexto de una conexión compartida a la base solicitada."""
+        if self._current_database.get(id(connection)) == database:
+            return
+        if not self._DATABASE_NAME.match(database):
+            raise DatabaseError(f"Invalid database name: {database}")
+        cursor = connection.cursor()
+        try:
+            cursor.execute(f"USE [{database}]")
+        finally:
+            cursor.close()
+        self._current_database[id(connection)] = database
+        self._count("switches")
+
+    def _discard(self, database: str, connection, reason: Optional[str] = None) -> None:
+        """Cierra una conexión y libera su lugar en el pool."""
+        self._current_database.pop(id(connection), None)
+        with self._lock:
+            self._open[database] = max(0, self._open.get(database, 0) - 1)
+            if reason is not None:
+                self.stats[reason] += 1
         try:
-            return self.pools[database].get(timeout=5)
+            connection.close()
         except Exception as e:
-            logger.error(
-                f"Error getting connection from pool for database {database}: {e}"
-            )
-            raise DatabaseError(f"Could not get connection from pool: {e}")
+            logger.debug(f"Error closing connection to database {database}: {e}")
+
+    def _checkout(self, database: str, connection, last_used: float):
+        """Valida una conexión tomada del pool; devuelve None si se descartó."""
+        idle = self.clock() - last_used
+        if idle > self.idle_ttl:
+            self._discard(database, connection, "evicted_idle")
+            return None
+        if idle > self.validate_after and not self._is_alive(connection):
+            logger.warning(f"Discarding broken connection to database {database}")
+            self._discard(database, connection, "evicted_broken")
+            return None
+        self._count("reused")
+        return connection
+
+    def _reserve(self, database: str) -> bool:
+        with self._lock:
+            if database not in self.pools:
+                self.pools[database] = LifoQueue(maxsize=self.size)
+                self._open[database] = 0
+                logger.debug(f"Created new connection pool for database {database}")
+            if self._open[database] < self.size:
+                self._open[database] += 1
+                return True
+            return False
+
+    def get_connection(self, database: str) -> pyodbc.Connection:
+        key = self._pool_key(database)
+        connection = self._acquire(key)
+        if self.shared_server:
+            try:
+                self._use_database(database, connection)
+            except Exception as e:
+                self.return_connection(database, connection, validate=True)
+                logger.error(f"Error switching connection to database {database}: {e}")
+                raise DatabaseError(f"Could not switch to database {database}: {e}")
+        return connection
+
+    def _acquire(self, database: str) -> pyodbc.Connection:
+        deadline = self.clock() + self.checkout_timeout
+        while True:
+            pool = self.pools.get(database)
+            if pool is not None:
+                try:
+                    connection, last_used = pool.get_nowait()
+                except Empty:
+                    pass
+                else:
+                    connection = self._checkout(database, connection, last_used)
+                    if connection is not None:
+                        return connection
+                    continue
 
-    def return_connection(self, database: str, connection: pyodbc.Connection) -> None:
+            if self._reserve(database):
+                target = self.server_database if database == self.SERVER_KEY else database
+                try:
+                    connection = self._create_connection(target)
+                except Exception:
+                    with self._lock:
+                        self._open[database] -= 1
+                    raise
+                self._count("created")
+                return connection
+
+            remaining = deadline - self.clock()
+            if remaining <= 0:
+                logger.error(
+                    f"Error getting connection from pool for database {database}: timeout"
+                )
+                raise DatabaseError("Could not get connection from pool: timeout")
+            self._count("waits")
+            try:
+                connection, last_used = self.pools[database].get(timeout=remaining)
+            except Empty:
+                continue
+            connection = self._checkout(database, connection, last_used)
+            if connection is not None:
+                return connection
+
+    def return_connection(
+        self, database: str, connection: pyodbc.Connection, validate: bool = False
+    ) -> None:
+        database = self._pool_key(database)
+        if validate and not self._is_alive(connection):
+            logger.warning(f"Discarding broken connection to database {database}")
+            self._discard(database, connection, "evicted_broken")
+            return
         try:
-            self.pools[database].put(connection, timeout=5)
+            self.pools[database].put_nowait((connection, self.clock()))
         except Exception as e:
             logger.warning(
                 f"Could not return connection to pool for database {database}: {e}"
             )
-            connection.close()
+            self._discard(database, connection)
+        self._maybe_evict_idle()
+
+    def _maybe_evict_idle(self) -> None:
+        with self._lock:
+            now = self.clock()
+            if now < self._next_eviction:
+                return
+            self._next_eviction = now + self.evict_interval
+        evicted = self.evict_idle()
+        if evicted:
+            logger.debug(f"Closed {evicted} idle connections")
+
+    def evict_idle(self) -> int:
+        """
+        Cierra las conexiones libres que superaron idle_ttl.
+
+        Returns:
+            int: Número de conexiones cerradas.
+        """
+        evicted = 0
+        now = self.clock()
+        for database, pool in list(self.pools.items()):
+            keep = []
+            while True:
+                try:
+                    connection, last_used = pool.get_nowait()
+                except Empty:
+                    break
+                if now - last_used > self.idle_ttl:
+                    self._discard(database, connection, "evicted_idle")
+                    evicted += 1
+                else:
+                    keep.append((connection, last_used))
+            for item in reversed(keep):
+                pool.put_nowait(item)
+        return evicted
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Contadores del pool y conexiones abiertas por base de datos."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["open"] = dict(self._open)
+        stats["idle"] = {database: pool.qsize() for database, pool in self.pools.items()}
+        return stats
 
     def close(self) -> None:
         """Cierra todas las conexiones en el pool"""
         for database, pool in self.pools.items():
-            while not pool.empty():
-                conn = pool.get()
-                conn.close()
+            while True:
+                try:
+                    conn, _ = pool.get_nowait()
+                except Empty:
+                    break
+                self._discard(database, conn)
+        logger.debug(f"Connection pool stats: {self.get_stats()}")
 
     @contextmanager
     def connection(self, database: str):
         conn = None
+        failed = False
         try:
             conn = self.get_connection(database)
             yield conn
         except Exception as e:
+            failed = True
             logger.error(f"Error during connection usage: {e}")
             raise
         finally:
             if conn:
-                self.return_connection(database, conn)
+                self.return_connection(database, conn, validate=failed)
 
 
 class QueryRepository:
@@ -263,9 +486,20 @@ class QueryRepository:
 
 
 class DataAccessLayer:
-    def __init__(self, connection_pool: SQLServerConnectionPool):
+    QUERY_TTLS = {"cuenta_empresa": 600.0, "guid_dsl": 3600.0, "esquema_add": 3600.0}
+
+    def __init__(
+        self,
+        connection_pool: SQLServerConnectionPool,
+        period_revalidate_after: float = 300.0,
+        query_cache: Optional[QueryCache] = None,
+    ):
         self.connection_pool = connection_pool
         self.logger = logging.getLogger(__name__)
+        self.query_cache = query_cache or QueryCache(ttls=self.QUERY_TTLS)
+        self.period_revalidate_after = period_revalidate_after
+        self._periodos: Dict[str, Dict[str, Any]] = {}
+        self._periodos_lock = threading.Lock()
 
     def get_connection(self):
         return self.connection_pool.get_connection()
@@ -296,6 +530,12 @@ class DataAccessLayer:
             self.logger.error(f"Error executing scalar query in {database}: {e}")
             raise DatabaseError(f"Scalar query execution failed: {e}")
 
+    def invalidate_cache(
+        self, database: Optional[str] = None, query_name: Optional[str] = None
+    ) -> int:
+        """Descarta resultados guardados en la caché de consultas."""
+        return self.query_cache.invalidate(database, query_name)
+
     def get_estruct_cta(self, database: str, param_id: int) -> Optional[str]:
         """Obtiene la estructura de la cuenta a partir de un ID específico"""
         query = QueryRepository.get_query("get_estruct_cta")
@@ -352,9 +592,9 @@ class DataAccessLayer:
         """
         return self.execute_query("GeneralesSQL", query, (user_codigo,))
 
-    def get_asientos(self, database: str) -> List[Dict[str, Any]]:
-        """Obtiene los asientos que contienen el token 'LUZZI' y el TipoXML."""
-        query = f"""        
+    @staticmethod
+    def _asientos_sql(database: str) -> str:
+        return f"""
         SELECT *
         FROM (
             SELECT 
@@ -383,33 +623,18 @@ class DataAccessLayer:
         WHERE t.ValFormulaCuenta = 'Válido'
         AND t.Nombre NOT LIKE '%Cobro%'
         AND t.Nombre NOT LIKE '%Pago%'
-        ORDER BY t.Codigo;
         """
-        return self.execute_query(database, query)
 
-    def get_cuenta_for_empresa(self, alias_database: str, tipo_cuenta: str) -> list:
-        """
-        Obtiene y valida la cuenta contable según el tipo y la empresa.
-
-        Args:
-            alias_database (str): Nombre de la base de datos de la empresa
-            tipo_cuenta (str): Tipo de cuenta ('cliente' o 'proveedor')
-
-        Returns:
-            list: Lista con diccionario conteniendo el código y estado de la cuenta
-        """
-        codigos_agrupador = {"cliente": "105.01", "proveedor": "201.01"}
+    def get_asientos(self, database: str) -> List[Dict[str, Any]]:
+        """Obtiene los asientos que contienen el token 'LUZZI' y el TipoXML."""
+        query = f"{self._asientos_sql(database)}ORDER BY t.Codigo;"
+        return self.execute_query(database, query)
 
-        if tipo_cuenta not in codigos_agrupador:
-            return [
-                {
-                    "codigo": None,
-                    "estado": "Inválido",
-                    "mensaje": f"Tipo de cuenta no válido: {tipo_cuenta}",
-                }
-            ]
+    CODIGOS_AGRUPADOR = {"cliente": "105.01", "proveedor": "201.01"}
 
-        query = f"""
+    @staticmethod
+    def _cuenta_sql(alias_database: str) -> str:
+        return f"""
             SELECT TOP 1
                 c.Codigo,
                 p.EstructCta,
@@ -421,7 +646,7 @@ class DataAccessLayer:
                     ELSE 'Inválido'
                 END AS Estatus
             FROM {alias_database}.dbo.Cuentas c
-            LEFT JOIN AgrupadoresSAT a 
+            LEFT JOIN {alias_database}.dbo.AgrupadoresSAT a 
                 ON c.IdAgrupadorSAT = a.Id 
             INNER JOIN {alias_database}.dbo.Parametros p 
                 ON p.IdEmpresa = p.IdEmpresa  
@@ -445,47 +670,72 @@ class DataAccessLayer:
                 a.Codigo = ?
                 AND c.Afectable = 0 
                 AND c.EsBaja = 0
-            ORDER BY c.Codigo;
+            ORDER BY c.Codigo
         """
 
-        try:
-            result = self.execute_query(
-                alias_database, query, (codigos_agrupador[tipo_cuenta],)
-            )
-
-            if not result:
-                return [
-                    {
-                        "codigo": None,
-                        "estado": "Inválido",
-                        "mensaje": f"No se encontró cuenta para {tipo_cuenta}",
-                    }
-                ]
-
-            cuenta = result[0]
-
+    @staticmethod
+    def _cuenta_result(tipo_cuenta: str, result: List[Dict[str, Any]]) -> list:
+        """Convierte el resultado de la consulta de cuenta al formato de get_cuenta_for_empresa."""
+        if not result:
             return [
                 {
-                    "codigo": cuenta["Codigo"],
-                    "estado": cuenta["Estatus"],
-                    "mensaje": f"La cuenta {cuenta['Codigo']} {'tiene' if cuenta['Estatus'] == 'Válido' else 'no tiene'} el formato correcto en su último segmento",
+                    "codigo": None,
+                    "estado": "Inválido",
+                    "mensaje": f"No se encontró cuenta para {tipo_cuenta}",
                 }
             ]
 
-        except Exception as e:
-            return [{"codigo": None, "estado": "Inválido", "mensaje": str(e)}]
+        cuenta = result[0]
 
-    def validar_parametros(self, alias_database: str) -> List[Dict[str, Any]]:
+        return [
+            {
+                "codigo": cuenta["Codigo"],
+                "estado": cuenta["Estatus"],
+                "mensaje": f"La cuenta {cuenta['Codigo']} {'tiene' if cuenta['Estatus'] == 'Válido' else 'no tiene'} el formato correcto en su último segmento",
+            }
+        ]
+
+    def get_cuenta_for_empresa(self, alias_database: str, tipo_cuenta: str) -> list:
         """
-        Valida los parámetros de funcionamiento para una base de datos específica.
+        Obtiene y valida la cuenta contable según el tipo y la empresa.
 
         Args:
-            alias_database (str): Alias de la base de datos a validar
+            alias_database (str): Nombre de la base de datos de la empresa
+            tipo_cuenta (str): Tipo de cuenta ('cliente' o 'proveedor')
 
         Returns:
-            List[Dict[str, Any]]: Lista de resultados de validación
+            list: Lista con diccionario conteniendo el código y estado de la cuenta
         """
-        query = f"""
+        codigos_agrupador = self.CODIGOS_AGRUPADOR
+
+        if tipo_cuenta not in codigos_agrupador:
+            return [
+                {
+                    "codigo": None,
+                    "estado": "Inválido",
+                    "mensaje": f"Tipo de cuenta no válido: {tipo_cuenta}",
+                }
+            ]
+
+        query = f"{self._cuenta_sql(alias_database)};"
+
+        try:
+            params = (codigos_agrupador[tipo_cuenta],)
+            result = self.query_cache.get_or_load(
+                "cuenta_empresa",
+                alias_database,
+                params,
+                lambda: self.execute_query(alias_database, query, params),
+            )
+
+            return self._cuenta_result(tipo_cuenta, result)
+
+        except Exception as e:
+            return [{"codigo": None, "estado": "Inválido", "mensaje": str(e)}]
+
+    @staticmethod
+    def _parametros_sql(alias_database: str) -> str:
+        return f"""
         SELECT 
             Id,
             ParFunc,
@@ -498,8 +748,20 @@ class DataAccessLayer:
                 THEN 'Válido'
                 ELSE 'Inválido'
             END AS estado
-        FROM {alias_database}.[dbo].[Parametros];
+        FROM {alias_database}.[dbo].[Parametros]
+        """
+
+    def validar_parametros(self, alias_database: str) -> List[Dict[str, Any]]:
         """
+        Valida los parámetros de funcionamiento para una base de datos específica.
+
+        Args:
+            alias_database (str): Alias de la base de datos a validar
+
+        Returns:
+            List[Dict[str, Any]]: Lista de resultados de validación
+        """
+        query = f"{self._parametros_sql(alias_database)};"
 
         try:
             # Execute the query and return the results
@@ -508,9 +770,185 @@ class DataAccessLayer:
             self.logger.error(f"Error validando parámetros en {alias_database}: {e}")
             raise DatabaseError(f"Validation failed: {e}")
 
-    def get_fechas_for_empresa(self, alias_database: str) -> tuple:
+    _ALIAS_BDD = re.compile(r"^[A-Za-z0-9_]+$")
+
+    def _preflight_branches(self, alias_database: str) -> tuple:
+        """
+        Subconsultas de validación de una empresa, con columnas comunes para UNION ALL.
+
+        Todas las columnas de texto de todas las ramas llevan COLLATE DATABASE_DEFAULT,
+        porque cada base de empresa puede tener una intercalación distinta.
+        """
+        alias = f"N'{alias_database}' COLLATE DATABASE_DEFAULT"
+        branches = [
+            f"""
+        SELECT {alias} AS Alias, N'parametros' COLLATE DATABASE_DEFAULT AS Tipo,
+            CAST(p.Id AS NVARCHAR(100)) COLLATE DATABASE_DEFAULT AS Codigo,
+            CAST(NULL AS NVARCHAR(255)) COLLATE DATABASE_DEFAULT AS Nombre,
+            CAST(NULL AS INT) AS TipoXML,
+            CAST(p.estado AS NVARCHAR(20)) COLLATE DATABASE_DEFAULT AS Estado
+        FROM ({self._parametros_sql(alias_database)}) AS p"""
+        ]
+        params = []
+        for tipo_cuenta, codigo_agrupador in self.CODIGOS_AGRUPADOR.items():
+            branches.append(
+                f"""
+        SELECT {alias}, N'cuenta_{tipo_cuenta}' COLLATE DATABASE_DEFAULT,
+            CAST(c.Codigo AS NVARCHAR(100)) COLLATE DATABASE_DEFAULT,
+            CAST(NULL AS NVARCHAR(255)) COLLATE DATABASE_DEFAULT,
+            NULL,
+            CAST(c.Estatus AS NVARCHAR(20)) COLLATE DATABASE_DEFAULT
+        FROM ({self._cuenta_sql(alias_database)}) AS c"""
+            )
+            params.append(codigo_agrupador)
+        branches.append(
+            f"""
+        SELECT {alias}, N'asiento' COLLATE DATABASE_DEFAULT,
+            CAST(x.Codigo AS NVARCHAR(100)) COLLATE DATABASE_DEFAULT,
+            CAST(x.Nombre AS NVARCHAR(255)) COLLATE DATABASE_DEFAULT,
+            x.TipoXML,
+            CAST(x.ValFormulaCuenta AS NVARCHAR(20)) COLLATE DATABASE_DEFAULT
+        FROM ({self._asientos_sql(alias_database)}) AS x"""
+        )
+        return branches, params
+
+    @staticmethod
+    def _orden_asientos(asientos: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Ordena los asientos por código numérico ("2" antes que "10"); los códigos que no
+        son números van al final, en orden de texto.
+        """
+
+        def llave(asiento):
+            codigo = str(asiento["Codigo"]).strip()
+            return (0, int(codigo), "") if codigo.isdigit() else (1, 0, codigo)
+
+        return sorted(asientos, key=llave)
+
+    def preflight_empresa(self, alias_database: str) -> Dict[str, Any]:
+        """Validación de una sola empresa con las consultas individuales."""
+        try:
+            return {
+                "parametros": self.validar_parametros(alias_database),
+                "cuenta_cliente": self.get_cuenta_for_empresa(alias_database, "cliente"),
+                "cuenta_proveedor": self.get_cuenta_for_empresa(
+                    alias_database, "proveedor"
+                ),
+                "asientos": self._orden_asientos(self.get_asientos(alias_database)),
+            }
+        except Exception as e:
+            self.logger.error(f"Error en la validación previa de {alias_database}: {e}")
+            return {"error": str(e)}
+
+    def get_preflight_for_empresas(
+        self, aliases: List[str], fallback: Optional[Callable] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Valida parámetros y cuentas, y obtiene los asientos de varias empresas en una sola consulta.
+
+        Se arma un UNION ALL con las subconsultas de cada empresa y se ejecuta contra
+        GeneralesSQL. Si la consulta conjunta falla (por ejemplo, una base fuera de línea),
+        cada empresa se valida por separado.
+
+        Args:
+            aliases (List[str]): Alias de las bases de datos de las empresas
+            fallback (Callable): Función (lista de alias) -> resultados para la validación
+                por separado (por defecto, una empresa tras otra)
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Por alias, las llaves "parametros", "cuenta_cliente",
+            "cuenta_proveedor" y "asientos" con el mismo formato que validar_parametros,
+            get_cuenta_for_empresa y get_asientos, o "error" si no se pudo validar.
+        """
+        fallback = fallback or (
+            lambda pendientes: {alias: self.preflight_empresa(alias) for alias in pendientes}
+        )
+        resultados: Dict[str, Dict[str, Any]] = {}
+        validos = []
+        for alias in dict.fromkeys(aliases):
+            if self._ALIAS_BDD.match(alias):
+                validos.append(alias)
+            else:
+                resultados[alias] = {"error": f"Alias de base de datos no válido: {alias}"}
+        if not validos:
+            return resultados
+
+        branches, params = [], []
+        for alias in validos:
+            alias_branches, alias_params = self._preflight_branches(alias)
+            branches.extend(alias_branches)
+            params.extend(alias_params)
+        query = "\n        UNION ALL".join(branches) + "\n        ORDER BY Alias, Tipo, Codigo;"
+
+        try:
+            rows = self.execute_query("GeneralesSQL", query, tuple(params))
+        except Exception as e:
+            self.logger.warning(
+                f"La validación conjunta de {len(validos)} empresas falló, "
+                f"se validarán por separado: {e}"
+            )
+            resultados.update(fallback(validos))
+            return resultados
+
+        datos = {
+            alias: {"parametros": [], "cuenta_cliente": [], "cuenta_proveedor": [], "asientos": []}
+            for alias in validos
+        }
+        for row in rows:
+            empresa = datos[row["Alias"]]
+            tipo = row["Tipo"]
+            if tipo == "parametros":
+                empresa["parametros"].append({"Id": row["Codigo"], "estado": row["Estado"]})
+            elif tipo == "asiento":
+                empresa["asientos"].append(
+                    {
+                        "Codigo": row["Codigo"],
+                        "Nombre": row["Nombre"],
+                        "TipoXML": row["TipoXML"],
+                        "ValFormulaCuenta": row["Estado"],
+                    }
+                )
+            else:
+                empresa[tipo].append({"Codigo": row["Codigo"], "Estatus": row["Estado"]})
+
+        for alias, empresa in datos.items():
+            empresa["asientos"] = self._orden_asientos(empresa["asientos"])
+            for tipo_cuenta, codigo_agrupador in self.CODIGOS_AGRUPADOR.items():
+                llave = f"cuenta_{tipo_cuenta}"
+                self.query_cache.put(
+                    QueryCache.make_key("cuenta_empresa", alias, (codigo_agrupador,)),
+                    empresa[llave],
+                )
+                empresa[llave] = self._cuenta_result(tipo_cuenta, empresa[llave])
+            resultados[alias] = empresa
+        return resultados
+
+    @staticmethod
+    def _format_fecha(date_value) -> str:
+        """Convierte una fecha de SQL Server (texto o date) a dd/mm/aaaa."""
+        if isinstance(date_value, str):
+            try:
+                return datetime.strptime(date_value, "%Y-%m-%d").strftime("%d/%m/%Y")
+            except ValueError:
+                return datetime.strptime(date_value, "%d/%m/%Y").strftime("%d/%m/%Y")
+        elif isinstance(date_value, (date, datetime)):
+            return date_value.strftime("%d/%m/%Y")
+        else:
+            raise ValueError(f"Tipo de fecha no soportado: {type(date_value)}")
+
+    def _get_periodo_actual(self, alias_database: str) -> tuple:
+        """Obtiene (PerActual, EjerActual) de la empresa."""
+        query = f"SELECT TOP 1 PerActual, EjerActual FROM {alias_database}.dbo.Parametros"
+        result = self.execute_query(alias_database, query)
+        if not result:
+            raise ValueError("No se encontraron parámetros para la empresa")
+        return result[0]["PerActual"], result[0]["EjerActual"]
+
+    def _load_fiscal_period(self, alias_database: str) -> Dict[str, Any]:
         query = """
-        SELECT 
+        SELECT TOP 1
+            p.PerActual,
+            p.EjerActual,
             CONVERT(VARCHAR, DATEFROMPARTS(e.Ejercicio, p.PerActual, 1), 23) AS FechaInicial,
             CONVERT(VARCHAR, EOMONTH(DATEFROMPARTS(e.Ejercicio, p.PerActual, 1)), 23) AS FechaFinal
         FROM 
@@ -519,46 +957,213 @@ class DataAccessLayer:
             {alias_database}.dbo.Ejercicios AS e 
             ON p.EjerActual = e.Id
         """
+        result = self.execute_query(
+            alias_database, query.format(alias_database=alias_database)
+        )
+        if not result or len(result) == 0:
+            raise ValueError("No se encontraron fechas para la empresa")
+
+        row = result[0]
         try:
-            result = self.execute_query(
-                alias_database, query.format(alias_database=alias_database)
+            fechas = (
+                self._format_fecha(row["FechaInicial"]),
+                self._format_fecha(row["FechaFinal"]),
             )
-            if not result or len(result) == 0:
-                raise ValueError("No se encontraron fechas para la empresa")
+        except Exception as e:
+            logger.error(f"Error al formatear fechas: {e}")
+            raise
 
-            fecha_inicial, fecha_final = (
-                result[0]["FechaInicial"],
-                result[0]["FechaFinal"],
+        periodo = {
+            "periodo": (row["PerActual"], row["EjerActual"]),
+            "fechas": fechas,
+            "validado": time.monotonic(),
+        }
+        with self._periodos_lock:
+            self._periodos[alias_database] = periodo
+        return periodo
+
+    def refresh_fiscal_period(self, alias_database: str) -> tuple:
+        """
+        Carga el periodo fiscal de la empresa en memoria, o lo conserva si no cambió.
+
+        Se llama al abrir cada empresa. Solo se consultan PerActual y EjerActual; las
+        fechas se recalculan únicamente si el periodo cambió.
+
+        Args:
+            alias_database (str): Alias de la base de datos de la empresa
+
+        Returns:
+            tuple: (fecha_inicial, fecha_final) en formato dd/mm/aaaa
+        """
+        with self._periodos_lock:
+            periodo = self._periodos.get(alias_database)
+        if periodo is not None:
+            actual = self._get_periodo_actual(alias_database)
+            if actual == periodo["periodo"]:
+                periodo["validado"] = time.monotonic()
+                return periodo["fechas"]
+            logger.info(
+                f"El periodo de {alias_database} cambió de {periodo['periodo']} a {actual}."
             )
+        return self._load_fiscal_period(alias_database)["fechas"]
 
-            # Función auxiliar para manejar cualquier tipo de fecha
-            def format_date(date_value):
-                if isinstance(date_value, str):
-                    try:
-                        return datetime.strptime(date_value, "%Y-%m-%d").strftime(
-                            "%d/%m/%Y"
-                        )
-                    except ValueError:
-                        return datetime.strptime(date_value, "%d/%m/%Y").strftime(
-                            "%d/%m/%Y"
-                        )
-                elif isinstance(date_value, (date, datetime)):
-                    return date_value.strftime("%d/%m/%Y")
-                else:
-                    raise ValueError(f"Tipo de fecha no soportado: {type(date_value)}")
+    def invalidate_fiscal_period(self, alias_database: Optional[str] = None) -> None:
+        """Descarta el periodo fiscal en memoria de una empresa, o de todas."""
+        with self._periodos_lock:
+            if alias_database is None:
+                self._periodos.clear()
+            else:
+                self._periodos.pop(alias_database, None)
 
-            try:
-                fecha_inicial_str = format_date(fecha_inicial)
-                fecha_final_str = format_date(fecha_final)
-                return fecha_inicial_str, fecha_final_str
-            except Exception as e:
-                logger.error(f"Error al formatear fechas: {e}")
-                raise
+    def get_fechas_for_empresa(self, alias_database: str) -> tuple:
+        """
+        Obtiene las fechas inicial y final del periodo actual de la empresa.
+
+        Se sirven desde memoria; si pasaron más de period_revalidate_after segundos desde
+        la última verificación, se comprueba antes que PerActual no haya cambiado.
 
+        Args:
+            alias_database (str): Alias de la base de datos de la empresa
+
+        Returns:
+            tuple: (fecha_inicial, fecha_final) en formato dd/mm/aaaa
+        """
+        try:
+            with self._periodos_lock:
+                periodo = self._periodos.get(alias_database)
+            if periodo is not None and (
+                time.monotonic() - periodo["validado"] < self.period_revalidate_after
+            ):
+                return periodo["fechas"]
+            return self.refresh_fiscal_period(alias_database)
         except Exception as e:
             logger.error(f"Error al obtener las fechas para la empresa: {e}")
             raise
 
+    # CONTPAQi guarda los CFDI en la base del ADD de cada empresa
+    # (document_<GuidDSL>_metadata) y sus asociaciones en la base de la empresa.
+    # Las tablas y columnas no están documentadas: verify_add_schema las comprueba
+    # antes de usar count_cfdis_sin_asociar.
+    TIPOS_COMPROBANTE = {1: "I", 4: "E"}
+    ESQUEMA_ADD = {
+        "metadata": ("Comprobante", ("Fecha", "TipoComprobante", "GuidDocument")),
+        "empresa": ("AsocCFDIs", ("GuidRef",)),
+    }
+    _GUID = re.compile(r"^[A-Fa-f0-9\-]+$")
+
+    def _get_guid_dsl(self, alias_database: str) -> Optional[str]:
+        query = f"SELECT TOP 1 GuidDSL FROM {alias_database}.dbo.Parametros"
+        return self.query_cache.get_or_load(
+            "guid_dsl",
+            alias_database,
+            (),
+            lambda: self.execute_scalar(alias_database, query),
+        )
+
+    def verify_add_schema(self, alias_database: str) -> bool:
+        """
+        Comprueba en INFORMATION_SCHEMA que existan las tablas y columnas que usa
+        count_cfdis_sin_asociar. El resultado se guarda en la caché de consultas.
+
+        Args:
+            alias_database (str): Alias de la base de datos de la empresa
+
+        Returns:
+            bool: True si el esquema del ADD y de la empresa es el esperado.
+        """
+
+        def comprobar():
+            guid = self._get_guid_dsl(alias_database)
+            if not guid or not self._GUID.match(str(guid)):
+                return False
+            bases = {
+                "metadata": f"[document_{guid}_metadata]",
+                "empresa": alias_database,
+            }
+            for llave, (tabla, columnas) in self.ESQUEMA_ADD.items():
+                marcadores = ", ".join("?" for _ in columnas)
+                query = f"""
+                SELECT COUNT(DISTINCT COLUMN_NAME)
+                FROM {bases[llave]}.INFORMATION_SCHEMA.COLUMNS
+                WHERE TABLE_NAME = ? AND COLUMN_NAME IN ({marcadores})
+                """
+                encontradas = self.execute_scalar(
+                    alias_database, query, (tabla, *columnas)
+                )
+                if encontradas != len(columnas):
+                    logger.warning(
+                        f"El esquema de {alias_database} no tiene {tabla}"
+                        f"({', '.join(columnas)}); se desactiva el modo incremental."
+                    )
+                    return False
+            return True
+
+        try:
+            return self.query_cache.get_or_load(
+                "esquema_add", alias_database, (), comprobar
+            )
+        except Exception as e:
+            logger.warning(
+                f"No se pudo verificar el esquema del ADD de {alias_database}, "
+                f"se desactiva el modo incremental: {e}"
+            )
+            self.query_cache.put(
+                QueryCache.make_key("esquema_add", alias_database, ()), False
+            )
+            return False
+
+    def count_cfdis_sin_asociar(
+        self,
+        alias_database: str,
+        tipo_xml: Optional[int],
+        fecha_inicial: str,
+        fecha_final: str,
+    ) -> Optional[int]:
+        """
+        Cuenta los CFDI del ADD que aún no están asociados a ningún documento contable.
+
+        Se cuentan todos los CFDI sin asociar cuya Fecha cae en la ventana, sin importar
+        cuándo se descargaron: un CFDI que quedó pendiente en una corrida anterior
+        también cuenta. Usar solo después de verify_add_schema.
+
+        Args:
+            alias_database (str): Alias de la base de datos de la empresa
+            tipo_xml (int): TipoXML del asiento (1 o 4); con otro valor no se filtra por tipo
+            fecha_inicial (str): Inicio de la ventana en formato dd/mm/aaaa
+            fecha_final (str): Fin de la ventana en formato dd/mm/aaaa
+
+        Returns:
+            Optional[int]: Número de CFDI sin asociar, o None si no se pudo determinar
+            (por ejemplo, una empresa sin ADD); en ese caso hay que procesar el asiento.
+        """
+        try:
+            guid = self._get_guid_dsl(alias_database)
+            if not guid or not self._GUID.match(str(guid)):
+                logger.debug(f"La empresa {alias_database} no tiene un GuidDSL válido.")
+                return None
+
+            inicio = datetime.strptime(fecha_inicial, "%d/%m/%Y").date()
+            fin = datetime.strptime(fecha_final, "%d/%m/%Y").date()
+            tipo = self.TIPOS_COMPROBANTE.get(tipo_xml)
+            query = f"""
+            SELECT COUNT(*)
+            FROM [document_{guid}_metadata].dbo.Comprobante c
+            WHERE c.Fecha >= ?
+                AND c.Fecha < DATEADD(DAY, 1, ?)
+                AND (? IS NULL OR c.TipoComprobante = ?)
+                AND NOT EXISTS (
+                    SELECT 1
+                    FROM {alias_database}.dbo.AsocCFDIs a
+                    WHERE a.GuidRef = c.GuidDocument
+                )
+            """
+            return self.execute_scalar(alias_database, query, (inicio, fin, tipo, tipo))
+        except Exception as e:
+            logger.warning(
+                f"No se pudieron contar los CFDI sin asociar de {alias_database}: {e}"
+            )
+            return None
+
     def cleanup(self) -> None:
         """Método para limpiar el pool de conexiones"""
         self.connection_pool.close()
@@ -0,0 +1,165 @@
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCache:
+    """
+    Caché de resultados de consultas con TTL por consulta, límite de tamaño (LRU),
+    invalidación explícita y métricas de aciertos y fallos.
+
+    La clave es (nombre de consulta, base de datos, parámetros). Los nombres de consulta
+    permiten fijar un TTL distinto para cada una e invalidarlas en grupo.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        default_ttl: float = 60.0,
+        ttls: Optional[Dict[str, float]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.ttls = dict(ttls or {})
+        self.clock = clock
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evicted": 0, "invalidated": 0}
+
+    def set_ttl(self, query_name: str, ttl: float) -> None:
+        """Fija el TTL en segundos de una consulta (0 para no guardarla)."""
+        self.ttls[query_name] = ttl
+
+    def ttl_for(self, query_name: str) -> float:
+        return self.ttls.get(query_name, self.default_ttl)
+
+    @staticmethod
+    def make_key(query_name: str, database: str, params: Hashable = ()) -> tuple:
+        return (query_name, database, tuple(params))
+
+    def get(self, key: tuple):
+        """
+        Obtiene un resultado vigente.
+
+        Returns:
+            tuple: (True, valor) si hay un resultado vigente, (False, None) si no.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return False, None
+            value, expires = entry
+            if self.clock() >= expires:
+                del self._entries[key]
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return True, value
+
+    def put(self, key: tuple, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl_for(key[0]) if ttl is None else ttl
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, self.clock() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evicted"] += 1
+
+    def get_or_load(
+        self,
+        query_name: str,
+        database: str,
+        params: Hashable,
+        loader: Callable[[], Any],
+        ttl: Optional[float] = None,
+    ) -> Any:
+        """
+        Lectura a través de la caché: devuelve el resultado guardado o lo carga y lo guarda.
+
+        Args:
+            query_name: Nombre de la consulta.
+            database: Base de datos consultada.
+            params: Parámetros de la consulta.
+            loader: Función que ejecuta la consulta.
+            ttl: TTL para esta llamada (por defecto el de la consulta).
+
+        Returns:
+            Resultado de la consulta.
+        """
+        key = self.make_key(query_name, database, params)
+        found, value = self.get(key)
+        if found:
+            return value
+        value = loader()
+        self.put(key, value, ttl)
+        return value
+
+    def invalidate(
+        self, database: Optional[str] = None, query_name: Optional[str] = None
+    ) -> int:
+        """
+        Descarta resultados por base de datos, por consulta, ambos o todos.
+
+        Returns:
+            int: Número de resultados descartados.
+        """
+        with self._lock:
+            keys = [
+                key
+                for key in self._entries
+                if (query_name is None or key[0] == query_name)
+                and (database is None or key[1] == database)
+            ]
+            for key in keys:
+                del self._entries[key]
+            self.stats["invalidated"] += len(keys)
+        if keys:
+            logger.debug(
+                f"Caché de consultas: {len(keys)} resultados invalidados "
+                f"(base={database}, consulta={query_name})"
+            )
+        return len(keys)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+        total = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / total if total else 0.0
+        return stats
+
+
+if __name__ == "__main__":
+    t = [0.0]
+    cache = QueryCache(max_entries=2, ttls={"cuenta": 10}, clock=lambda: t[0])
+    calls = []
+
+    def loader(valor):
+        return lambda: calls.append(valor) or valor
+
+    assert cache.get_or_load("cuenta", "ctA", ("105.01",), loader("a")) == "a"
+    assert cache.get_or_load("cuenta", "ctA", ("105.01",), loader("x")) == "a"
+    t[0] = 11
+    assert cache.get_or_load("cuenta", "ctA", ("105.01",), loader("b")) == "b"
+    cache.get_or_load("cuenta", "ctB", ("105.01",), loader("c"))
+    cache.get_or_load("cuenta", "ctC", ("105.01",), loader("d"))
+    assert cache.get_stats()["evicted"] == 1
+    assert cache.invalidate(database="ctC") == 1
+    assert calls == ["a", "b", "c", "d"]
+
+    repeticiones = 100000
+    start = time.perf_counter()
+    for _ in range(repeticiones):
+        cache.get_or_load("cuenta", "ctB", ("105.01",), loader("c"))
+    elapsed = (time.perf_counter() - start) / repeticiones * 1e6
+    print(f"Acierto en caché: {elapsed:.2f} µs por consulta; {cache.get_stats()}")
@@ -1,3 +1,4 @@
+import os
 import sys
 import psutil
 import time
@@ -5,7 +6,9 @@ import msvcrt
 import logging
 from src.utils import setup_logging
 from src.data.database import DataAccessLayer, SQLServerConnectionPool
-from src.luzzi.helpers import Licencia
+from src.luzzi.helpers import Licencia, ImageHelper
+from src.luzzi.helpers.polling import PollingStats
+from src.luzzi.helpers.window_events import WindowEventBus, WinEventHookSource
 from src.config.config import Config
 from src.luzzi.page_objects import (
     ApplicationManager,
@@ -14,10 +17,13 @@ from src.luzzi.page_objects import (
     CompanySelectionPage,
     ContabilizadorWindowPage,
 )
-from src.luzzi.processors import DatabaseAuthManager, CompanyProcessor
+from src.luzzi.processors import DatabaseAuthManager, CompanyProcessor, CompanyPreflight
 
 app_path = r"C:\Program Files (x86)\Compac\Contabilidad\contabilidad_i.exe"
 NOMBRE_ROBOT = "contabot"
+# Los archivos de la corrida (bitácora de avance, calibración de escala y estadísticas
+# de espera) se guardan juntos en el directorio de trabajo.
+DIRECTORIO_CORRIDA = os.getcwd()
 
 setup_logging()
 logger = logging.getLogger(__name__)
@@ -65,9 +71,18 @@ class Contabot:
             print("\nPresione cualquier tecla para terminar")
             sys.exit(0)
 
-    def ejecutar_robot(self):
-        """Ejecuta el robot y realiza la automatización."""
+    def ejecutar_robot(self, incremental=False, recalibrar=False):
+        """
+        Ejecuta el robot y realiza la automatización.
+
+        Args:
+            incremental (bool): Omite los asientos sin CFDI nuevos por asociar.
+            recalibrar (bool): Descarta la escala de pantalla calibrada y la vuelve a detectar.
+        """
         main_exe = "contabilidad_i.exe"
+        PollingStats.configure(os.path.join(DIRECTORIO_CORRIDA, "polling_stats.json"))
+        if recalibrar:
+            ImageHelper.clear_scale_calibration()
 
         try:
             archivos_config = ["config.yaml", "filters.yaml"]
@@ -78,9 +93,21 @@ class Contabot:
             logger.critical(f"Error al cargar la configuración: {e}")
             return
 
+        connection_pool = SQLServerConnectionPool(pool_size=5, shared_server=True)
+        data_access_layer = DataAccessLayer(connection_pool)
+        plan = CompanyPreflight(
+            data_access_layer, Config.get_instance().get_companies()
+        ).start()
+
         app = self.app_manager.restart_application(main_exe)
         if app:
             logger.info("Aplicación reiniciada y lista para la automatización.")
+            try:
+                WindowEventBus.get_instance().start(WinEventHookSource(app.process))
+            except Exception as e:
+                logger.warning(
+                    f"Eventos de ventana no disponibles, se usará sondeo: {e}"
+                )
             self.dialog_handler = DialogHandler(app)  # Actualizar con app
             login_page = LoginPage(app, app_path)
             if login_page.login(username, password):
@@ -90,10 +117,10 @@ class Contabot:
                 company_selection_page = CompanySelectionPage(app)
                 if company_selection_page.open_catalog():
                     time.sleep(0.5)
-                    connection_pool = SQLServerConnectionPool(pool_size=5)
-                    data_access_layer = DataAccessLayer(connection_pool)
-                    processor = CompanyProcessor(app, data_access_layer)
-                    processor.process_companies()
+                    processor = CompanyProcessor(
+                        app, data_access_layer, incremental=incremental
+                    )
+                    processor.process_companies(plan)
                     for proc in psutil.process_iter(["name", "pid"]):
                         if proc.info["name"].lower() == main_exe.lower():
                             self.terminar_ejecucion(proc.info["pid"])
@@ -0,0 +1,122 @@
+import time
+import logging
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ColorMatch:
+    """Color objetivo encontrado en un área y la fracción de píxeles que lo contienen."""
+
+    color: Tuple[int, int, int]
+    index: int
+    pixels: int
+    coverage: float
+
+
+def _tolerance_matrix(tolerance, count):
+    """Normaliza la tolerancia a una matriz (colores, canales)."""
+    tol = np.asarray(tolerance, dtype=np.int16)
+    if tol.ndim == 0:
+        return np.full((count, 3), tol, dtype=np.int16)
+    if tol.ndim == 1:
+        if len(tol) != count:
+            raise ValueError(
+                f"Se esperaban {count} tolerancias, se recibieron {len(tol)}"
+            )
+        return np.repeat(tol[:, None], 3, axis=1)
+    if tol.shape != (count, 3):
+        raise ValueError(f"Forma de tolerancia no válida: {tol.shape}")
+    return tol
+
+
+def match_colors(image, colors, tolerance=5, min_coverage=0.0) -> Optional[ColorMatch]:
+    """
+    Busca los colores objetivo en orden, vectorizando sobre los píxeles de cada uno.
+
+    Se detiene en el primer color que alcanza su umbral de píxeles, sin evaluar los
+    siguientes. La diferencia se calcula en int16 para evitar el desbordamiento de uint8.
+
+    Args:
+        image: Imagen RGB (alto, ancho, 3 o 4).
+        colors: Lista de colores objetivo (tuplas RGB), en orden de prioridad.
+        tolerance: Tolerancia única, una por color, o una por color y canal.
+        min_coverage: Fracción mínima de píxeles (0 a 1) para considerar el color presente.
+
+    Returns:
+        ColorMatch: Primer color (según el orden recibido) presente en el área, o None.
+    """
+    pixels = np.asarray(image)[..., :3].reshape(-1, 3).astype(np.int16)
+    total = pixels.shape[0]
+    if total == 0 or not colors:
+        return None
+
+    targets = np.asarray(colors, dtype=np.int16).reshape(-1, 3)
+    tol = _tolerance_matrix(tolerance, len(targets))
+    lower = targets - tol
+    upper = targets + tol
+
+    mask = np.empty(total, dtype=bool)
+    for index in range(len(targets)):
+        # Un canal a la vez, reutilizando la misma máscara para todos los colores.
+        np.greater_equal(pixels[:, 0], lower[index, 0], out=mask)
+        mask &= pixels[:, 0] <= upper[index, 0]
+        for channel in (1, 2):
+            values = pixels[:, channel]
+            mask &= values >= lower[index, channel]
+            mask &= values <= upper[index, channel]
+        count = np.count_nonzero(mask)
+        coverage = count / total
+        if count > 0 and coverage >= min_coverage:
+            return ColorMatch(
+                tuple(int(c) for c in targets[index]), index, int(count), float(coverage)
+            )
+    return None
+
+
+def _legacy_detect(image, colors, tolerance=5):
+    for color_objetivo in colors:
+        diff = np.abs(image - color_objetivo)
+        mask = np.all(diff <= tolerance, axis=2)
+        if np.any(mask):
+            return True
+    return False
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    colors = [(69, 179, 157), (200, 30, 30), (30, 30, 200), (250, 250, 250)]
+    repeats = 200
+
+    print("Detección de colores (ms por llamada), 4 colores objetivo ausentes:")
+    for size in (3, 100, 500):
+        image = rng.integers(0, 60, (size, size, 3), dtype=np.uint8)
+        for name, func in (
+            ("bucle", lambda: _legacy_detect(image, colors)),
+            ("vectorizada", lambda: match_colors(image, colors)),
+        ):
+            start = time.perf_counter()
+            for _ in range(repeats):
+                func()
+            elapsed = (time.perf_counter() - start) / repeats * 1000
+            print(f"    {size:3d}x{size:<3d} {name:12s}: {elapsed:8.4f} ms")
+
+    print("Detección de colores (ms por llamada), 500x500 con el primer color presente:")
+    image = rng.integers(0, 60, (500, 500, 3), dtype=np.uint8)
+    image[:10, :10] = colors[0]
+    assert match_colors(image, colors).index == 0
+    assert match_colors(image, colors[1:] + colors[:1]).index == 3
+    assert match_colors(image, colors, min_coverage=0.01) is None
+    for name, func in (
+        ("bucle", lambda: _legacy_detect(image, colors)),
+        ("vectorizada", lambda: match_colors(image, colors)),
+    ):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            func()
+        elapsed = (time.perf_counter() - start) / repeats * 1000
+        print(f"    {name:12s}: {elapsed:8.4f} ms")
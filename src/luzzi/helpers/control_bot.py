@@ -1,35 +1,61 @@
-import time
 import logging
-from typing import Callable, Any
+from typing import Callable, Any, Tuple, Type
+from src.luzzi.helpers.polling import PollingPolicy, element_key
+from src.luzzi.helpers.retry import RetryPolicy
+from src.luzzi.helpers.window_events import WindowEventBus
 
 class ControlBot:
-    def __init__(self, logger: logging.Logger = None):
+    def __init__(self, logger: logging.Logger = None, polling_policy: PollingPolicy = None):
         """
         Initialize ControlBot with an optional logger.
         
         :param logger: Custom logger instance (default: module-level logger)
+        :param polling_policy: Polling schedule shared by the waits (default: shared instance)
         """
         self.logger = logger or logging.getLogger(__name__)
+        self.polling_policy = polling_policy or PollingPolicy.get_instance()
+
+    @staticmethod
+    def _exists(element) -> bool:
+        try:
+            return element.exists(timeout=0)
+        except TypeError:
+            return element.exists()
+
+    def _sleep(self):
+        bus = WindowEventBus.get_instance()
+        return bus.sleep if bus.active else None
 
     def wait_for_element(self, element, timeout: int = 60, poll_interval: float = 1.0) -> bool:
         """
         Wait for an element to exist and become visible.
+
+        Checks follow the shared polling policy: fast at first, backing off up to
+        poll_interval (or less for elements that usually appear quickly), and they run
+        again as soon as a window event arrives.
         
         :param element: Element to wait for
         :param timeout: Maximum wait time in seconds
-        :param poll_interval: Time between checks in seconds
+        :param poll_interval: Maximum time between checks in seconds
         :return: True if element appears within timeout
         :raises TimeoutError: If element doesn't appear within timeout
         """
-        start_time = time.time()
-        while time.time() - start_time < timeout:
+        def is_visible():
             try:
-                if element.exists() and element.is_visible():
-                    self.logger.info(f"Element {element} found successfully")
-                    return True
+                return self._exists(element) and element.is_visible()
             except Exception as e:
                 self.logger.debug(f"Error checking element: {e}")
-            time.sleep(poll_interval)
+                return False
+
+        if self.polling_policy.wait(
+            is_visible,
+            timeout,
+            key=element_key(element),
+            cap=poll_interval,
+            sleep=self._sleep(),
+        ):
+            self.logger.info(f"Element {element} found successfully")
+            return True
         
         self.logger.error(f"Element {element} not found within {timeout} seconds")
         raise TimeoutError(f"Element {element} did not appear in {timeout} seconds")
@@ -46,46 +72,58 @@ class ControlBot:
         
         :param element: Element to verify
         :param timeout: Maximum wait time
-        :param poll_interval: Check interval
+        :param poll_interval: Maximum check interval
         :param log_errors: Whether to log verification errors
         :return: True if element is ready within timeout, False otherwise
         """
-        start_time = time.time()
-        while time.time() - start_time < timeout:
+        def is_ready():
             try:
-                if element.exists() and element.is_visible() and element.is_enabled():
-                    return True
+                return (
+                    self._exists(element)
+                    and element.is_visible()
+                    and element.is_enabled()
+                )
             except Exception as e:
                 if log_errors:
                     self.logger.debug(f"Error verifying element state: {e}")
-            time.sleep(poll_interval)
-        return False
+                return False
+
+        return self.polling_policy.wait(
+            is_ready,
+            timeout,
+            key=element_key(element),
+            cap=poll_interval,
+            sleep=self._sleep(),
+        ).success
 
     def retry_action(
         self,
         action: Callable[[], Any],
         max_retries: int = 5,
         initial_delay: float = 1.0,
-        backoff_factor: float = 2.0
+        backoff_factor: float = 2.0,
+        retry_on: Tuple[Type[BaseException], ...] = (Exception,),
+        site: str = None,
     ) -> Any:
         """
-        Retry an action with exponential backoff.
+        Retry an action with jittered exponential backoff.
+
+        Pauses are capped and never run past the deadline set with
+        src.luzzi.helpers.retry.deadline, so nested retries share one time budget.
         
         :param action: Function to retry
-        :param max_retries: Maximum number of retry attempts
+        :param max_retries: Maximum number of attempts
         :param initial_delay: Initial delay in seconds
         :param backoff_factor: Multiplier for delay between retries
+        :param retry_on: Exception types that trigger a retry; others propagate at once
+        :param site: Call-site name for the retry metrics (default: action name)
         :return: Result of successful action
-        :raises Exception: If all retries fail
+        :raises RetryError: If all retries fail
+        :raises DeadlineExceeded: If the current deadline does not allow another attempt
         """
-        delay = initial_delay
-        for attempt in range(max_retries):
-            try:
-                return action()
-            except Exception as e:
-                self.logger.warning(
-                    f"Attempt {attempt+1} failed: {e}. Retrying in {delay} seconds..."
-                )
-                time.sleep(delay)
-                delay *= backoff_factor
-        raise Exception("Action failed after multiple retry attempts")
+        return RetryPolicy(
+            max_attempts=max_retries,
+            initial_delay=initial_delay,
+            backoff_factor=backoff_factor,
+            retry_on=retry_on,
+        ).call(action, site=site)
@@ -1,15 +1,28 @@
-import time
 import logging
 import os
 import sys
-import cv2
+import time
 import numpy as np
 import pyautogui
-from PIL import ImageGrab
 from pywinauto import findwindows, timings
+from src.luzzi.helpers.color_matching import match_colors
+from src.luzzi.helpers.image_matching import ScaleCalibration, TemplateMatcher
+from src.luzzi.helpers.listview_reader import ListViewReader
+from src.luzzi.helpers.screen_capture import ScreenCapture
+from src.luzzi.helpers.waits import poll_until
+from src.luzzi.helpers.window_events import WindowEventBus
+from src.luzzi.helpers.window_index import WindowIndex
 
 logger = logging.getLogger(__name__)
 
+POLICY_RESULT_MARKERS = {
+    "Póliza creada": True,
+    "No se puede guardar el movimiento de la  póliza por que la": False,
+}
+# Al esperar una imagen, cada sondeo prueba solo la última ubicación y la escala
+# calibrada; el barrido completo de escalas se repite como mucho cada tantos segundos.
+INTERVALO_BARRIDO_COMPLETO = 1.0
+
 
 class WindowHelper:
     """Clase para manejar operaciones relacionadas con ventanas de la aplicación."""
@@ -122,21 +135,46 @@ class WindowHelper:
             return False
         
     @staticmethod
-    def check_policy_created(contabilizador_window):
+    def check_policy_created(contabilizador_window, since_mark=True):
+            """
+            Busca en el SysListView32 el resultado de la generación de la póliza.
+
+            Solo se leen las filas agregadas desde la consulta anterior, y solo se
+            consideran las posteriores a mark_policy_results (salvo since_mark=False).
+
+            Returns:
+                bool: True si aparece 'Póliza creada', False si aparece el mensaje de
+                rechazo o hubo un error, None si aún no hay resultado.
+            """
             try:
                 listview = contabilizador_window.child_window(
                     class_name="SysListView32"
+                ).wrapper_object()
+                return ListViewReader.for_control(listview).find_first(
+                    POLICY_RESULT_MARKERS, since_mark=since_mark
                 )
-                for i in range(listview.item_count()):
-                    for j in range(listview.column_count()):
-                        if "Póliza creada" in listview.item(i, j).text():
-                            return True
-                        elif "No se puede guardar el movimiento de la  póliza por que la" in listview.item(i, j).text():
-                            return False
             except Exception as e:
                 logger.error(f"Error al verificar 'Póliza creada': {e}")
                 return False
 
+    @staticmethod
+    def mark_policy_results(contabilizador_window):
+        """
+        Marca las filas actuales del SysListView32 de resultados como ya vistas.
+
+        Se llama antes de cada 'Generar pólizas': el control todavía conserva las filas
+        del asiento anterior, y un resultado solo cuenta si aparece en una fila nueva o
+        después de que la lista se reescribió.
+        """
+        try:
+            listview = contabilizador_window.child_window(
+                class_name="SysListView32"
+            ).wrapper_object()
+            ListViewReader.for_control(listview).mark()
+        except Exception as e:
+            logger.debug(f"No se pudo reiniciar la lectura de resultados: {e}")
+            ListViewReader.forget()
+
     @staticmethod
     def wait_for_policy_created(contabilizador_window, timeout=30):
         """
@@ -167,6 +205,8 @@ class WindowHelper:
         """
         Detecta una ventana sin título que contenga ciertos patrones de texto, ignorando ventanas con patrones no deseados.
 
+        Solo se revisan las ventanas del proceso de la aplicación, en una pasada por consulta.
+
         Args:
             app: Instancia de la aplicación pywinauto.
             content_patterns: Lista de patrones a buscar en el contenido.
@@ -176,53 +216,43 @@ class WindowHelper:
         Returns:
             HwndWrapper: Ventana encontrada o None.
         """
-        ignore_patterns = ignore_patterns or []
-        start_time = time.time()
-        while time.time() - start_time < timeout:
-            ventanas_sin_titulo = findwindows.find_windows(title="")
-            for hwnd in ventanas_sin_titulo:
-                try:
-                    ventana = app.window(handle=hwnd)
-                    contenido = WindowHelper.get_control_text(ventana)
-                    if contenido:
-                        # Ignorar ventanas con patrones no deseados
-                        if any(
-                            ignore.lower() in contenido.lower()
-                            for ignore in ignore_patterns
-                        ):
-                            continue
-                        # Verificar si contiene alguno de los patrones deseados
-                        if any(
-                            p.lower() in contenido.lower() for p in content_patterns
-                        ):
-                            logger.info(f"Ventana detectada con contenido: {contenido}")
-                            return ventana
-                except Exception as e:
-                    logger.warning(f"Error al procesar ventana: {e}")
-                time.sleep(0.1)
+        index = WindowIndex.for_app(
+            app, lambda hwnd: WindowHelper.get_control_text(app.window(handle=hwnd))
+        )
+        result = poll_until(
+            lambda: index.find(content_patterns, ignore_patterns),
+            timeout,
+            min_interval=0.05,
+            max_interval=0.1,
+        )
+        if result:
+            hwnd, contenido = result.value
+            logger.info(f"Ventana detectada con contenido: {contenido}")
+            return app.window(handle=hwnd)
         logger.warning(
             f"No se detectó la ventana con contenido esperado después de {timeout} segundos"
         )
         return None
 
     @staticmethod
-    def wait_for_window_disappearance(window, timeout=5):
+    def wait_for_window_disappearance(window, timeout=5, site=None):
         """
         Espera a que una ventana desaparezca.
 
         Args:
             window: Ventana a verificar.
             timeout: Tiempo máximo de espera en segundos.
+            site: Nombre del sitio de espera para el reporte de tiempos (opcional).
 
         Returns:
             bool: True si la ventana desapareció, False en caso contrario.
         """
-        start_time = time.time()
-        while time.time() - start_time < timeout:
-            if not window.exists():
-                return True
-            time.sleep(0.05)
-        return False
+        return WindowEventBus.get_instance().wait_for(
+            lambda: not window.exists(timeout=0),
+            timeout,
+            fallback_interval=0.05,
+            site=site,
+        ).success
 
     @staticmethod
     def get_control_by_class_name(window, class_name, index=0):
@@ -246,6 +276,56 @@ class WindowHelper:
 class ImageHelper:
     """Clase para manejar búsqueda y clics en imágenes de la pantalla."""
 
+    @staticmethod
+    def capture_gray():
+        """
+        Captura la pantalla completa en escala de grises.
+
+        Returns:
+            np.ndarray: Captura en escala de grises (válida hasta la siguiente captura).
+        """
+        return ScreenCapture.get_instance().grab_gray()
+
+    @staticmethod
+    def find_images(template_paths, confidence=0.8, advanced=False):
+        """
+        Busca varias imágenes en una sola captura de pantalla, sin hacer clic.
+
+        Args:
+            template_paths: Rutas de las imágenes de plantilla.
+            confidence: Umbral de confianza.
+            advanced: Usar la búsqueda con pre-procesamiento.
+
+        Returns:
+            list: MatchResult de cada imagen encontrada, con su confianza y ubicación.
+        """
+        template_paths = [ResourceHelper.resource_path(p) for p in template_paths]
+        screenshot_gray = ImageHelper.capture_gray()
+        hits = TemplateMatcher.get_instance().find_many(
+            screenshot_gray, template_paths, confidence, advanced=advanced
+        )
+        for match in hits:
+            logger.debug(
+                f"Imagen {match.template_path} presente con confianza {match.confidence:.2f}"
+            )
+        return hits
+
+    @staticmethod
+    def click_match(match, double_click=False):
+        """
+        Hace clic o doble clic en el centro de una coincidencia.
+
+        Args:
+            match: MatchResult devuelto por find_images.
+            double_click: Indica si se debe hacer doble clic.
+        """
+        button_center_x, button_center_y = match.center
+        if double_click:
+            pyautogui.doubleClick(button_center_x, button_center_y)
+        else:
+            pyautogui.click(button_center_x, button_center_y)
+        ScreenCapture.get_instance().invalidate()
+
     @staticmethod
     def find_and_click_image(
         template_path,
@@ -267,41 +347,75 @@ class ImageHelper:
         Returns:
             bool: True si se encontró y se hizo clic, False en caso contrario.
         """
-        screenshot = pyautogui.screenshot()
-        screenshot = np.array(screenshot)
-        screenshot_gray = cv2.cvtColor(screenshot, cv2.COLOR_RGB2GRAY)
+        screenshot_gray = ImageHelper.capture_gray()
 
-        template = cv2.imread(template_path, cv2.IMREAD_GRAYSCALE)
-        if template is None:
-            raise FileNotFoundError(
-                f"No se pudo cargar la plantilla desde: {template_path}"
-            )
+        scales = tuple(np.linspace(scale_range[0], scale_range[1], steps))
+        match = TemplateMatcher.get_instance().find(
+            screenshot_gray, template_path, confidence, scales
+        )
 
-        scales = np.linspace(scale_range[0], scale_range[1], steps)
-        for scale in scales:
-            resized_template = cv2.resize(template, None, fx=scale, fy=scale)
-            result = cv2.matchTemplate(
-                screenshot_gray, resized_template, cv2.TM_CCOEFF_NORMED
+        if match is not None and match.confidence >= confidence:
+            ImageHelper.click_match(match, double_click)
+            logger.info(
+                f"Imagen encontrada y clic realizada con confianza {match.confidence:.2f}"
             )
-            min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
-
-            if max_val >= confidence:
-                button_x, button_y = max_loc
-                button_center_x = button_x + resized_template.shape[1] // 2
-                button_center_y = button_y + resized_template.shape[0] // 2
-
-                if double_click:
-                    pyautogui.doubleClick(button_center_x, button_center_y)
-                else:
-                    pyautogui.click(button_center_x, button_center_y)
-                logger.info(
-                    f"Imagen encontrada y clic realizada con confianza {max_val:.2f}"
-                )
-                return True
+            return True
 
         logger.warning("No se encontró la imagen en ninguna escala.")
         return False
 
+    @staticmethod
+    def wait_and_click_image(
+        template_path, timeout=5, confidence=0.8, double_click=False, site=None
+    ):
+        """
+        Espera a que una imagen aparezca en pantalla y hace clic en ella.
+
+        Args:
+            template_path: Ruta de la imagen de plantilla.
+            timeout: Tiempo máximo de espera en segundos.
+            confidence: Umbral de confianza.
+            double_click: Indica si se debe hacer doble clic.
+            site: Nombre del sitio de espera para el reporte de tiempos (opcional).
+
+        Returns:
+            bool: True si se encontró y se hizo clic, False en caso contrario.
+        """
+        matcher = TemplateMatcher.get_instance()
+        ultimo_barrido = [None]
+
+        def buscar():
+            ahora = time.monotonic()
+            barrido = (
+                ultimo_barrido[0] is None
+                or ahora - ultimo_barrido[0] >= INTERVALO_BARRIDO_COMPLETO
+            )
+            if barrido:
+                ultimo_barrido[0] = ahora
+            match = matcher.find(
+                ImageHelper.capture_gray(), template_path, confidence, sweep=barrido
+            )
+            if match is not None and match.confidence >= confidence:
+                return match
+            return None
+
+        result = poll_until(
+            buscar,
+            timeout,
+            min_interval=0.05,
+            max_interval=0.25,
+            site=site,
+        )
+        if not result:
+            logger.warning(f"La imagen {template_path} no apareció en {timeout}s.")
+            return False
+        ImageHelper.click_match(result.value, double_click)
+        logger.info(
+            f"Imagen encontrada en {result.latency:.2f}s y clic realizado "
+            f"con confianza {result.value.confidence:.2f}"
+        )
+        return True
+
     @staticmethod
     def find_and_click_image_advanced(
         template_path, confidence=0.90, double_click=False
@@ -321,56 +435,17 @@ class ImageHelper:
             template_path = ResourceHelper.resource_path(template_path)
             logger.debug(f"Buscando imagen en: {template_path}")
 
-            screenshot = pyautogui.screenshot()
-            screenshot = np.array(screenshot)
-            screenshot_gray = cv2.cvtColor(screenshot, cv2.COLOR_RGB2GRAY)
-
-            template = cv2.imread(template_path, cv2.IMREAD_GRAYSCALE)
-            if template is None:
-                raise FileNotFoundError(
-                    f"No se pudo cargar la plantilla desde: {template_path}"
-                )
-
-            scales = [0.8, 0.9, 1.0, 1.1, 1.2]
-            preprocessing_methods = [
-                lambda img: img,
-                lambda img: cv2.equalizeHist(img),
-                lambda img: cv2.GaussianBlur(img, (3, 3), 0),
-                lambda img: cv2.Canny(img, 100, 200),
-            ]
-
-            best_confidence = 0
-            best_location = None
-
-            for preprocess in preprocessing_methods:
-                processed_screenshot = preprocess(screenshot_gray.copy())
-                processed_template = preprocess(template.copy())
-
-                for scale in scales:
-                    width = int(processed_template.shape[1] * scale)
-                    height = int(processed_template.shape[0] * scale)
-                    resized_template = cv2.resize(processed_template, (width, height))
-
-                    result = cv2.matchTemplate(
-                        processed_screenshot, resized_template, cv2.TM_CCOEFF_NORMED
-                    )
-                    min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+            screenshot_gray = ImageHelper.capture_gray()
 
-                    if max_val > best_confidence:
-                        best_confidence = max_val
-                        best_location = (max_loc, resized_template.shape)
-
-            if best_confidence >= confidence and best_location:
-                loc, template_shape = best_location
-                button_center_x = loc[0] + template_shape[1] // 2
-                button_center_y = loc[1] + template_shape[0] // 2
+            match = TemplateMatcher.get_instance().find_advanced(
+                screenshot_gray, template_path, confidence
+            )
+            best_confidence = match.confidence if match is not None else 0
 
-                if double_click:
-                    pyautogui.doubleClick(button_center_x, button_center_y)
-                else:
-                    pyautogui.click(button_center_x, button_center_y)
+            if best_confidence >= confidence:
+                ImageHelper.click_match(match, double_click)
                 logger.info(f"Imagen encontrada con confianza {best_confidence:.2f}")
-                return True, (button_center_x, button_center_y)
+                return True, match.center
             logger.warning(
                 f"No se encontró la imagen. Mejor confianza: {best_confidence:.2f}"
             )
@@ -379,10 +454,90 @@ class ImageHelper:
             logger.error(f"Error en búsqueda avanzada de imagen: {e}")
             return False, None
 
+    @staticmethod
+    def calibrate_scale(template_paths=None, force=False):
+        """
+        Detecta la escala de pantalla una sola vez por resolución para que las búsquedas
+        posteriores prueben una única escala.
+
+        Debe llamarse cuando las plantillas indicadas están en pantalla. Los votos se
+        acumulan entre llamadas y la escala se fija cuando varias coincidencias
+        concuerdan, así que puede devolver None las primeras veces.
+
+        Args:
+            template_paths: Plantillas a usar (default: todas las imágenes de img/).
+            force: Recalibrar aunque ya exista una escala guardada para la resolución.
+
+        Returns:
+            float: Escala calibrada, o None si aún no se pudo calibrar.
+        """
+        screenshot_gray = ImageHelper.capture_gray()
+        calibration = ScaleCalibration.get_instance()
+        calibrated = calibration.get(screenshot_gray.shape)
+        if calibrated is not None and not force:
+            logger.debug(f"Usando escala calibrada previamente: {calibrated:.3f}")
+            return calibrated
+
+        if template_paths is None:
+            img_dir = ResourceHelper.resource_path("img")
+            template_paths = [
+                os.path.join(img_dir, name)
+                for name in sorted(os.listdir(img_dir))
+                if name.lower().endswith(".png")
+            ] if os.path.isdir(img_dir) else []
+        else:
+            template_paths = [ResourceHelper.resource_path(p) for p in template_paths]
+
+        scale = TemplateMatcher.get_instance().calibrate(screenshot_gray, template_paths)
+        if scale is None:
+            logger.info(
+                "Escala de pantalla aún sin calibrar; se seguirá probando el rango completo "
+                "de escalas."
+            )
+        return scale
+
+    @staticmethod
+    def clear_scale_calibration():
+        """Descarta las escalas calibradas guardadas para todas las resoluciones."""
+        ScaleCalibration.get_instance().clear()
+        logger.info("Calibración de escala descartada; se volverá a calibrar.")
+
+    @staticmethod
+    def get_match_stats():
+        """
+        Obtiene los contadores de aciertos/fallos de la búsqueda por región de última ubicación.
+
+        Returns:
+            dict: Contadores por plantilla y total.
+        """
+        return TemplateMatcher.get_instance().memory.get_stats()
+
 
 class ColorHelper:
     """Clase para manejar la detección de colores en áreas específicas de la pantalla."""
 
+    @staticmethod
+    def detect_colors(colors, area, tolerance=5, min_coverage=0.0):
+        """
+        Detecta cuál de los colores objetivo está presente en el área especificada.
+
+        Args:
+            colors: Lista de colores objetivo (tuplas RGB), en orden de prioridad.
+            area: Coordenadas del área a capturar (x1, y1, x2, y2).
+            tolerance: Tolerancia única, una por color, o una por color y canal.
+            min_coverage: Fracción mínima de píxeles del área con el color (0 a 1).
+
+        Returns:
+            ColorMatch: Color encontrado y su cobertura, o None si no se detecta ninguno.
+        """
+        imagen = ScreenCapture.get_instance().grab(bbox=area)
+        match = match_colors(imagen, colors, tolerance, min_coverage)
+        if match is not None:
+            logger.debug(
+                f"Color detectado cerca de {match.color} (cobertura {match.coverage:.0%})"
+            )
+        return match
+
     @staticmethod
     def detect_colors_in_area(colors, area, tolerance=5):
         """
@@ -396,39 +551,67 @@ class ColorHelper:
         Returns:
             bool: True si se detecta algún color, False en caso contrario.
         """
-        captura = ImageGrab.grab(bbox=area)
-        imagen = np.array(captura)
+        return ColorHelper.detect_colors(colors, area, tolerance) is not None
 
-        for color_objetivo in colors:
-            diff = np.abs(imagen - color_objetivo)
-            mask = np.all(diff <= tolerance, axis=2)
-            if np.any(mask):
-                logger.debug(f"Color detectado cerca de {color_objetivo}")
-                return True
-        return False
+    @staticmethod
+    def watch_colors(
+        colors, area, timeout=30, tolerance=5, min_interval=0.02, max_interval=0.5
+    ):
+        """
+        Vigila un área pequeña hasta que aparezca alguno de los colores.
+
+        Consulta a alta frecuencia mientras el área cambia y espacia las consultas
+        cuando la imagen se mantiene igual.
+
+        Args:
+            colors: Lista de colores objetivo.
+            area: Coordenadas del área a verificar (x1, y1, x2, y2).
+            timeout: Tiempo máximo de espera en segundos.
+            tolerance: Tolerancia única, una por color, o una por color y canal.
+            min_interval: Intervalo entre consultas mientras el área cambia.
+            max_interval: Intervalo máximo cuando el área no cambia.
+
+        Returns:
+            WaitResult: value contiene el ColorMatch; latency el tiempo hasta detectarlo.
+        """
+        capture = ScreenCapture.get_instance()
+        return poll_until(
+            lambda imagen: match_colors(imagen, colors, tolerance),
+            timeout,
+            sample=lambda: capture.grab(bbox=area),
+            min_interval=min_interval,
+            max_interval=max_interval,
+        )
 
     @staticmethod
-    def wait_for_colors(colors, area, max_attempts=20, interval=0.5):
+    def wait_for_colors(colors, area, max_attempts=20, interval=0.5, tolerance=5):
         """
         Espera a que aparezca alguno de los colores en el área especificada.
 
+        El tiempo máximo es max_attempts * interval; interval es el mayor espacio entre
+        consultas, que se hacen más seguido mientras el área cambia.
+
         Args:
             colors: Lista de colores objetivo.
             area: Coordenadas del área a verificar.
             max_attempts: Número máximo de intentos.
             interval: Intervalo entre intentos en segundos.
+            tolerance: Tolerancia única, una por color, o una por color y canal.
 
         Returns:
-            bool: True si se detecta el color, False si se agota el tiempo.
+            ColorMatch: Color detectado y su cobertura, o None si se agota el tiempo.
         """
-        for _ in range(max_attempts):
-            if ColorHelper.detect_colors_in_area(colors, area, tolerance=5):
-                logger.debug("Color objetivo detectado en la tabla de facturas.")
-                return True
-            logger.debug("Esperando que se asocien los XML...")
-            time.sleep(interval)
+        result = ColorHelper.watch_colors(
+            colors, area, max_attempts * interval, tolerance, max_interval=interval
+        )
+        if result:
+            logger.debug(
+                f"Color objetivo detectado en la tabla de facturas "
+                f"({result.latency:.2f}s, {result.polls} consultas)."
+            )
+            return result.value
         logger.error("Tiempo de espera agotado. No se detectó ningún color objetivo.")
-        return False
+        return None
 
 
 class ResourceHelper:
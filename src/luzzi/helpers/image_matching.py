@@ -0,0 +1,1372 @@
+import os
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCALES = tuple(float(s) for s in np.linspace(0.8, 1.2, 10))
+
+
+@dataclass
+class TemplateEntry:
+    """Plantilla en escala de grises cargada en memoria junto con sus variantes escaladas."""
+
+    path: str
+    mtime: float
+    gray: np.ndarray
+    variants: Dict[Tuple[str, float], np.ndarray] = field(default_factory=dict)
+
+    def scaled(
+        self, scale, preprocess_name="raw", preprocess=None, interpolation=cv2.INTER_LINEAR
+    ):
+        """
+        Obtiene la plantilla escalada (y opcionalmente pre-procesada), calculándola una sola vez.
+
+        Args:
+            scale: Factor de escala.
+            preprocess_name: Nombre del pre-procesamiento, usado como parte de la llave.
+            preprocess: Función de pre-procesamiento a aplicar antes de escalar.
+            interpolation: Interpolación de cv2.resize.
+
+        Returns:
+            np.ndarray: Plantilla lista para cv2.matchTemplate.
+        """
+        key = (preprocess_name, round(float(scale), 4))
+        variant = self.variants.get(key)
+        if variant is None:
+            base = self.gray if preprocess is None else preprocess(self.gray.copy())
+            width = max(1, int(round(base.shape[1] * scale)))
+            height = max(1, int(round(base.shape[0] * scale)))
+            variant = cv2.resize(base, (width, height), interpolation=interpolation)
+            self.variants[key] = variant
+        return variant
+
+
+class TemplateCache:
+    """Registro de plantillas compartido por todo el proceso, con límite LRU e invalidación por mtime."""
+
+    _instance = None
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, TemplateEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def get(self, template_path, scales: Optional[Iterable[float]] = None) -> TemplateEntry:
+        """
+        Obtiene la plantilla desde memoria, cargándola de disco solo si no existe o si el archivo cambió.
+
+        Args:
+            template_path: Ruta de la imagen de plantilla.
+            scales: Escalas a pre-calcular al cargar la plantilla (opcional).
+
+        Returns:
+            TemplateEntry: Plantilla en memoria.
+
+        Raises:
+            FileNotFoundError: Si la plantilla no existe o no se puede leer.
+        """
+        try:
+            mtime = os.path.getmtime(template_path)
+        except OSError:
+            raise FileNotFoundError(
+                f"No se pudo cargar la plantilla desde: {template_path}"
+            )
+
+        with self._lock:
+            entry = self._entries.get(template_path)
+            if entry is not None and entry.mtime == mtime:
+                self._entries.move_to_end(template_path)
+                self.hits += 1
+                return entry
+
+        gray = cv2.imread(template_path, cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            raise FileNotFoundError(
+                f"No se pudo cargar la plantilla desde: {template_path}"
+            )
+        entry = TemplateEntry(template_path, mtime, gray)
+        for scale in scales or ():
+            entry.scaled(scale)
+
+        with self._lock:
+            self.misses += 1
+            self._entries[template_path] = entry
+            self._entries.move_to_end(template_path)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                logger.debug(f"Plantilla descartada de la caché: {evicted}")
+        logger.debug(f"Plantilla cargada en caché: {template_path}")
+        return entry
+
+    def preload(self, template_paths, scales=DEFAULT_SCALES):
+        """Carga por adelantado un conjunto de plantillas con sus escalas."""
+        for template_path in template_paths:
+            try:
+                self.get(template_path, scales)
+            except FileNotFoundError as e:
+                logger.warning(str(e))
+
+    def invalidate(self, template_path=None):
+        """Elimina una plantilla de la caché, o todas si no se especifica."""
+        with self._lock:
+            if template_path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(template_path, None)
+
+
+@dataclass
+class MatchResult:
+    """Coincidencia de una plantilla dentro de una captura de pantalla."""
+
+    template_path: str
+    confidence: float
+    x: int
+    y: int
+    width: int
+    height: int
+    scale: float
+    variant: str = "raw"
+
+    @property
+    def center(self):
+        return self.x + self.width // 2, self.y + self.height // 2
+
+
+def match_at_scales(
+    screen_gray,
+    entry,
+    scales,
+    confidence,
+    offset=(0, 0),
+    variant="raw",
+    preprocess=None,
+    stop_at_first=True,
+):
+    """
+    Ejecuta cv2.matchTemplate para cada escala y devuelve la mejor coincidencia.
+
+    Args:
+        screen_gray: Captura (o región) en escala de grises, ya pre-procesada.
+        entry: TemplateEntry con la plantilla.
+        scales: Escalas a probar, en orden.
+        confidence: Umbral de confianza.
+        offset: Desplazamiento (x, y) de la región respecto a la pantalla completa.
+        variant: Nombre del pre-procesamiento aplicado.
+        preprocess: Función de pre-procesamiento para la plantilla.
+        stop_at_first: Detenerse en la primera escala que supere el umbral.
+
+    Returns:
+        MatchResult: Mejor coincidencia encontrada (puede estar bajo el umbral) o None.
+    """
+    best = None
+    for scale in scales:
+        template = entry.scaled(scale, variant, preprocess)
+        if (
+            template.shape[0] > screen_gray.shape[0]
+            or template.shape[1] > screen_gray.shape[1]
+        ):
+            continue
+        result = cv2.matchTemplate(screen_gray, template, cv2.TM_CCOEFF_NORMED)
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        if best is None or max_val > best.confidence:
+            best = MatchResult(
+                entry.path,
+                float(max_val),
+                max_loc[0] + offset[0],
+                max_loc[1] + offset[1],
+                template.shape[1],
+                template.shape[0],
+                float(scale),
+                variant,
+            )
+        if stop_at_first and max_val >= confidence:
+            break
+    return best
+
+
+class LocationMemory:
+    """Recuerda dónde (y a qué escala) coincidió cada plantilla por última vez."""
+
+    OUTCOMES = (
+        "roi_hits",
+        "roi_misses",
+        "calibrated_hits",
+        "calibrated_misses",
+        "full_hits",
+        "full_misses",
+    )
+
+    def __init__(self, padding=32):
+        self.padding = padding
+        self._last: Dict[str, MatchResult] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def last(self, template_path) -> Optional[MatchResult]:
+        return self._last.get(template_path)
+
+    def roi_for(self, template_path, screen_shape):
+        """
+        Calcula la región de búsqueda alrededor de la última coincidencia.
+
+        Args:
+            template_path: Ruta de la plantilla.
+            screen_shape: Dimensiones de la captura (alto, ancho).
+
+        Returns:
+            tuple: (x1, y1, x2, y2) o None si la plantilla no tiene ubicación previa.
+        """
+        last = self._last.get(template_path)
+        if last is None:
+            return None
+        height, width = screen_shape[:2]
+        x1 = max(0, last.x - self.padding)
+        y1 = max(0, last.y - self.padding)
+        x2 = min(width, last.x + last.width + self.padding)
+        y2 = min(height, last.y + last.height + self.padding)
+        if x2 <= x1 or y2 <= y1:
+            return None
+        return x1, y1, x2, y2
+
+    def remember(self, match: MatchResult):
+        with self._lock:
+            self._last[match.template_path] = match
+
+    def forget(self, template_path=None):
+        with self._lock:
+            if template_path is None:
+                self._last.clear()
+            else:
+                self._last.pop(template_path, None)
+
+    def record(self, template_path, outcome):
+        with self._lock:
+            stats = self._stats.setdefault(
+                template_path, dict.fromkeys(self.OUTCOMES, 0)
+            )
+            stats[outcome] += 1
+
+    def get_stats(self):
+        """
+        Devuelve los contadores de aciertos/fallos por plantilla y el total.
+
+        Returns:
+            dict: {ruta: {contador: valor}, "total": {...}} con los contadores de OUTCOMES.
+        """
+        with self._lock:
+            stats = {path: dict(values) for path, values in self._stats.items()}
+        total = dict.fromkeys(self.OUTCOMES, 0)
+        for values in stats.values():
+            for outcome in self.OUTCOMES:
+                total[outcome] += values[outcome]
+        stats["total"] = total
+        return stats
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats.clear()
+
+
+PREPROCESSORS = OrderedDict(
+    [
+        ("raw", None),
+        ("equalize", cv2.equalizeHist),
+        ("blur", lambda img: cv2.GaussianBlur(img, (3, 3), 0)),
+        ("canny", lambda img: cv2.Canny(img, 100, 200)),
+    ]
+)
+
+ADVANCED_SCALES = (0.8, 0.9, 1.0, 1.1, 1.2)
+
+PYRAMID_FACTORS = (4, 2)
+MIN_PYRAMID_SIZE = 12
+
+
+POOL_WORKERS = min(4, os.cpu_count() or 1)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Pool de hilos compartido para evaluar combinaciones de plantillas en paralelo."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=POOL_WORKERS,
+                thread_name_prefix="template-matcher",
+            )
+        return _executor
+
+
+class ScreenPyramid:
+    """Captura en escala de grises con sus versiones reducidas, calculadas bajo demanda."""
+
+    def __init__(self, gray):
+        self.gray = gray
+        self._levels = {1: gray}
+        self._processed = {"raw": gray}
+
+    @property
+    def shape(self):
+        return self.gray.shape
+
+    def level(self, factor):
+        """Devuelve la captura reducida por el factor indicado (1 = resolución completa)."""
+        reduced = self._levels.get(factor)
+        if reduced is None:
+            height, width = self.gray.shape[:2]
+            reduced = cv2.resize(
+                self.gray,
+                (max(1, width // factor), max(1, height // factor)),
+                interpolation=cv2.INTER_AREA,
+            )
+            self._levels[factor] = reduced
+        return reduced
+
+    def preprocessed(self, variant):
+        """Devuelve la captura completa con el pre-procesamiento indicado, calculado una sola vez."""
+        processed = self._processed.get(variant)
+        if processed is None:
+            processed = PREPROCESSORS[variant](self.gray)
+            self._processed[variant] = processed
+        return processed
+
+
+def as_pyramid(screen):
+    return screen if isinstance(screen, ScreenPyramid) else ScreenPyramid(screen)
+
+
+def pyramid_factor(entry, scales):
+    """
+    Elige el mayor factor de reducción con el que la plantilla sigue siendo reconocible.
+
+    Returns:
+        int: Factor de reducción, o 1 si la plantilla es demasiado pequeña para la pirámide.
+    """
+    smallest = min(entry.gray.shape[:2]) * min(scales)
+    for factor in PYRAMID_FACTORS:
+        if smallest / factor >= MIN_PYRAMID_SIZE:
+            return factor
+    return 1
+
+
+def coarse_candidates(pyramid, entry, scales, factor, min_score, top_k=3):
+    """
+    Busca los picos más prometedores sobre la captura reducida.
+
+    Args:
+        pyramid: ScreenPyramid de la captura.
+        entry: TemplateEntry con la plantilla.
+        scales: Escalas a probar.
+        factor: Factor de reducción de la captura.
+        min_score: Confianza mínima (en la captura reducida) para considerar un pico.
+        top_k: Cantidad máxima de candidatos a devolver.
+
+    Returns:
+        list: Tuplas (confianza, escala, (x, y)) en coordenadas reducidas, de mayor a menor.
+    """
+    screen = pyramid.level(factor)
+    peaks = []
+    for scale in scales:
+        template = entry.scaled(
+            scale / factor, f"raw@{factor}", interpolation=cv2.INTER_AREA
+        )
+        if template.shape[0] > screen.shape[0] or template.shape[1] > screen.shape[1]:
+            continue
+        result = cv2.matchTemplate(screen, template, cv2.TM_CCOEFF_NORMED)
+        half_h, half_w = template.shape[0] // 2, template.shape[1] // 2
+        for _ in range(top_k):
+            _, max_val, _, max_loc = cv2.minMaxLoc(result)
+            if max_val < min_score:
+                break
+            peaks.append((float(max_val), float(scale), max_loc))
+            x, y = max_loc
+            result[
+                max(0, y - half_h): y + half_h + 1, max(0, x - half_w): x + half_w + 1
+            ] = -1
+
+    peaks.sort(key=lambda peak: peak[0], reverse=True)
+    candidates = []
+    for peak in peaks:
+        x, y = peak[2]
+        if any(abs(x - c[2][0]) <= 2 and abs(y - c[2][1]) <= 2 for c in candidates):
+            continue
+        candidates.append(peak)
+        if len(candidates) == top_k:
+            break
+    return candidates
+
+
+def refine_candidates(
+    pyramid,
+    entry,
+    candidates,
+    scales,
+    factor,
+    confidence,
+    variants=("raw",),
+    stop_at_first=True,
+    executor=None,
+):
+    """
+    Confirma los candidatos a resolución completa en una región pequeña alrededor de cada uno.
+
+    La confianza devuelta es la de cv2.matchTemplate a resolución completa, igual que en el
+    barrido de escalas tradicional. Con executor, cada combinación de candidato,
+    pre-procesamiento y escala se evalúa en el pool.
+
+    Returns:
+        MatchResult: Mejor coincidencia (puede estar bajo el umbral) o None.
+    """
+    screen = pyramid.gray
+    height, width = screen.shape[:2]
+    ordered = sorted(scales)
+    pad = 2 * factor + 2
+    regions = []
+    for _, scale, (cx, cy) in candidates:
+        index = ordered.index(scale)
+        nearby = [scale] + [
+            s for s in ordered[max(0, index - 1): index + 2] if s != scale
+        ]
+        template_w = int(round(entry.gray.shape[1] * max(nearby)))
+        template_h = int(round(entry.gray.shape[0] * max(nearby)))
+        x1 = max(0, cx * factor - pad)
+        y1 = max(0, cy * factor - pad)
+        x2 = min(width, cx * factor + template_w + pad)
+        y2 = min(height, cy * factor + template_h + pad)
+        regions.append((screen[y1:y2, x1:x2], (x1, y1), nearby))
+
+    processed = {}
+
+    def region_for(index, variant):
+        key = (index, variant)
+        if key not in processed:
+            preprocess = PREPROCESSORS[variant]
+            region = regions[index][0]
+            processed[key] = region if preprocess is None else preprocess(region)
+        return processed[key]
+
+    if executor is not None:
+        for index in range(len(regions)):
+            for variant in variants:
+                region_for(index, variant)
+        jobs = [
+            (
+                match_at_scales,
+                region_for(index, variant),
+                entry,
+                (scale,),
+                confidence,
+                offset,
+                variant,
+                PREPROCESSORS[variant],
+            )
+            for index, (_, offset, nearby) in enumerate(regions)
+            for variant in variants
+            for scale in nearby
+        ]
+        if len(jobs) > 1:
+            return best_in_parallel(executor, jobs, confidence, stop_at_first)
+
+    best = None
+    for index, (_, offset, nearby) in enumerate(regions):
+        for variant in variants:
+            match = match_at_scales(
+                region_for(index, variant),
+                entry,
+                nearby,
+                confidence,
+                offset=offset,
+                variant=variant,
+                preprocess=PREPROCESSORS[variant],
+                stop_at_first=stop_at_first,
+            )
+            if match is not None and (best is None or match.confidence > best.confidence):
+                best = match
+            if stop_at_first and best is not None and best.confidence >= confidence:
+                return best
+    return best
+
+
+def best_in_parallel(executor, jobs, confidence, stop_at_first=False):
+    """
+    Ejecuta trabajos de match_at_scales en el pool y se queda con la mejor coincidencia.
+
+    cv2.matchTemplate libera el GIL, por lo que los trabajos corren en paralelo. Con
+    stop_at_first, en cuanto uno supera el umbral se cancelan los pendientes y se
+    devuelve la mejor coincidencia entre los trabajos que ya habían terminado.
+
+    Args:
+        executor: Pool de hilos.
+        jobs: Tuplas (función, *argumentos) que devuelven un MatchResult o None.
+        confidence: Umbral de confianza.
+        stop_at_first: Devolver la primera coincidencia sobre el umbral.
+
+    Returns:
+        MatchResult: Mejor coincidencia (puede estar bajo el umbral) o None.
+    """
+    futures = [executor.submit(*job) for job in jobs]
+    best = None
+    try:
+        for future in as_completed(futures):
+            match = future.result()
+            if match is not None and (best is None or match.confidence > best.confidence):
+                best = match
+            if stop_at_first and best is not None and best.confidence >= confidence:
+                break
+    finally:
+        for future in futures:
+            future.cancel()
+    for future in futures:
+        if future.done() and not future.cancelled() and future.exception() is None:
+            match = future.result()
+            if match is not None and (best is None or match.confidence > best.confidence):
+                best = match
+    return best
+
+
+class ScaleCalibration:
+    """
+    Escala de pantalla detectada por resolución, persistida en disco entre ejecuciones.
+
+    La escala solo se fija con los votos de calibrate(): hacen falta min_hits
+    coincidencias en la misma escala que reúnan al menos min_share del peso de todos
+    los votos de esa resolución. Si la escala fijada falla max_misses veces seguidas
+    (la plantilla apareció en otra escala en el barrido completo) se descarta.
+    """
+
+    _instance = None
+
+    def __init__(self, path=None, min_hits=3, min_share=0.75, max_misses=3):
+        self.path = path or os.path.join(os.getcwd(), "scale_calibration.json")
+        self.min_hits = min_hits
+        self.min_share = min_share
+        self.max_misses = max_misses
+        self._lock = threading.Lock()
+        self._scales = self._load()
+        self._votes: Dict[str, Dict[float, list]] = {}
+        self._misses: Dict[str, int] = {}
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    @staticmethod
+    def resolution_key(shape):
+        return f"{shape[1]}x{shape[0]}"
+
+    def get(self, shape) -> Optional[float]:
+        """Devuelve la escala calibrada para la resolución de la captura, si existe."""
+        return self._scales.get(self.resolution_key(shape))
+
+    def vote(self, shape, scale, weight=1.0) -> Optional[float]:
+        """
+        Registra una coincidencia de calibración y fija la escala si ya hay consenso.
+
+        Args:
+            shape: Forma de la captura.
+            scale: Escala en la que coincidió la plantilla.
+            weight: Peso del voto (la confianza de la coincidencia).
+
+        Returns:
+            float: Escala fijada para la resolución, o None si aún no hay consenso.
+        """
+        key = self.resolution_key(shape)
+        with self._lock:
+            votes = self._votes.setdefault(key, {})
+            hits, total = votes.get(round(float(scale), 4), [0, 0.0])
+            votes[round(float(scale), 4)] = [hits + 1, total + weight]
+            best, (hits, total) = max(votes.items(), key=lambda item: item[1][1])
+            share = total / sum(peso for _, peso in votes.values())
+        if hits < self.min_hits or share < self.min_share:
+            logger.debug(
+                f"Calibración de {key}: escala {best:.3f} con {hits} coincidencias "
+                f"({share:.0%} de los votos), aún sin consenso."
+            )
+            return None
+        self.lock_in(shape, best)
+        return best
+
+    def lock_in(self, shape, scale):
+        """Fija la escala para la resolución de la captura y la guarda en disco."""
+        key = self.resolution_key(shape)
+        with self._lock:
+            self._scales[key] = round(float(scale), 4)
+            self._votes.pop(key, None)
+            self._misses.pop(key, None)
+            self._save()
+        logger.info(f"Escala de pantalla calibrada para {key}: {scale:.3f}")
+
+    def record_hit(self, shape):
+        """La escala fijada volvió a coincidir."""
+        with self._lock:
+            self._misses.pop(self.resolution_key(shape), None)
+
+    def record_miss(self, shape):
+        """
+        Una plantilla no coincidió en la escala fijada pero sí en otra; tras max_misses
+        fallas seguidas la escala se descarta.
+        """
+        key = self.resolution_key(shape)
+        with self._lock:
+            misses = self._misses.get(key, 0) + 1
+            self._misses[key] = misses
+        if misses >= self.max_misses and self.get(shape) is not None:
+            logger.warning(
+                f"La escala calibrada para {key} falló {misses} veces seguidas, se descarta."
+            )
+            self.clear(shape)
+
+    def clear(self, shape=None):
+        """Descarta la escala fijada (y los votos) de una resolución, o de todas."""
+        with self._lock:
+            if shape is None:
+                self._scales.clear()
+                self._votes.clear()
+                self._misses.clear()
+            else:
+                key = self.resolution_key(shape)
+                self._scales.pop(key, None)
+                self._votes.pop(key, None)
+                self._misses.pop(key, None)
+            self._save()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                return {k: float(v) for k, v in json.load(file).items()}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"No se pudo leer la calibración de escala {self.path}: {e}")
+            return {}
+
+    def _save(self):
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                json.dump(self._scales, file, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"No se pudo guardar la calibración de escala {self.path}: {e}")
+
+
+class TemplateMatcher:
+    """Busca plantillas en capturas usando la caché, la última ubicación conocida y el barrido de escalas."""
+
+    _instance = None
+
+    def __init__(
+        self,
+        cache=None,
+        memory=None,
+        use_pyramid=True,
+        top_k=3,
+        calibration=None,
+        parallel=True,
+    ):
+        self.cache = cache or TemplateCache.get_instance()
+        self.memory = memory or LocationMemory()
+        self.use_pyramid = use_pyramid
+        self.top_k = top_k
+        self.calibration = calibration
+        # Con un solo núcleo el pool solo agrega costo.
+        self.parallel = parallel and POOL_WORKERS > 1
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = cls(calibration=ScaleCalibration.get_instance())
+        return cls._instance
+
+    def find(
+        self, screen, template_path, confidence=0.8, scales=DEFAULT_SCALES, sweep=True
+    ):
+        """
+        Busca una plantilla primero en la región de su última coincidencia y luego en toda la pantalla.
+
+        Args:
+            screen: Captura completa en escala de grises (np.ndarray o ScreenPyramid).
+            template_path: Ruta de la plantilla.
+            confidence: Umbral de confianza.
+            scales: Escalas a probar en la búsqueda completa.
+            sweep: Si es False solo se prueban la última ubicación y la escala calibrada,
+                sin barrido de escalas (para sondeos frecuentes).
+
+        Returns:
+            MatchResult: Mejor coincidencia (puede estar bajo el umbral) o None. Sin
+            barrido solo se devuelven coincidencias sobre el umbral.
+        """
+        pyramid = as_pyramid(screen)
+        entry = self.cache.get(template_path)
+        match = self._search_roi(pyramid.gray, entry, confidence, ("raw",))
+        if match is not None:
+            return match
+
+        match = self._search_calibrated(
+            pyramid, entry, confidence, ("raw",), True, scales
+        )
+        if match is not None or not sweep:
+            return match
+
+        match = self._sweep(
+            pyramid,
+            entry,
+            self._ordered_scales(template_path, scales),
+            confidence,
+            ("raw",),
+            stop_at_first=True,
+        )
+        return self._conclude(
+            template_path, match, confidence, pyramid.shape,
+            self._calibrated_scale(pyramid.shape, scales),
+        )
+
+    def find_advanced(
+        self, screen, template_path, confidence=0.90, scales=ADVANCED_SCALES
+    ):
+        """
+        Busca una plantilla combinando pre-procesamientos y escalas.
+
+        En cuanto una combinación supera el umbral se cancelan las pendientes; se devuelve
+        la de mayor confianza entre las ya evaluadas.
+
+        Args:
+            screen: Captura completa en escala de grises (np.ndarray o ScreenPyramid).
+            template_path: Ruta de la plantilla.
+            confidence: Umbral de confianza.
+            scales: Escalas a probar en la búsqueda completa.
+
+        Returns:
+            MatchResult: Mejor coincidencia (puede estar bajo el umbral) o None.
+        """
+        pyramid = as_pyramid(screen)
+        entry = self.cache.get(template_path)
+        match = self._search_roi(pyramid.gray, entry, confidence, tuple(PREPROCESSORS))
+        if match is not None:
+            return match
+
+        match = self._search_calibrated(
+            pyramid, entry, confidence, tuple(PREPROCESSORS), True, scales
+        )
+        if match is not None:
+            return match
+
+        match = self._sweep(
+            pyramid, entry, tuple(scales), confidence, tuple(PREPROCESSORS),
+            stop_at_first=True,
+        )
+        return self._conclude(
+            template_path, match, confidence, pyramid.shape,
+            self._calibrated_scale(pyramid.shape, scales),
+        )
+
+    def calibrate(self, screen, template_paths, confidence=0.8, scales=DEFAULT_SCALES):
+        """
+        Detecta la escala de pantalla con las plantillas visibles.
+
+        Cada plantilla visible vota por la escala en la que coincidió mejor, ponderada por su
+        confianza. Con calibración persistente los votos se acumulan entre llamadas y la
+        escala se fija solo cuando hay consenso (ver ScaleCalibration).
+
+        Args:
+            screen: Captura completa en escala de grises (np.ndarray o ScreenPyramid).
+            template_paths: Rutas de las plantillas a probar.
+            confidence: Confianza mínima para que una plantilla vote.
+            scales: Escalas candidatas.
+
+        Returns:
+            float: Escala calibrada, o None si aún no hay suficientes coincidencias
+            consistentes.
+        """
+        pyramid = as_pyramid(screen)
+        votes: Dict[float, float] = {}
+        for template_path in template_paths:
+            try:
+                entry = self.cache.get(template_path)
+            except FileNotFoundError as e:
+                logger.warning(str(e))
+                continue
+            match = self._sweep(
+                pyramid, entry, tuple(scales), confidence, ("raw",), stop_at_first=False
+            )
+            if match is not None and match.confidence >= confidence:
+                votes[match.scale] = votes.get(match.scale, 0.0) + match.confidence
+                logger.debug(
+                    f"Calibración: {os.path.basename(template_path)} coincide en escala "
+                    f"{match.scale:.3f} con confianza {match.confidence:.2f}"
+                )
+
+        if not votes:
+            logger.info("Calibración de escala: ninguna plantilla visible en pantalla.")
+            return None
+        if self.calibration is None:
+            return max(votes, key=votes.get)
+        scale = None
+        for voted, weight in votes.items():
+            scale = self.calibration.vote(pyramid.shape, voted, weight) or scale
+        return scale
+
+    def find_many(
+        self, screen, template_paths, confidence=0.8, scales=None, advanced=False
+    ):
+        """
+        Evalúa varias plantillas contra una misma captura.
+
+        La captura reducida de la pirámide se calcula una sola vez y se comparte entre
+        todas las plantillas.
+
+        Args:
+            screen: Captura completa en escala de grises (np.ndarray o ScreenPyramid).
+            template_paths: Rutas de las plantillas.
+            confidence: Umbral de confianza.
+            scales: Escalas a probar (por defecto las de cada modo de búsqueda).
+            advanced: Usar la búsqueda con pre-procesamientos.
+
+        Returns:
+            list: MatchResult de cada plantilla que superó el umbral, en el orden recibido.
+        """
+        pyramid = as_pyramid(screen)
+        hits = []
+        for template_path in template_paths:
+            if advanced:
+                match = self.find_advanced(
+                    pyramid, template_path, confidence, scales or ADVANCED_SCALES
+                )
+            else:
+                match = self.find(
+                    pyramid, template_path, confidence, scales or DEFAULT_SCALES
+                )
+            if match is not None and match.confidence >= confidence:
+                hits.append(match)
+        return hits
+
+    def _sweep(self, pyramid, entry, scales, confidence, variants, stop_at_first):
+        """
+        Barrido de escalas sobre toda la pantalla.
+
+        Con la pirámide activa se buscan candidatos en la captura reducida (sin
+        pre-procesar) y solo se confirman a resolución completa las regiones candidatas;
+        con varios pre-procesamientos la confirmación también se reparte en el pool.
+        Si ningún candidato supera el umbral se repite el barrido completo: una plantilla
+        de bajo contraste o de trazos finos, o una que solo coincide pre-procesada, puede
+        no dejar ningún pico en la captura reducida. Si la plantilla es muy pequeña para
+        reducirla se hace directamente el barrido completo.
+        """
+        factor = pyramid_factor(entry, scales) if self.use_pyramid else 1
+        if factor > 1:
+            candidates = coarse_candidates(
+                pyramid,
+                entry,
+                scales,
+                factor,
+                max(0.3, confidence - 0.3),
+                self.top_k,
+            )
+            match = refine_candidates(
+                pyramid, entry, candidates, scales, factor, confidence, variants,
+                stop_at_first,
+                executor=get_executor() if self.parallel and len(variants) > 1 else None,
+            )
+            if match is not None and match.confidence >= confidence:
+                return match
+            logger.debug(
+                f"Sin coincidencia en la pirámide para {os.path.basename(entry.path)}, "
+                "barrido completo."
+            )
+            full = self._sweep_full(
+                pyramid, entry, scales, confidence, variants, stop_at_first
+            )
+            if match is None or (full is not None and full.confidence > match.confidence):
+                return full
+            return match
+
+        return self._sweep_full(pyramid, entry, scales, confidence, variants, stop_at_first)
+
+    def _sweep_full(self, pyramid, entry, scales, confidence, variants, stop_at_first):
+        """Barrido tradicional a resolución completa, en paralelo si está activo."""
+        if self.parallel and len(variants) * len(scales) > 1:
+            return self._sweep_parallel(
+                pyramid, entry, scales, confidence, variants, stop_at_first
+            )
+
+        best = None
+        for variant in variants:
+            preprocess = PREPROCESSORS[variant]
+            processed = pyramid.preprocessed(variant)
+            match = match_at_scales(
+                processed,
+                entry,
+                scales,
+                confidence,
+                variant=variant,
+                preprocess=preprocess,
+                stop_at_first=stop_at_first,
+            )
+            if match is not None and (best is None or match.confidence > best.confidence):
+                best = match
+            if stop_at_first and best is not None and best.confidence >= confidence:
+                break
+        return best
+
+    def _sweep_parallel(
+        self, pyramid, entry, scales, confidence, variants, stop_at_first=False
+    ):
+        """Evalúa cada combinación de pre-procesamiento y escala en el pool compartido."""
+        executor = get_executor()
+        list(executor.map(pyramid.preprocessed, variants))
+        jobs = [
+            (
+                match_at_scales,
+                pyramid.preprocessed(variant),
+                entry,
+                (scale,),
+                confidence,
+                (0, 0),
+                variant,
+                PREPROCESSORS[variant],
+            )
+            for variant in variants
+            for scale in scales
+        ]
+        return best_in_parallel(executor, jobs, confidence, stop_at_first)
+
+    def _search_roi(self, screen_gray, entry, confidence, variants):
+        last = self.memory.last(entry.path)
+        roi = self.memory.roi_for(entry.path, screen_gray.shape)
+        if last is None or roi is None:
+            return None
+
+        variant = last.variant if last.variant in variants else "raw"
+        preprocess = PREPROCESSORS[variant]
+        x1, y1, x2, y2 = roi
+        region = screen_gray[y1:y2, x1:x2]
+        if preprocess is not None:
+            region = preprocess(region)
+
+        match = match_at_scales(
+            region,
+            entry,
+            (last.scale,),
+            confidence,
+            offset=(x1, y1),
+            variant=variant,
+            preprocess=preprocess,
+        )
+        if match is not None and match.confidence >= confidence:
+            self.memory.record(entry.path, "roi_hits")
+            self.memory.remember(match)
+            return match
+        self.memory.record(entry.path, "roi_misses")
+        return None
+
+    def _calibrated_scale(self, shape, scales):
+        """Escala calibrada para la resolución, si cae dentro de las escalas pedidas."""
+        calibrated = self.calibration.get(shape) if self.calibration else None
+        if calibrated is None or not min(scales) - 1e-3 <= calibrated <= max(scales) + 1e-3:
+            return None
+        return calibrated
+
+    def _search_calibrated(
+        self, pyramid, entry, confidence, variants, stop_at_first, scales
+    ):
+        calibrated = self._calibrated_scale(pyramid.shape, scales)
+        if calibrated is None:
+            return None
+
+        match = self._sweep(
+            pyramid, entry, (calibrated,), confidence, variants, stop_at_first
+        )
+        if match is not None and match.confidence >= confidence:
+            self.memory.record(entry.path, "calibrated_hits")
+            self.memory.remember(match)
+            self.calibration.record_hit(pyramid.shape)
+            return match
+        self.memory.record(entry.path, "calibrated_misses")
+        logger.debug(
+            f"Confianza bajo el umbral en la escala calibrada {calibrated:.3f}, "
+            "repitiendo el barrido de escalas."
+        )
+        return None
+
+    def _ordered_scales(self, template_path, scales):
+        last = self.memory.last(template_path)
+        if last is None:
+            return tuple(scales)
+        return (last.scale,) + tuple(
+            s for s in scales if round(s, 4) != round(last.scale, 4)
+        )
+
+    def _conclude(self, template_path, match, confidence, screen_shape, calibrated=None):
+        if match is not None and match.confidence >= confidence:
+            self.memory.record(template_path, "full_hits")
+            self.memory.remember(match)
+            if calibrated is not None and round(match.scale, 4) != round(calibrated, 4):
+                self.calibration.record_miss(screen_shape)
+        else:
+            self.memory.record(template_path, "full_misses")
+        return match
+
+
+def _legacy_lookup(screen_gray, template_path, scales):
+    template = cv2.imread(template_path, cv2.IMREAD_GRAYSCALE)
+    best = 0.0
+    for scale in scales:
+        resized = cv2.resize(template, None, fx=scale, fy=scale)
+        result = cv2.matchTemplate(screen_gray, resized, cv2.TM_CCOEFF_NORMED)
+        best = max(best, cv2.minMaxLoc(result)[1])
+    return best
+
+
+def _cached_lookup(screen_gray, template_path, scales):
+    entry = TemplateCache.get_instance().get(template_path, scales)
+    best = 0.0
+    for scale in scales:
+        result = cv2.matchTemplate(
+            screen_gray, entry.scaled(scale), cv2.TM_CCOEFF_NORMED
+        )
+        best = max(best, cv2.minMaxLoc(result)[1])
+    return best
+
+
+def _synthetic_screen(width=1920, height=1080, seed=0, return_boxes=False):
+    """Genera una captura sintética con botones y texto para pruebas de rendimiento."""
+    words = ("Nuevo", "Cerrar", "Asociar", "Aceptar", "Cuenta", "Generar", "Filtro", "Sí")
+    rng = np.random.default_rng(seed)
+    screen = np.full((height, width), 236, dtype=np.uint8)
+    boxes = []
+    for i in range(60):
+        box_w = int(rng.integers(90, 220))
+        box_h = int(rng.integers(24, 44))
+        x = int(rng.integers(0, width - box_w - 4))
+        y = int(rng.integers(0, height - box_h - 4))
+        boxes.append((x, y, box_w, box_h))
+        shade = int(rng.integers(150, 220))
+        cv2.rectangle(screen, (x, y), (x + box_w, y + box_h), shade, -1)
+        cv2.rectangle(screen, (x, y), (x + box_w, y + box_h), 90, 1)
+        cv2.circle(screen, (x + 12, y + box_h // 2), 6, int(rng.integers(0, 120)), -1)
+        label = f"{words[int(rng.integers(len(words)))]} {i}"
+        cv2.putText(
+            screen, label, (x + 24, y + box_h // 2 + 5),
+            cv2.FONT_HERSHEY_SIMPLEX, 0.5, 20, 1, cv2.LINE_AA,
+        )
+    if return_boxes:
+        return screen, boxes
+    return screen
+
+
+def _time_per_call(func, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def _benchmark_recorded(frames_dir, template_paths):
+    """Compara búsqueda completa contra búsqueda con memoria de ubicación sobre capturas grabadas."""
+    frames = [
+        cv2.imread(os.path.join(frames_dir, name), cv2.IMREAD_GRAYSCALE)
+        for name in sorted(os.listdir(frames_dir))
+        if name.lower().endswith(".png")
+    ]
+    frames = [frame for frame in frames if frame is not None]
+    if not frames:
+        print(f"No se encontraron capturas PNG en {frames_dir}")
+        return
+
+    matcher = TemplateMatcher(memory=LocationMemory())
+    calls = len(frames) * len(template_paths)
+    full_ms = _time_per_call(
+        lambda: [
+            _cached_lookup(frame, path, DEFAULT_SCALES)
+            for frame in frames
+            for path in template_paths
+        ],
+        1,
+    ) / calls
+    roi_ms = _time_per_call(
+        lambda: [
+            matcher.find(frame, path) for frame in frames for path in template_paths
+        ],
+        1,
+    ) / calls
+
+    advanced_ms = {}
+    for name, parallel in (("secuencial", False), ("paralela", True)):
+        advanced = TemplateMatcher(
+            memory=LocationMemory(), use_pyramid=False, parallel=parallel
+        )
+        advanced_ms[name] = _time_per_call(
+            lambda: [
+                advanced.find_advanced(frame, path)
+                for frame in frames
+                for path in template_paths
+            ],
+            1,
+        ) / calls
+
+    print(f"Capturas: {len(frames)}, plantillas: {len(template_paths)}")
+    print(f"    búsqueda completa:        {full_ms:8.3f} ms por llamada")
+    print(f"    con memoria de ubicación: {roi_ms:8.3f} ms por llamada")
+    for name, elapsed in advanced_ms.items():
+        print(f"    avanzada {name:10s}:    {elapsed:8.3f} ms por llamada")
+    for path, stats in matcher.memory.get_stats().items():
+        print(f"    {os.path.basename(path)}: {stats}")
+
+
+def _benchmark_synthetic(repeats=10):
+    import tempfile
+
+    screen = _synthetic_screen()
+    template = screen[500:536, 800:961].copy()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        template_path = os.path.join(tmp_dir, "boton.png")
+        cv2.imwrite(template_path, template)
+        TemplateCache.get_instance().get(template_path, DEFAULT_SCALES)
+
+        def legacy_prepare():
+            gray = cv2.imread(template_path, cv2.IMREAD_GRAYSCALE)
+            return [cv2.resize(gray, None, fx=s, fy=s) for s in DEFAULT_SCALES]
+
+        prep_legacy = _time_per_call(legacy_prepare, repeats * 10)
+        prep_cached = _time_per_call(
+            lambda: [
+                TemplateCache.get_instance().get(template_path).scaled(s)
+                for s in DEFAULT_SCALES
+            ],
+            repeats * 10,
+        )
+        total_legacy = _time_per_call(
+            lambda: _legacy_lookup(screen, template_path, DEFAULT_SCALES), repeats
+        )
+        total_cached = _time_per_call(
+            lambda: _cached_lookup(screen, template_path, DEFAULT_SCALES), repeats
+        )
+        matcher = TemplateMatcher(memory=LocationMemory())
+        matcher.find(screen, template_path)
+        total_roi = _time_per_call(lambda: matcher.find(screen, template_path), repeats)
+
+    print("Preparación de plantilla por llamada (imread + 10 resize):")
+    print(f"    sin caché: {prep_legacy:8.3f} ms")
+    print(f"    con caché: {prep_cached:8.3f} ms")
+    print("Búsqueda completa por llamada en captura sintética 1920x1080:")
+    print(f"    sin caché:                 {total_legacy:8.3f} ms")
+    print(f"    con caché:                 {total_cached:8.3f} ms")
+    print(f"    con memoria de ubicación:  {total_roi:8.3f} ms")
+    print(f"    contadores: {matcher.memory.get_stats()['total']}")
+
+
+def _pyramid_trial(trial, tmp_dir, distort=None):
+    """Arma una captura sintética escalada y la plantilla de su último botón."""
+    screen, boxes = _synthetic_screen(seed=trial, return_boxes=True)
+    box_x, box_y, box_w, box_h = boxes[-1]
+    x, y = max(0, box_x - 2), max(0, box_y - 2)
+    template_path = os.path.join(tmp_dir, f"boton_{trial}.png")
+    cv2.imwrite(template_path, screen[y: y + box_h + 4, x: x + box_w + 4])
+
+    screen_scale = DEFAULT_SCALES[(1, 4, 7)[trial % 3]]
+    scaled_screen = cv2.resize(screen, None, fx=screen_scale, fy=screen_scale)
+    if distort is not None:
+        scaled_screen = distort(scaled_screen)
+    return scaled_screen, template_path, (x * screen_scale, y * screen_scale)
+
+
+def _is_hit(match, expected, confidence):
+    return (
+        match is not None
+        and match.confidence >= confidence
+        and abs(match.x - expected[0]) <= 4
+        and abs(match.y - expected[1]) <= 4
+    )
+
+
+def _gamma(screen, gamma=2.2):
+    """Distorsión no lineal de brillo: el barrido sin pre-procesar deja de coincidir."""
+    table = (np.linspace(0, 1, 256) ** gamma * 255).astype(np.uint8)
+    return cv2.LUT(screen, table)
+
+
+def _low_contrast(screen, contrast=0.08):
+    """Reduce el contraste y agrega ruido: los bordes casi desaparecen al reducir la captura."""
+    rng = np.random.default_rng(1)
+    out = screen.astype(np.float32) * contrast + 120 + rng.normal(0, 1.5, screen.shape)
+    return np.clip(out, 0, 255).astype(np.uint8)
+
+
+def _benchmark_pyramid(trials=24):
+    """
+    Compara el barrido tradicional contra la pirámide en capturas sintéticas escaladas.
+
+    Cada prueba recorta el último botón dibujado (nunca queda tapado), escala la captura
+    a una de las escalas del barrido y verifica que la coincidencia caiga en la posición
+    esperada. Se hace con find (sin pre-procesar), con find sobre capturas de bajo
+    contraste con ruido y con find_advanced sobre capturas con el brillo distorsionado,
+    donde solo coinciden los pre-procesamientos; "perdidos" cuenta los aciertos del
+    barrido que la pirámide no encontró.
+    """
+    import tempfile
+
+    modes = (
+        ("find", None, "find", 0.8),
+        ("bajo contraste", _low_contrast, "find", 0.8),
+        ("avanzada", _gamma, "find_advanced", 0.9),
+    )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for label, distort, method, confidence in modes:
+            results = {"barrido": [0, 0.0], "pirámide": [0, 0.0]}
+            lost = 0
+            for trial in range(trials):
+                screen, template_path, expected = _pyramid_trial(trial, tmp_dir, distort)
+                hits = {}
+                for name, use_pyramid in (("barrido", False), ("pirámide", True)):
+                    matcher = TemplateMatcher(
+                        memory=LocationMemory(), use_pyramid=use_pyramid
+                    )
+                    start = time.perf_counter()
+                    if method == "find":
+                        match = matcher.find(screen, template_path, confidence)
+                    else:
+                        match = matcher.find_advanced(screen, template_path, confidence)
+                    results[name][1] += (time.perf_counter() - start) * 1000
+                    hits[name] = _is_hit(match, expected, confidence)
+                    results[name][0] += hits[name]
+                lost += hits["barrido"] and not hits["pirámide"]
+
+            print(f"Precisión y tiempo ({label}) en {trials} capturas sintéticas escaladas:")
+            for name, (count, elapsed) in results.items():
+                print(
+                    f"    {name:9s}: {count}/{trials} aciertos, "
+                    f"{elapsed / trials:8.3f} ms por llamada"
+                )
+            print(f"    perdidos : {lost}")
+            assert lost == 0, f"La pirámide perdió {lost} aciertos del barrido ({label})"
+
+
+def _benchmark_advanced(trials=6):
+    """
+    Compara la búsqueda avanzada secuencial contra la paralela, con y sin pirámide.
+
+    Se usan capturas sin distorsión (coincide el primer pre-procesamiento y el corte
+    temprano cancela el resto) y capturas con el brillo distorsionado (solo coinciden
+    algunos pre-procesamientos). La ganancia del pool depende de los núcleos disponibles.
+    """
+    import tempfile
+
+    print(
+        f"Búsqueda avanzada (4 pre-procesamientos x 5 escalas), {trials} capturas, "
+        f"{os.cpu_count()} CPU, {POOL_WORKERS} hilos:"
+    )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for label, distort in (("sin distorsión", None), ("brillo distorsionado", _gamma)):
+            results = {}
+            for trial in range(trials):
+                screen, template_path, expected = _pyramid_trial(
+                    100 + trial, tmp_dir, distort
+                )
+                for use_pyramid in (False, True):
+                    for parallel in (False, True):
+                        name = (
+                            f"{'pirámide' if use_pyramid else 'barrido'} "
+                            f"{'paralela' if parallel else 'secuencial'}"
+                        )
+                        matcher = TemplateMatcher(
+                            memory=LocationMemory(), use_pyramid=use_pyramid,
+                            parallel=parallel,
+                        )
+                        start = time.perf_counter()
+                        match = matcher.find_advanced(screen, template_path)
+                        elapsed = (time.perf_counter() - start) * 1000
+                        hits, total = results.get(name, (0, 0.0))
+                        results[name] = (
+                            hits + _is_hit(match, expected, 0.9), total + elapsed
+                        )
+
+            print(f"  {label}:")
+            for name, (hits, elapsed) in results.items():
+                print(
+                    f"    {name:19s}: {hits}/{trials} aciertos, "
+                    f"{elapsed / trials:8.3f} ms por llamada"
+                )
+
+
+def _check_quick_find(repeats=10):
+    """Compara un sondeo sin barrido contra find completo cuando la plantilla no está."""
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        screen, template_path, expected = _pyramid_trial(1, tmp_dir)
+        matcher = TemplateMatcher(memory=LocationMemory())
+        assert matcher.find(screen, template_path, sweep=False) is None
+        assert _is_hit(matcher.find(screen, template_path), expected, 0.8)
+        assert _is_hit(matcher.find(screen, template_path, sweep=False), expected, 0.8)
+
+        ausente = np.full_like(screen, 236)
+        rapido = _time_per_call(
+            lambda: matcher.find(ausente, template_path, sweep=False), repeats
+        )
+        completo = _time_per_call(lambda: matcher.find(ausente, template_path), repeats)
+    print(
+        f"Sondeo con la plantilla ausente: sin barrido {rapido:.3f} ms, "
+        f"completo {completo:.3f} ms por llamada"
+    )
+
+
+def _check_calibration():
+    """Verifica que la escala solo se fije con consenso y se descarte tras fallar."""
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        calibration = ScaleCalibration(os.path.join(tmp_dir, "scale_calibration.json"))
+        shape = (1080, 1920)
+        assert calibration.vote(shape, 1.25, 0.95) is None
+        assert calibration.vote(shape, 1.0, 0.81) is None
+        assert calibration.vote(shape, 1.25, 0.9) is None
+        assert calibration.vote(shape, 1.25, 0.92) == 1.25
+
+        disputada = (1080, 2560)
+        for scale in (1.25, 1.0, 1.25, 1.0, 1.25):
+            assert calibration.vote(disputada, scale, 0.9) is None
+        assert calibration.get(disputada) is None
+        assert ScaleCalibration(calibration.path).get(shape) == 1.25
+        for _ in range(calibration.max_misses):
+            calibration.record_miss(shape)
+        assert calibration.get(shape) is None
+        assert ScaleCalibration(calibration.path).get(shape) is None
+    print("Calibración por consenso y descarte tras fallas: OK")
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 2:
+        _benchmark_recorded(sys.argv[1], sys.argv[2:])
+    else:
+        _check_calibration()
+        _check_quick_find()
+        _benchmark_synthetic()
+        _benchmark_pyramid()
+        _benchmark_advanced()
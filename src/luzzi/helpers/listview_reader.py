@@ -0,0 +1,227 @@
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class ListViewReader:
+    """
+    Lector incremental de un SysListView32.
+
+    Cada celda leída con item(i, j).text() es un viaje de ida y vuelta entre procesos,
+    así que el lector guarda los textos de las filas ya leídas y en cada consulta solo
+    lee las filas agregadas desde la anterior. Si el número de elementos baja o la
+    última fila leída cambió de texto (la lista se limpió o se reescribió) vuelve a
+    leer desde el principio. Funciona con cualquier objeto que exponga item_count(),
+    column_count() e item(fila, columna).text().
+
+    mark() recuerda hasta dónde llega la lista en un momento dado; find_first solo
+    revisa las filas posteriores a la marca (todas, si la lista se reinició después).
+    """
+
+    MAX_READERS = 16
+
+    _readers = {}
+    _lock = threading.Lock()
+
+    def __init__(self, listview):
+        self.listview = listview
+        self.rows = []
+        self.mark_index = 0
+        self._column_count = None
+        self.cells_read = 0
+
+    @classmethod
+    def for_control(cls, listview):
+        """
+        Obtiene el lector asociado a un control, reutilizando las filas ya leídas.
+
+        Args:
+            listview: Wrapper del SysListView32 (con handle) u objeto equivalente.
+
+        Returns:
+            ListViewReader: Lector del control.
+        """
+        key = getattr(listview, "handle", None) or id(listview)
+        with cls._lock:
+            reader = cls._readers.get(key)
+            if reader is None:
+                if len(cls._readers) >= cls.MAX_READERS:
+                    cls._readers.clear()
+                reader = cls._readers[key] = cls(listview)
+            else:
+                reader.listview = listview
+            return reader
+
+    @classmethod
+    def forget(cls, listview=None):
+        """Descarta el lector de un control, o todos si no se indica ninguno."""
+        with cls._lock:
+            if listview is None:
+                cls._readers.clear()
+            else:
+                cls._readers.pop(getattr(listview, "handle", None) or id(listview), None)
+
+    def reset(self):
+        self.rows = []
+        self.mark_index = 0
+
+    def mark(self):
+        """Lee la lista actual y marca sus filas como vistas para find_first."""
+        self.snapshot()
+        self.mark_index = len(self.rows)
+
+    def _columns(self):
+        if self._column_count is None:
+            self._column_count = max(1, self.listview.column_count())
+        return self._column_count
+
+    def _read_row(self, index):
+        row = [
+            self.listview.item(index, column).text()
+            for column in range(self._columns())
+        ]
+        self.cells_read += len(row)
+        return row
+
+    def _sync_count(self):
+        count = self.listview.item_count()
+        if count < len(self.rows) or (
+            self.rows and self._read_row(len(self.rows) - 1) != self.rows[-1]
+        ):
+            logger.debug("La lista se reinició, se leerá desde el principio.")
+            self.reset()
+        return count
+
+    def snapshot(self):
+        """
+        Obtiene los textos de todas las filas, leyendo solo las nuevas.
+
+        Returns:
+            list: Lista de filas, cada una con el texto de sus columnas.
+        """
+        count = self._sync_count()
+        for index in range(len(self.rows), count):
+            self.rows.append(self._read_row(index))
+        return list(self.rows)
+
+    def find_first(self, markers, since_mark=True):
+        """
+        Busca el primer mensaje decisivo de la lista, de arriba hacia abajo.
+
+        Las filas ya leídas se revisan en memoria; las nuevas se leen una por una y la
+        lectura se detiene en cuanto aparece un mensaje decisivo.
+
+        Args:
+            markers: Diccionario ordenado {texto a buscar: valor a devolver}.
+            since_mark: Revisar solo las filas posteriores a la última marca.
+
+        Returns:
+            Valor del primer texto encontrado, o None si ninguno aparece.
+        """
+        count = self._sync_count()
+        start = self.mark_index if since_mark else 0
+        for row in self.rows[start:]:
+            value = self._match(row, markers)
+            if value is not None:
+                return value
+        for index in range(len(self.rows), count):
+            row = self._read_row(index)
+            self.rows.append(row)
+            value = self._match(row, markers)
+            if value is not None:
+                return value
+        return None
+
+    @staticmethod
+    def _match(row, markers):
+        for text in row:
+            for marker, value in markers.items():
+                if marker in text:
+                    return value
+        return None
+
+
+class _FakeItem:
+    def __init__(self, listview, text):
+        self._listview = listview
+        self._text = text
+
+    def text(self):
+        self._listview.calls += 1
+        return self._text
+
+
+class _FakeListView:
+    """ListView en memoria que cuenta las lecturas de celdas, para pruebas fuera de Windows."""
+
+    def __init__(self, columns=3):
+        self.columns = columns
+        self.data = []
+        self.calls = 0
+
+    def add(self, *texts):
+        self.data.append(list(texts) + [""] * (self.columns - len(texts)))
+
+    def item_count(self):
+        return len(self.data)
+
+    def column_count(self):
+        return self.columns
+
+    def item(self, row, column):
+        return _FakeItem(self, self.data[row][column])
+
+
+def _legacy_find(listview, markers):
+    for i in range(listview.item_count()):
+        for j in range(listview.column_count()):
+            for marker, value in markers.items():
+                if marker in listview.item(i, j).text():
+                    return value
+    return None
+
+
+if __name__ == "__main__":
+    markers = {"Póliza creada": True, "No se puede guardar": False}
+
+    fake = _FakeListView()
+    reader = ListViewReader(fake)
+    for i in range(5):
+        fake.add(f"Documento {i}", "Procesando")
+    assert reader.find_first(markers) is None
+    fake.add("Documento 5", "Póliza creada")
+    assert reader.find_first(markers) is True
+    assert reader.find_first(markers) is True
+    fake.data = []
+    fake.add("Documento 0", "No se puede guardar el movimiento")
+    assert reader.find_first(markers) is False
+    assert reader.snapshot() == fake.data
+    fake.data[0] = ["Documento 0", "Póliza creada", ""]
+    assert reader.find_first(markers) is True
+    reader.mark()
+    assert reader.find_first(markers) is None
+    assert reader.find_first(markers, since_mark=False) is True
+    fake.add("Documento 1", "No se puede guardar el movimiento")
+    assert reader.find_first(markers) is False
+    reader.mark()
+    fake.data = [["Documento 9", "Póliza creada", ""]]
+    assert reader.find_first(markers) is True
+    print("Pruebas con ListView simulado: OK")
+
+    print("Lecturas de celdas durante 30 consultas mientras crece la lista:")
+    for rows_per_poll in (5, 50):
+        legacy_view, fast_view = _FakeListView(), _FakeListView()
+        reader = ListViewReader(fast_view)
+        start = time.perf_counter()
+        for poll in range(30):
+            for i in range(rows_per_poll):
+                legacy_view.add(f"Documento {poll}-{i}", "Procesando")
+                fast_view.add(f"Documento {poll}-{i}", "Procesando")
+            _legacy_find(legacy_view, markers)
+            reader.find_first(markers)
+        print(
+            f"    {rows_per_poll:2d} filas por consulta: recorrido completo "
+            f"{legacy_view.calls:6d}, incremental {fast_view.calls:6d}"
+        )
@@ -0,0 +1,364 @@
+import os
+import json
+import time
+import atexit
+import logging
+import threading
+from dataclasses import dataclass
+from statistics import median
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WaitResult:
+    """Resultado de una espera: si se cumplió, con qué valor y cuánto tardó."""
+
+    success: bool
+    value: Any = None
+    latency: float = 0.0
+    polls: int = 0
+
+    def __bool__(self):
+        return self.success
+
+
+def element_key(element):
+    """
+    Obtiene una clave estable para un elemento de pywinauto a partir de sus criterios.
+
+    Args:
+        element: WindowSpecification u otro objeto con atributo criteria.
+
+    Returns:
+        str: Clave del elemento, o None si no tiene criterios utilizables.
+    """
+    criteria = getattr(element, "criteria", None)
+    if not criteria:
+        return None
+    partes = []
+    for nivel in criteria:
+        partes.append(
+            ",".join(
+                f"{clave}={valor}"
+                for clave, valor in sorted(nivel.items())
+                if clave not in ("handle", "process", "app", "backend")
+            )
+        )
+    return "/".join(partes) or None
+
+
+class PollingStats:
+    """
+    Tiempos de aparición de cada elemento, guardados localmente entre corridas.
+
+    Se conservan las últimas max_samples mediciones por elemento y el archivo se
+    escribe como mucho cada save_interval segundos (y al terminar el proceso). Sin path
+    las mediciones solo se guardan en memoria; la instancia compartida recibe su archivo
+    con configure.
+    """
+
+    _instance = None
+
+    def __init__(self, path=None, max_samples=50, save_interval=5.0, clock=time.monotonic):
+        self.path = path
+        self.max_samples = max_samples
+        self.save_interval = save_interval
+        self.clock = clock
+        self._samples = self._load()
+        self._dirty = False
+        self._last_save = clock()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    @classmethod
+    def configure(cls, path):
+        """
+        Fija el archivo de la instancia compartida, junto a los demás archivos de la corrida.
+
+        Args:
+            path: Ruta del archivo JSON de estadísticas.
+
+        Returns:
+            PollingStats: La instancia compartida.
+        """
+        instance = cls.get_instance()
+        if instance.path is None:
+            atexit.register(instance.save)
+        instance.open(path)
+        return instance
+
+    def open(self, path):
+        """Cambia de archivo: carga su historial y conserva lo medido hasta ahora."""
+        with self._lock:
+            self.path = path
+            muestras = self._load()
+            for clave, valores in self._samples.items():
+                combinadas = muestras.setdefault(clave, [])
+                combinadas.extend(valores)
+                del combinadas[: -self.max_samples]
+            self._samples = muestras
+            self._dirty = True
+
+    def _load(self):
+        if self.path is None:
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as archivo:
+                data = json.load(archivo)
+            return {
+                clave: [float(v) for v in valores]
+                for clave, valores in data.items()
+                if isinstance(valores, list)
+            }
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            logger.warning(f"No se pudieron leer las estadísticas de espera: {e}")
+            return {}
+
+    def record(self, key, seconds):
+        """Registra cuánto tardó en aparecer un elemento."""
+        if key is None:
+            return
+        with self._lock:
+            muestras = self._samples.setdefault(key, [])
+            muestras.append(round(seconds, 4))
+            del muestras[: -self.max_samples]
+            self._dirty = True
+            debe_guardar = self.clock() - self._last_save >= self.save_interval
+        if debe_guardar:
+            self.save()
+
+    def samples(self, key):
+        with self._lock:
+            return list(self._samples.get(key, ()))
+
+    def typical(self, key, min_samples=3):
+        """
+        Tiempo típico (mediana) de aparición de un elemento.
+
+        Returns:
+            float: Mediana en segundos, o None si aún no hay suficientes muestras.
+        """
+        muestras = self.samples(key)
+        if len(muestras) < min_samples:
+            return None
+        return median(muestras)
+
+    def save(self):
+        """Guarda las estadísticas en disco si cambiaron."""
+        with self._lock:
+            if not self._dirty or self.path is None:
+                return
+            data = {clave: list(valores) for clave, valores in self._samples.items()}
+            self._dirty = False
+            self._last_save = self.clock()
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as archivo:
+                json.dump(data, archivo, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"No se pudieron guardar las estadísticas de espera: {e}")
+
+
+class PollingPolicy:
+    """
+    Calendario de sondeo compartido: consultas rápidas al inicio, crecimiento geométrico
+    del intervalo hasta un tope y un plazo global opcional.
+
+    El tope se ajusta por elemento con sus tiempos de aparición, a tune_divisor consultas
+    por tiempo típico: un elemento que suele aparecer en 0.3 s se consulta con intervalos
+    cortos y uno que tarda 20 s con intervalos de hasta max_cap, más largos que cap. El
+    tope ajustado nunca baja de min_cap, para no consultar decenas de veces por segundo
+    los elementos que aparecen de inmediato. Un cap pedido por quien espera siempre se
+    respeta.
+
+    bound recorta cada tiempo de espera al plazo en curso; get_instance usa el de
+    retry.bounded.
+    """
+
+    _instance = None
+
+    def __init__(
+        self,
+        initial=0.02,
+        factor=1.5,
+        cap=1.0,
+        min_cap=0.1,
+        max_cap=3.0,
+        tune_divisor=5.0,
+        stats=None,
+        bound=None,
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ):
+        self.initial = initial
+        self.factor = factor
+        self.cap = cap
+        self.min_cap = min_cap
+        self.max_cap = max_cap
+        self.tune_divisor = tune_divisor
+        self.stats = stats
+        self.bound = bound
+        self.clock = clock
+        self.sleep = sleep
+        self.deadline = None
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            from src.luzzi.helpers.retry import bounded
+
+            cls._instance = cls(stats=PollingStats.get_instance(), bound=bounded)
+        return cls._instance
+
+    def set_deadline(self, seconds):
+        """
+        Fija un plazo global para todas las esperas (None para quitarlo).
+
+        Args:
+            seconds: Segundos a partir de ahora.
+        """
+        self.deadline = None if seconds is None else self.clock() + seconds
+
+    def cap_for(self, key, cap=None):
+        """
+        Intervalo máximo para un elemento.
+
+        Args:
+            key: Clave del elemento (o None).
+            cap: Tope solicitado por quien espera (opcional).
+
+        Returns:
+            float: Tope en segundos.
+        """
+        tope = self.cap
+        if key is not None and self.stats is not None:
+            tipico = self.stats.typical(key)
+            if tipico is not None:
+                tope = min(self.max_cap, max(self.min_cap, tipico / self.tune_divisor))
+        return tope if cap is None else min(tope, cap)
+
+    def intervals(self, key=None, cap=None):
+        """Genera los intervalos de espera sucesivos para un elemento."""
+        tope = self.cap_for(key, cap)
+        intervalo = min(self.initial, tope)
+        while True:
+            yield intervalo
+            intervalo = min(tope, intervalo * self.factor)
+
+    def wait(self, predicate, timeout, key=None, cap=None, sleep=None):
+        """
+        Espera a que se cumpla una condición siguiendo el calendario.
+
+        Args:
+            predicate: Condición sin argumentos; un valor verdadero termina la espera.
+            timeout: Tiempo máximo de espera en segundos.
+            key: Clave del elemento para las estadísticas (opcional).
+            cap: Tope de intervalo solicitado por quien espera (opcional).
+            sleep: Función de espera alternativa (por ejemplo, una que despierte con eventos).
+
+        Returns:
+            WaitResult: Éxito, valor de la condición y latencia.
+        """
+        sleep = sleep or self.sleep
+        start = self.clock()
+        if self.bound is not None:
+            timeout = self.bound(timeout, self.clock)
+        limite = start + timeout
+        if self.deadline is not None:
+            limite = min(limite, self.deadline)
+        polls = 0
+        for intervalo in self.intervals(key, cap):
+            polls += 1
+            value = predicate()
+            now = self.clock()
+            if value:
+                if self.stats is not None:
+                    self.stats.record(key, now - start)
+                return WaitResult(True, value, now - start, polls)
+            if now >= limite:
+                return WaitResult(False, None, now - start, polls)
+            sleep(min(intervalo, limite - now))
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    class FakeClock:
+        def __init__(self):
+            self.now = 0.0
+
+        def __call__(self):
+            return self.now
+
+        def sleep(self, seconds):
+            self.now += seconds
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "polling_stats.json")
+        clock = FakeClock()
+        stats = PollingStats(path, clock=clock)
+        policy = PollingPolicy(stats=stats, clock=clock, sleep=clock.sleep)
+
+        aparece = 2.0
+        result = policy.wait(lambda: clock.now >= aparece, 10, key="login")
+        assert result.success and aparece <= result.latency < aparece + 1.0
+        print(f"Sin historial: detectado en {result.latency:.3f}s con {result.polls} consultas")
+
+        clock.now = 0.0
+        result = policy.wait(lambda: False, 3, key="nunca")
+        assert not result.success and result.latency == 3.0
+
+        clock.now = 0.0
+        policy.set_deadline(1.0)
+        result = policy.wait(lambda: False, 10)
+        assert not result.success and result.latency == 1.0
+        policy.set_deadline(None)
+
+        for _ in range(3):
+            clock.now = 0.0
+            policy.wait(lambda: clock.now >= 0.3, 10, key="boton")
+        assert policy.min_cap <= policy.cap_for("boton") < policy.cap
+
+        for _ in range(3):
+            clock.now = 0.0
+            policy.wait(lambda: True, 10, key="inmediato")
+        assert policy.cap_for("inmediato") == policy.min_cap
+
+        for _ in range(3):
+            clock.now = 0.0
+            policy.wait(lambda: clock.now >= 20.0, 30, key="lento")
+        assert policy.cap_for("lento") == policy.max_cap > policy.cap
+        assert policy.cap_for("lento", cap=0.5) == 0.5
+        clock.now = 0.0
+        result = policy.wait(lambda: clock.now >= 20.0, 30, key="lento")
+        print(
+            f"Elemento lento: tope {policy.cap_for('lento'):.3f}s, detectado en "
+            f"{result.latency:.3f}s con {result.polls} consultas"
+        )
+        clock.now = 0.0
+        result = policy.wait(lambda: clock.now >= 0.3, 10, key="boton")
+        print(
+            f"Con historial: tope {policy.cap_for('boton'):.3f}s, detectado en "
+            f"{result.latency:.3f}s con {result.polls} consultas"
+        )
+
+        stats.save()
+        recargado = PollingStats(path)
+        assert len(recargado.samples("boton")) == 4
+
+        en_memoria = PollingStats(clock=clock)
+        en_memoria.record("boton", 0.5)
+        en_memoria.save()
+        en_memoria.open(path)
+        assert len(en_memoria.samples("boton")) == 5
+        print("Pruebas con reloj simulado: OK")
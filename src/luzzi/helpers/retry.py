@@ -0,0 +1,283 @@
+import time
+import random
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+_deadline = contextvars.ContextVar("retry_deadline", default=None)
+
+
+class RetryError(Exception):
+    """Se agotaron los intentos de una acción."""
+
+
+class DeadlineExceeded(Exception):
+    """
+    Se agotó el plazo total de la operación en curso.
+
+    No hereda de TimeoutError: los manejadores de tiempos agotados de una espera no deben
+    tragarse el plazo de toda la operación.
+    """
+
+
+@contextmanager
+def deadline(seconds, clock=time.monotonic):
+    """
+    Fija un plazo total para todo lo que se ejecute dentro del bloque.
+
+    Los plazos anidados nunca extienden al exterior: se usa el más cercano.
+
+    Args:
+        seconds: Segundos disponibles a partir de ahora.
+        clock: Reloj monotónico.
+
+    Yields:
+        float: Instante límite según clock.
+    """
+    limite = clock() + seconds
+    actual = _deadline.get()
+    if actual is not None:
+        limite = min(limite, actual)
+    token = _deadline.set(limite)
+    try:
+        yield limite
+    finally:
+        _deadline.reset(token)
+
+
+def remaining(clock=time.monotonic) -> Optional[float]:
+    """
+    Tiempo restante del plazo en curso.
+
+    Returns:
+        float: Segundos restantes (puede ser negativo), o None si no hay plazo.
+    """
+    limite = _deadline.get()
+    if limite is None:
+        return None
+    return limite - clock()
+
+
+def bounded(timeout, clock=time.monotonic):
+    """Recorta un tiempo de espera al plazo en curso."""
+    resto = remaining(clock)
+    if resto is None:
+        return timeout
+    return max(0.0, min(timeout, resto))
+
+
+class RetryMetrics:
+    """Intentos y tiempo perdido por sitio de llamada."""
+
+    _instance = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.sites = {}
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def reset(self):
+        with self._lock:
+            self.sites = {}
+
+    def record(self, site, attempts, lost, outcome):
+        """
+        Registra el resultado de una llamada.
+
+        Args:
+            site: Nombre del sitio de llamada.
+            attempts: Intentos realizados.
+            lost: Segundos perdidos en intentos fallidos y pausas.
+            outcome: "ok", "exhausted" o "deadline".
+        """
+        with self._lock:
+            stats = self.sites.setdefault(
+                site,
+                {"calls": 0, "attempts": 0, "lost": 0.0, "ok": 0, "exhausted": 0, "deadline": 0},
+            )
+            stats["calls"] += 1
+            stats["attempts"] += attempts
+            stats["lost"] += lost
+            stats[outcome] += 1
+
+    def log_report(self):
+        with self._lock:
+            sites = sorted(self.sites.items(), key=lambda item: item[1]["lost"], reverse=True)
+        for site, stats in sites:
+            logger.info(
+                f"Reintentos {site}: {stats['attempts']} intentos en {stats['calls']} llamadas, "
+                f"{stats['lost']:.1f}s perdidos (agotados {stats['exhausted']}, "
+                f"plazo vencido {stats['deadline']})"
+            )
+        return dict(sites)
+
+
+class RetryPolicy:
+    """
+    Reintentos con retroceso exponencial con variación aleatoria, tope por pausa,
+    filtro por tipo de excepción y respeto del plazo en curso.
+    """
+
+    def __init__(
+        self,
+        max_attempts=5,
+        initial_delay=1.0,
+        backoff_factor=2.0,
+        max_delay=8.0,
+        jitter=0.5,
+        retry_on=(Exception,),
+        metrics=None,
+        clock=time.monotonic,
+        sleep=time.sleep,
+        rng=random.random,
+    ):
+        self.max_attempts = max_attempts
+        self.initial_delay = initial_delay
+        self.backoff_factor = backoff_factor
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.retry_on = tuple(retry_on)
+        self.metrics = metrics or RetryMetrics.get_instance()
+        self.clock = clock
+        self.sleep = sleep
+        self.rng = rng
+
+    def delay_for(self, attempt):
+        """Pausa tras el intento fallido número attempt (desde 1)."""
+        delay = min(
+            self.max_delay, self.initial_delay * self.backoff_factor ** (attempt - 1)
+        )
+        return delay * (1 - self.jitter * self.rng())
+
+    def call(self, action: Callable[[], Any], site: str = None) -> Any:
+        """
+        Ejecuta una acción con reintentos.
+
+        Args:
+            action: Función sin argumentos.
+            site: Nombre del sitio de llamada para las métricas.
+
+        Returns:
+            Resultado de la acción.
+
+        Raises:
+            DeadlineExceeded: Si el plazo en curso no alcanza para otro intento.
+            RetryError: Si se agotan los intentos.
+            Exception: Cualquier excepción que no esté en retry_on, sin reintentar.
+        """
+        site = site or getattr(action, "__qualname__", "accion")
+        lost = 0.0
+        last_error = None
+        for attempt in range(1, self.max_attempts + 1):
+            resto = remaining(self.clock)
+            if resto is not None and resto <= 0:
+                self.metrics.record(site, attempt - 1, lost, "deadline")
+                raise DeadlineExceeded(f"Plazo agotado antes de {site}") from last_error
+
+            started = self.clock()
+            try:
+                result = action()
+            except DeadlineExceeded:
+                # Plazo vencido en un reintento anidado: nunca se reintenta.
+                self.metrics.record(
+                    site, attempt, lost + self.clock() - started, "deadline"
+                )
+                raise
+            except self.retry_on as e:
+                last_error = e
+                lost += self.clock() - started
+                if attempt == self.max_attempts:
+                    break
+                delay = self.delay_for(attempt)
+                resto = remaining(self.clock)
+                if resto is not None and delay >= resto:
+                    self.metrics.record(site, attempt, lost, "deadline")
+                    raise DeadlineExceeded(
+                        f"Plazo agotado reintentando {site}: {e}"
+                    ) from e
+                logger.warning(
+                    f"Attempt {attempt} failed: {e}. Retrying in {delay:.2f} seconds..."
+                )
+                self.sleep(delay)
+                lost += delay
+            else:
+                self.metrics.record(site, attempt, lost, "ok")
+                return result
+
+        self.metrics.record(site, self.max_attempts, lost, "exhausted")
+        raise RetryError("Action failed after multiple retry attempts") from last_error
+
+
+if __name__ == "__main__":
+
+    class FakeClock:
+        def __init__(self):
+            self.now = 0.0
+
+        def __call__(self):
+            return self.now
+
+        def sleep(self, seconds):
+            self.now += seconds
+
+    clock = FakeClock()
+    metrics = RetryMetrics()
+    policy = RetryPolicy(metrics=metrics, clock=clock, sleep=clock.sleep, rng=lambda: 0.0)
+
+    intentos = []
+
+    def falla_dos_veces():
+        intentos.append(clock.now)
+        if len(intentos) < 3:
+            raise ValueError("todavía no")
+        return "ok"
+
+    assert policy.call(falla_dos_veces, site="dos_fallas") == "ok"
+    assert intentos == [0.0, 1.0, 3.0]
+
+    try:
+        RetryPolicy(retry_on=(KeyError,), metrics=metrics).call(
+            lambda: 1 / 0, site="no_reintentable"
+        )
+    except ZeroDivisionError:
+        pass
+
+    clock.now = 0.0
+    with deadline(5, clock=clock):
+        with deadline(60, clock=clock):
+            try:
+                policy.call(lambda: 1 / 0, site="con_plazo")
+            except DeadlineExceeded:
+                pass
+    assert clock.now <= 5, clock.now
+    assert remaining(clock) is None
+
+    def anidado():
+        with deadline(0, clock=clock):
+            policy.call(lambda: 1 / 0, site="plazo_anidado")
+
+    clock.now = 0.0
+    try:
+        policy.call(anidado, site="externo")
+    except DeadlineExceeded:
+        pass
+    externo = metrics.sites["externo"]
+    assert clock.now == 0.0 and externo["attempts"] == 1 and externo["deadline"] == 1
+
+    clock.now = 0.0
+    try:
+        policy.call(lambda: 1 / 0, site="agotado")
+    except RetryError:
+        pass
+    assert clock.now == 1 + 2 + 4 + 8
+    print(metrics.sites)
+    print("Pruebas con reloj simulado: OK")
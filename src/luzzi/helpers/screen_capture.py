@@ -0,0 +1,237 @@
+import os
+import time
+import logging
+import threading
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class CaptureBackend:
+    """Interfaz de los proveedores de captura de pantalla."""
+
+    def grab(self, bbox=None):
+        """
+        Captura la pantalla o un área de ella.
+
+        Args:
+            bbox: Área a capturar (x1, y1, x2, y2) o None para la pantalla completa.
+
+        Returns:
+            np.ndarray: Imagen RGB (alto, ancho, 3) de tipo uint8.
+        """
+        raise NotImplementedError
+
+
+class PillowCaptureBackend(CaptureBackend):
+    """
+    Captura con PIL.ImageGrab, el mismo mecanismo que usa pyautogui en Windows.
+
+    Cada captura crea un arreglo nuevo: ImageGrab entrega una imagen nueva (el paso de
+    BGR a RGB ocurre dentro de Pillow) y np.asarray la copia con tobytes; Pillow no
+    permite escribir en un buffer existente. ScreenCapture limita el costo reutilizando
+    la captura durante max_age y convirtiendo a gris sobre un buffer preasignado.
+    """
+
+    def grab(self, bbox=None):
+        from PIL import ImageGrab
+
+        image = ImageGrab.grab(bbox=bbox)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        return np.asarray(image)
+
+
+class ReplayCaptureBackend(CaptureBackend):
+    """Reproduce capturas PNG grabadas en disco, para pruebas y benchmarks fuera de Windows."""
+
+    def __init__(self, frame_paths, advance_on_grab=False, loop=True):
+        self.frames = []
+        for path in frame_paths:
+            frame = cv2.imread(path, cv2.IMREAD_COLOR)
+            if frame is None:
+                raise FileNotFoundError(f"No se pudo cargar la captura desde: {path}")
+            self.frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        if not self.frames:
+            raise ValueError("Se requiere al menos una captura para reproducir.")
+        self.advance_on_grab = advance_on_grab
+        self.loop = loop
+        self.index = 0
+
+    @classmethod
+    def from_directory(cls, frames_dir, **kwargs):
+        paths = [
+            os.path.join(frames_dir, name)
+            for name in sorted(os.listdir(frames_dir))
+            if name.lower().endswith(".png")
+        ]
+        return cls(paths, **kwargs)
+
+    def advance(self):
+        """Pasa a la siguiente captura grabada."""
+        if self.index + 1 < len(self.frames):
+            self.index += 1
+        elif self.loop:
+            self.index = 0
+
+    def grab(self, bbox=None):
+        frame = self.frames[self.index]
+        if self.advance_on_grab:
+            self.advance()
+        if bbox is None:
+            return frame
+        x1, y1, x2, y2 = bbox
+        return frame[y1:y2, x1:x2]
+
+
+class ScreenCapture:
+    """
+    Capa de captura compartida por ImageHelper y ColorHelper.
+
+    Conserva la última captura completa con su marca de tiempo para que las búsquedas
+    hechas dentro de max_age segundos la reutilicen, y convierte a escala de grises sobre
+    un buffer preasignado. Cualquier acción que modifique la pantalla (clics, teclas)
+    debe llamar a invalidate().
+    """
+
+    _instance = None
+
+    def __init__(self, backend=None, max_age=0.05, clock=time.monotonic):
+        self.backend = backend or PillowCaptureBackend()
+        self.max_age = max_age
+        self.clock = clock
+        self.stats = {"captures": 0, "region_captures": 0, "reused": 0}
+        self._frame = None
+        self._frame_time = None
+        self._gray = None
+        self._gray_time = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def set_backend(self, backend):
+        with self._lock:
+            self.backend = backend
+            self._frame_time = None
+            self._gray_time = None
+
+    def invalidate(self):
+        """Descarta la última captura; la siguiente búsqueda capturará de nuevo."""
+        with self._lock:
+            self._frame_time = None
+            self._gray_time = None
+
+    @property
+    def last_frame_time(self):
+        return self._frame_time
+
+    def grab(self, bbox=None):
+        """
+        Obtiene la pantalla completa o un área en RGB.
+
+        Si hay una captura completa reciente, el área se recorta de ella; si no, se captura
+        solo el área solicitada.
+
+        Args:
+            bbox: Área (x1, y1, x2, y2) o None para la pantalla completa.
+
+        Returns:
+            np.ndarray: Imagen RGB. No debe modificarse.
+        """
+        with self._lock:
+            frame = self._fresh_frame()
+            if frame is not None:
+                self.stats["reused"] += 1
+                if bbox is None:
+                    return frame
+                x1, y1, x2, y2 = bbox
+                return frame[y1:y2, x1:x2]
+
+            if bbox is not None:
+                self.stats["region_captures"] += 1
+                return self.backend.grab(bbox)
+            return self._capture()
+
+    def grab_gray(self):
+        """
+        Obtiene la pantalla completa en escala de grises.
+
+        Returns:
+            np.ndarray: Buffer compartido, válido hasta la siguiente captura.
+        """
+        with self._lock:
+            frame = self._fresh_frame()
+            if frame is None:
+                frame = self._capture()
+            elif self._gray_time == self._frame_time:
+                self.stats["reused"] += 1
+                return self._gray
+            else:
+                self.stats["reused"] += 1
+
+            if self._gray is None or self._gray.shape != frame.shape[:2]:
+                self._gray = np.empty(frame.shape[:2], dtype=np.uint8)
+            cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY, dst=self._gray)
+            self._gray_time = self._frame_time
+            return self._gray
+
+    def _fresh_frame(self):
+        if self._frame_time is None:
+            return None
+        if self.clock() - self._frame_time > self.max_age:
+            return None
+        return self._frame
+
+    def _capture(self):
+        self._frame = self.backend.grab()
+        self._frame_time = self.clock()
+        self.stats["captures"] += 1
+        return self._frame
+
+
+def _benchmark(frames_dir=None, polls=50, lookups_per_poll=4):
+    """Compara la captura directa (copia + conversión por búsqueda) contra ScreenCapture."""
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if frames_dir is None:
+            rng = np.random.default_rng(0)
+            for i in range(3):
+                frame = rng.integers(0, 255, (1080, 1920, 3), dtype=np.uint8)
+                cv2.imwrite(os.path.join(tmp_dir, f"frame_{i}.png"), frame)
+            frames_dir = tmp_dir
+        backend = ReplayCaptureBackend.from_directory(frames_dir)
+
+    def legacy():
+        for _ in range(lookups_per_poll):
+            screenshot = np.array(backend.grab())
+            cv2.cvtColor(screenshot, cv2.COLOR_RGB2GRAY)
+        backend.advance()
+
+    capture = ScreenCapture(backend=backend)
+
+    def layered():
+        for _ in range(lookups_per_poll):
+            capture.grab_gray()
+        backend.advance()
+        capture.invalidate()
+
+    for name, func in (("directa", legacy), ("ScreenCapture", layered)):
+        start = time.perf_counter()
+        for _ in range(polls):
+            func()
+        elapsed = (time.perf_counter() - start) / polls * 1000
+        print(f"    {name:14s}: {elapsed:8.3f} ms por ciclo de {lookups_per_poll} búsquedas")
+    print(f"    contadores: {capture.stats}")
+
+
+if __name__ == "__main__":
+    import sys
+
+    _benchmark(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,177 @@
+import time
+import logging
+import threading
+from typing import Any, Callable, Optional
+
+from src.luzzi.helpers.polling import WaitResult
+from src.luzzi.helpers.retry import bounded
+
+logger = logging.getLogger(__name__)
+
+
+class WaitBudget:
+    """
+    Acumula el tiempo de espera por sitio para reportar, al final de la corrida,
+    cuánto se esperó frente a cuánto se trabajó.
+    """
+
+    _instance = None
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.reset()
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def reset(self):
+        """Reinicia los contadores y el inicio de la corrida."""
+        with self._lock:
+            self.started = self.clock()
+            self.sites = {}
+
+    def record(self, site, seconds, success=True):
+        """
+        Registra una espera.
+
+        Args:
+            site: Nombre del sitio de espera.
+            seconds: Tiempo esperado en segundos.
+            success: False si la espera terminó por tiempo agotado.
+        """
+        with self._lock:
+            stats = self.sites.setdefault(
+                site, {"count": 0, "waited": 0.0, "max": 0.0, "timeouts": 0}
+            )
+            stats["count"] += 1
+            stats["waited"] += seconds
+            stats["max"] = max(stats["max"], seconds)
+            if not success:
+                stats["timeouts"] += 1
+
+    def sleep(self, seconds, site):
+        """Pausa fija que queda registrada en el reporte."""
+        time.sleep(seconds)
+        self.record(site, seconds)
+
+    def report(self):
+        """
+        Resume la corrida.
+
+        Returns:
+            dict: Tiempo total, esperado y de trabajo, y las estadísticas por sitio
+            ordenadas de mayor a menor tiempo esperado.
+        """
+        with self._lock:
+            elapsed = self.clock() - self.started
+            waited = sum(stats["waited"] for stats in self.sites.values())
+            sites = sorted(
+                ((site, dict(stats)) for site, stats in self.sites.items()),
+                key=lambda item: item[1]["waited"],
+                reverse=True,
+            )
+        return {
+            "elapsed": elapsed,
+            "waited": waited,
+            "work": max(0.0, elapsed - waited),
+            "sites": sites,
+        }
+
+    def log_report(self):
+        """Escribe el reporte de esperas en el log."""
+        report = self.report()
+        logger.info(
+            f"Tiempo total: {report['elapsed']:.1f}s, en espera: {report['waited']:.1f}s, "
+            f"trabajando: {report['work']:.1f}s"
+        )
+        for site, stats in report["sites"]:
+            promedio = stats["waited"] / stats["count"]
+            logger.info(
+                f"    {site}: {stats['waited']:.1f}s en {stats['count']} esperas "
+                f"(promedio {promedio:.2f}s, máximo {stats['max']:.2f}s, "
+                f"tiempos agotados {stats['timeouts']})"
+            )
+        return report
+
+
+def _same(previous, current):
+    if previous is None:
+        return False
+    if hasattr(current, "shape"):
+        return previous.shape == current.shape and bool((previous == current).all())
+    return previous == current
+
+
+def poll_until(
+    predicate: Callable,
+    timeout: float,
+    sample: Optional[Callable[[], Any]] = None,
+    min_interval: float = 0.01,
+    max_interval: float = 0.25,
+    backoff: float = 2.0,
+    clock: Callable[[], float] = time.monotonic,
+    sleep: Callable[[float], None] = time.sleep,
+    site: Optional[str] = None,
+) -> WaitResult:
+    """
+    Espera a que se cumpla una condición, consultando rápido mientras la observación cambia.
+
+    Con sample, en cada ciclo se toma una observación (por ejemplo, una región pequeña
+    de la pantalla) y se evalúa predicate(observación). Mientras la observación no cambie
+    el intervalo crece geométricamente hasta max_interval; cuando cambia vuelve a
+    min_interval. Sin sample, se llama predicate() y el intervalo siempre crece.
+
+    Args:
+        predicate: Condición; un valor verdadero termina la espera y se devuelve en value.
+        timeout: Tiempo máximo de espera en segundos (recortado al plazo en curso).
+        sample: Función que obtiene la observación a evaluar (opcional).
+        min_interval: Intervalo inicial entre consultas.
+        max_interval: Intervalo máximo entre consultas.
+        backoff: Factor de crecimiento del intervalo.
+        clock: Reloj monotónico (inyectable para pruebas).
+        sleep: Función de espera (inyectable para pruebas).
+        site: Nombre del sitio de espera para el reporte de WaitBudget (opcional).
+
+    Returns:
+        WaitResult: Éxito, valor de la condición, latencia de detección y consultas hechas.
+    """
+    result = _poll(
+        predicate, bounded(timeout, clock), sample, min_interval, max_interval, backoff, clock, sleep
+    )
+    if site is not None:
+        WaitBudget.get_instance().record(site, result.latency, result.success)
+    return result
+
+
+def _poll(predicate, timeout, sample, min_interval, max_interval, backoff, clock, sleep):
+    start = clock()
+    interval = min_interval
+    previous = None
+    polls = 0
+    while True:
+        polls += 1
+        if sample is not None:
+            observation = sample()
+            value = predicate(observation)
+        else:
+            observation = None
+            value = predicate()
+        elapsed = clock() - start
+        if value:
+            return WaitResult(True, value, elapsed, polls)
+
+        remaining = timeout - elapsed
+        if remaining <= 0:
+            return WaitResult(False, None, elapsed, polls)
+
+        if sample is not None and not _same(previous, observation):
+            interval = min_interval
+        else:
+            interval = min(max_interval, interval * backoff)
+        if sample is not None:
+            previous = observation.copy() if hasattr(observation, "copy") else observation
+        sleep(min(interval, remaining))
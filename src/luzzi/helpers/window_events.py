@@ -0,0 +1,411 @@
+import sys
+import time
+import logging
+import threading
+from dataclasses import dataclass, field
+
+from src.luzzi.helpers.retry import bounded
+from src.luzzi.helpers.waits import WaitBudget, WaitResult
+
+logger = logging.getLogger(__name__)
+
+CREATED = "created"
+DESTROYED = "destroyed"
+SHOWN = "shown"
+HIDDEN = "hidden"
+TITLE_CHANGED = "title_changed"
+FOREGROUND = "foreground"
+
+
+@dataclass
+class WindowEvent:
+    """Cambio en una ventana: creación, destrucción, cambio de título o de foco."""
+
+    kind: str
+    hwnd: int = 0
+    timestamp: float = field(default_factory=time.monotonic)
+
+
+class EventSource:
+    """Interfaz de los proveedores de eventos de ventana."""
+
+    def start(self, callback):
+        """
+        Comienza a entregar eventos.
+
+        Args:
+            callback: Función que recibe cada WindowEvent, desde el hilo del proveedor.
+        """
+        raise NotImplementedError
+
+    def stop(self):
+        raise NotImplementedError
+
+
+class SimulatedEventSource(EventSource):
+    """Proveedor en proceso: los eventos se emiten a mano, para pruebas fuera de Windows."""
+
+    def __init__(self):
+        self._callback = None
+
+    def start(self, callback):
+        self._callback = callback
+
+    def stop(self):
+        self._callback = None
+
+    def emit(self, kind, hwnd=0):
+        if self._callback is not None:
+            self._callback(WindowEvent(kind, hwnd))
+
+
+class WinEventHookSource(EventSource):
+    """
+    Proveedor basado en SetWinEventHook, limitado a las ventanas de un proceso.
+
+    Los ganchos se registran fuera de contexto en un hilo propio con su bucle de
+    mensajes; solo se reportan eventos de ventanas de nivel superior (OBJID_WINDOW y
+    GetAncestor(hwnd, GA_ROOT) == hwnd), no de cursores, controles ni elementos
+    internos. Como una ventana destruida ya no se puede consultar, su destrucción se
+    reporta si antes se vio como ventana de nivel superior.
+    """
+
+    EVENT_SYSTEM_FOREGROUND = 0x0003
+    EVENT_OBJECT_CREATE = 0x8000
+    EVENT_OBJECT_DESTROY = 0x8001
+    EVENT_OBJECT_SHOW = 0x8002
+    EVENT_OBJECT_HIDE = 0x8003
+    EVENT_OBJECT_NAMECHANGE = 0x800C
+    WINEVENT_OUTOFCONTEXT = 0x0000
+    OBJID_WINDOW = 0
+    GA_ROOT = 2
+    WM_QUIT = 0x0012
+
+    KINDS = {
+        EVENT_SYSTEM_FOREGROUND: FOREGROUND,
+        EVENT_OBJECT_CREATE: CREATED,
+        EVENT_OBJECT_DESTROY: DESTROYED,
+        EVENT_OBJECT_SHOW: SHOWN,
+        EVENT_OBJECT_HIDE: HIDDEN,
+        EVENT_OBJECT_NAMECHANGE: TITLE_CHANGED,
+    }
+    RANGES = (
+        (EVENT_SYSTEM_FOREGROUND, EVENT_SYSTEM_FOREGROUND),
+        (EVENT_OBJECT_CREATE, EVENT_OBJECT_HIDE),
+        (EVENT_OBJECT_NAMECHANGE, EVENT_OBJECT_NAMECHANGE),
+    )
+
+    def __init__(self, pid):
+        if sys.platform != "win32":
+            raise OSError("Los ganchos WinEvent solo están disponibles en Windows.")
+        self.pid = pid
+        self._callback = None
+        self._thread = None
+        self._thread_id = None
+        self._ready = threading.Event()
+        self._error = None
+        self._top_level = set()
+
+    def start(self, callback):
+        self._callback = callback
+        self._ready.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="WinEventHook", daemon=True
+        )
+        self._thread.start()
+        self._ready.wait(5)
+        if self._error is not None:
+            raise self._error
+
+    def stop(self):
+        import ctypes
+
+        if self._thread_id is not None:
+            ctypes.windll.user32.PostThreadMessageW(self._thread_id, self.WM_QUIT, 0, 0)
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        self._thread = None
+        self._thread_id = None
+
+    def _run(self):
+        import ctypes
+        from ctypes import wintypes
+
+        user32 = ctypes.windll.user32
+        win_event_proc = ctypes.WINFUNCTYPE(
+            None,
+            wintypes.HANDLE,
+            wintypes.DWORD,
+            wintypes.HWND,
+            wintypes.LONG,
+            wintypes.LONG,
+            wintypes.DWORD,
+            wintypes.DWORD,
+        )
+        user32.SetWinEventHook.argtypes = [
+            wintypes.UINT,
+            wintypes.UINT,
+            wintypes.HMODULE,
+            win_event_proc,
+            wintypes.DWORD,
+            wintypes.DWORD,
+            wintypes.UINT,
+        ]
+        user32.SetWinEventHook.restype = wintypes.HANDLE
+        user32.UnhookWinEvent.argtypes = [wintypes.HANDLE]
+        user32.GetAncestor.argtypes = [wintypes.HWND, wintypes.UINT]
+        user32.GetAncestor.restype = wintypes.HWND
+
+        def is_top_level(event, hwnd):
+            if event == self.EVENT_OBJECT_DESTROY:
+                if hwnd in self._top_level:
+                    self._top_level.discard(hwnd)
+                    return True
+                return False
+            if user32.GetAncestor(hwnd, self.GA_ROOT) != hwnd:
+                return False
+            self._top_level.add(hwnd)
+            return True
+
+        def on_event(hook, event, hwnd, id_object, id_child, thread, event_time):
+            if id_object != self.OBJID_WINDOW or not hwnd or self._callback is None:
+                return
+            if not is_top_level(event, hwnd):
+                return
+            try:
+                self._callback(WindowEvent(self.KINDS.get(event, str(event)), hwnd or 0))
+            except Exception as e:
+                logger.debug(f"Error al despachar evento de ventana: {e}")
+
+        proc = win_event_proc(on_event)
+        hooks = []
+        try:
+            self._thread_id = ctypes.windll.kernel32.GetCurrentThreadId()
+            for low, high in self.RANGES:
+                hook = user32.SetWinEventHook(
+                    low, high, None, proc, self.pid, 0, self.WINEVENT_OUTOFCONTEXT
+                )
+                if not hook:
+                    raise OSError(f"SetWinEventHook falló para los eventos {low:#x}-{high:#x}")
+                hooks.append(hook)
+        except Exception as e:
+            self._error = e
+            self._ready.set()
+            for hook in hooks:
+                user32.UnhookWinEvent(hook)
+            return
+
+        self._ready.set()
+        msg = wintypes.MSG()
+        while user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+            user32.TranslateMessage(ctypes.byref(msg))
+            user32.DispatchMessageW(ctypes.byref(msg))
+        for hook in hooks:
+            user32.UnhookWinEvent(hook)
+
+
+class WindowEventBus:
+    """
+    Distribuye los eventos de ventana a los suscriptores y despierta a quien espera.
+
+    Las esperas vuelven a evaluar su condición en cuanto llega un evento, pero como
+    mucho una vez cada coalesce_interval segundos: una ráfaga de eventos (una ventana
+    que se crea con todos sus elementos) cuesta una sola evaluación. Sin proveedor
+    activo se comportan como un sondeo cada fallback_interval segundos; con proveedor,
+    el sondeo sirve de red de seguridad ante eventos perdidos y se hace cada
+    fallback_interval segundos, sin pasar de safety_interval.
+    """
+
+    _instance = None
+
+    def __init__(
+        self, clock=time.monotonic, safety_interval=0.5, coalesce_interval=0.02,
+        pause=time.sleep,
+    ):
+        self.clock = clock
+        self.safety_interval = safety_interval
+        self.coalesce_interval = coalesce_interval
+        self.pause = pause
+        self.source = None
+        self._subscribers = {}
+        self._next_token = 0
+        self._sequence = 0
+        self._condition = threading.Condition()
+        self.stats = {"events": 0, "evaluations": 0}
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    @property
+    def active(self):
+        return self.source is not None
+
+    def start(self, source):
+        """
+        Conecta un proveedor de eventos, reemplazando al anterior.
+
+        Args:
+            source: EventSource a utilizar.
+        """
+        self.stop()
+        source.start(self._dispatch)
+        self.source = source
+        logger.debug(f"Eventos de ventana activos con {type(source).__name__}.")
+
+    def stop(self):
+        if self.source is not None:
+            try:
+                self.source.stop()
+            except Exception as e:
+                logger.debug(f"Error al detener el proveedor de eventos: {e}")
+            self.source = None
+        with self._condition:
+            self._sequence += 1
+            self._condition.notify_all()
+
+    def subscribe(self, callback, kinds=None):
+        """
+        Registra una función que recibirá los eventos.
+
+        Args:
+            callback: Función que recibe un WindowEvent.
+            kinds: Tipos de evento de interés (None para todos).
+
+        Returns:
+            int: Identificador para cancelar la suscripción.
+        """
+        with self._condition:
+            self._next_token += 1
+            self._subscribers[self._next_token] = (
+                callback,
+                frozenset(kinds) if kinds else None,
+            )
+            return self._next_token
+
+    def unsubscribe(self, token):
+        with self._condition:
+            self._subscribers.pop(token, None)
+
+    def _dispatch(self, event):
+        with self._condition:
+            self._sequence += 1
+            self.stats["events"] += 1
+            subscribers = list(self._subscribers.values())
+            self._condition.notify_all()
+        for callback, kinds in subscribers:
+            if kinds is None or event.kind in kinds:
+                try:
+                    callback(event)
+                except Exception as e:
+                    logger.debug(f"Error en suscriptor de eventos de ventana: {e}")
+
+    def _wait_event(self, sequence, seconds):
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: self._sequence != sequence, timeout=max(0.0, seconds)
+            )
+
+    def sleep(self, seconds):
+        """
+        Pausa que termina antes de tiempo si llega un evento de ventana.
+
+        Returns:
+            bool: True si la despertó un evento, False si transcurrió el tiempo completo.
+        """
+        return self._wait_event(self._sequence, seconds)
+
+    def wait_for(self, predicate, timeout, fallback_interval=0.5, site=None):
+        """
+        Espera a que se cumpla una condición, evaluándola al llegar cada evento.
+
+        Args:
+            predicate: Condición sin argumentos; un valor verdadero termina la espera.
+            timeout: Tiempo máximo de espera en segundos.
+            fallback_interval: Intervalo entre evaluaciones cuando no hay eventos activos.
+            site: Nombre del sitio de espera para el reporte de WaitBudget (opcional).
+
+        Returns:
+            WaitResult: Éxito, valor de la condición y latencia.
+        """
+        timeout = bounded(timeout, self.clock)
+        start = self.clock()
+        polls = 0
+        last = None
+        while True:
+            if last is not None:
+                pending = self.coalesce_interval - (self.clock() - last)
+                if pending > 0:
+                    self.pause(min(pending, max(0.0, timeout - (self.clock() - start))))
+            sequence = self._sequence
+            polls += 1
+            self.stats["evaluations"] += 1
+            last = self.clock()
+            value = predicate()
+            elapsed = self.clock() - start
+            if value:
+                result = WaitResult(True, value, elapsed, polls)
+                break
+            remaining = timeout - elapsed
+            if remaining <= 0:
+                result = WaitResult(False, None, elapsed, polls)
+                break
+            interval = fallback_interval
+            if self.active:
+                interval = min(interval, self.safety_interval)
+            self._wait_event(sequence, min(interval, remaining))
+        if site is not None:
+            WaitBudget.get_instance().record(site, result.latency, result.success)
+        return result
+
+
+if __name__ == "__main__":
+    bus = WindowEventBus()
+    source = SimulatedEventSource()
+    bus.start(source)
+
+    ventanas = set()
+    received = []
+    bus.subscribe(received.append, kinds=[DESTROYED])
+
+    def cerrar_ventana():
+        time.sleep(0.2)
+        ventanas.discard(42)
+        source.emit(DESTROYED, 42)
+
+    for label, interval in (("sondeo cada 1s", 1.0), ("con eventos", 1.0)):
+        ventanas.add(42)
+        if label == "sondeo cada 1s":
+            bus.stop()
+        else:
+            bus.start(source)
+        threading.Thread(target=cerrar_ventana).start()
+        result = bus.wait_for(lambda: 42 not in ventanas, 5, fallback_interval=interval)
+        print(
+            f"    {label:15s}: desaparición detectada en {result.latency * 1000:6.1f} ms "
+            f"({result.polls} evaluaciones)"
+        )
+    assert [event.hwnd for event in received] == [42]
+
+    result = bus.wait_for(lambda: False, 0.3, fallback_interval=0.05)
+    assert result.polls >= 5, result
+    print(f"    sin eventos, intervalo de 0.05s: {result.polls} evaluaciones en 0.3 s")
+
+    listo = threading.Event()
+
+    def rafaga():
+        for _ in range(200):
+            source.emit(CREATED, 7)
+            time.sleep(0.0002)
+        listo.set()
+        source.emit(SHOWN, 7)
+
+    threading.Thread(target=rafaga).start()
+    result = bus.wait_for(listo.is_set, 5)
+    assert result.success and result.polls < 50, result
+    print(
+        f"    ráfaga de 200 eventos: {result.polls} evaluaciones "
+        f"en {result.latency * 1000:.1f} ms"
+    )
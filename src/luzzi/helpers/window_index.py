@@ -0,0 +1,143 @@
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def _enumerate_untitled(pid):
+    from pywinauto import findwindows
+
+    return findwindows.find_windows(process=pid, title="")
+
+
+class WindowIndex:
+    """
+    Índice de las ventanas sin título de un proceso y del texto de su primer Static.
+
+    En cada consulta los handles se enumeran una sola vez, filtrados por el id del
+    proceso de CONTPAQi. El texto de cada handle se guarda hasta ttl segundos y se
+    descarta en cuanto el handle deja de existir.
+    """
+
+    _indexes = {}
+    _lock = threading.Lock()
+
+    def __init__(
+        self, pid, read_text, ttl=1.0, enumerate_handles=None, clock=time.monotonic
+    ):
+        self.pid = pid
+        self.read_text = read_text
+        self.ttl = ttl
+        self.enumerate_handles = enumerate_handles or _enumerate_untitled
+        self.clock = clock
+        self._texts = {}
+        self.stats = {"scans": 0, "reads": 0, "cached": 0}
+
+    @classmethod
+    def for_app(cls, app, read_text):
+        """
+        Obtiene el índice compartido del proceso de una aplicación pywinauto.
+
+        Args:
+            app: Instancia de la aplicación pywinauto.
+            read_text: Función hwnd -> texto del contenido de la ventana.
+
+        Returns:
+            WindowIndex: Índice del proceso.
+        """
+        pid = app.process
+        with cls._lock:
+            index = cls._indexes.get(pid)
+            if index is None:
+                index = cls._indexes[pid] = cls(pid, read_text)
+            else:
+                index.read_text = read_text
+            return index
+
+    def invalidate(self, handle=None):
+        """Descarta el texto guardado de un handle, o de todos."""
+        if handle is None:
+            self._texts.clear()
+        else:
+            self._texts.pop(handle, None)
+
+    def scan(self):
+        """
+        Enumera las ventanas actuales y obtiene su texto.
+
+        Returns:
+            list: Tuplas (handle, texto) de las ventanas vivas del proceso.
+        """
+        self.stats["scans"] += 1
+        handles = self.enumerate_handles(self.pid)
+        vivos = set(handles)
+        for handle in list(self._texts):
+            if handle not in vivos:
+                del self._texts[handle]
+
+        now = self.clock()
+        result = []
+        for handle in handles:
+            cached = self._texts.get(handle)
+            if cached is not None and now - cached[1] <= self.ttl:
+                self.stats["cached"] += 1
+                text = cached[0]
+            else:
+                self.stats["reads"] += 1
+                try:
+                    text = self.read_text(handle) or ""
+                except Exception as e:
+                    logger.debug(f"No se pudo leer la ventana {handle}: {e}")
+                    text = ""
+                self._texts[handle] = (text, now)
+            result.append((handle, text))
+        return result
+
+    def find(self, content_patterns, ignore_patterns=None):
+        """
+        Busca en una sola pasada la primera ventana cuyo texto contenga alguno de los patrones.
+
+        Args:
+            content_patterns: Lista de patrones a buscar en el contenido.
+            ignore_patterns: Lista de patrones a ignorar (opcional).
+
+        Returns:
+            tuple: (handle, texto) de la ventana encontrada o None.
+        """
+        content = [p.lower() for p in content_patterns]
+        ignore = [p.lower() for p in ignore_patterns or []]
+        for handle, text in self.scan():
+            if not text:
+                continue
+            lowered = text.lower()
+            if any(p in lowered for p in ignore):
+                continue
+            if any(p in lowered for p in content):
+                return handle, text
+        return None
+
+
+if __name__ == "__main__":
+    windows = {100: "Buscar documentos", 101: "", 102: "Leyendo documentos 1 de 20"}
+    reads = []
+
+    def read_text(handle):
+        reads.append(handle)
+        return windows[handle]
+
+    t = [0.0]
+    index = WindowIndex(
+        1234, read_text, ttl=1.0,
+        enumerate_handles=lambda pid: list(windows), clock=lambda: t[0],
+    )
+    assert index.find(["Leyendo documentos "], ["Buscar"]) == (102, windows[102])
+    assert index.find(["Leyendo documentos "], ["Buscar"]) is not None
+    assert len(reads) == 3
+    del windows[102]
+    assert index.find(["Leyendo documentos "]) is None
+    assert 102 not in index._texts
+    windows[103] = "Generando asientos contables, espere..."
+    t[0] = 2.0
+    assert index.find(["Generando asientos"])[0] == 103
+    print(f"Pruebas con ventanas simuladas: OK {index.stats}")
@@ -2,6 +2,7 @@ import logging
 import time
 from src.luzzi.helpers.help_bot import WindowHelper
 from src.luzzi.helpers.control_bot import ControlBot
+from src.luzzi.helpers.window_events import WindowEventBus
 from src.luzzi.page_objects.dialog_handler_page import DialogHandler
 
 
@@ -175,11 +176,12 @@ class CompanySelectionPage:
 
             pausa = 0.5
             tiempo_maximo_espera = 600
-            iteraciones = int(tiempo_maximo_espera / pausa)
+            limite = time.monotonic() + tiempo_maximo_espera
             ventanas_manejadas = set()
+            eventos = WindowEventBus.get_instance()
 
-            for _ in range(iteraciones):
-                time.sleep(pausa)
+            while time.monotonic() < limite:
+                eventos.sleep(pausa)
                 if not self.app.top_window():
                     continue
 
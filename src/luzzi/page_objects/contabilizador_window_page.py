@@ -4,11 +4,17 @@ import traceback
 import win32gui
 from src.luzzi.helpers.help_bot import ResourceHelper, ImageHelper
 from src.luzzi.helpers.control_bot import ControlBot
+from src.luzzi.helpers.waits import poll_until
 from src.config.config import Config
 
 logger = logging.getLogger(__name__)
 
 
+def _digitos(texto):
+    """Solo los dígitos de un texto, para comparar fechas sin importar la máscara."""
+    return "".join(c for c in texto or "" if c.isdigit())
+
+
 class ContabilizadorWindowPage:
     def __init__(self, app):
         """
@@ -101,6 +107,86 @@ class ContabilizadorWindowPage:
             logger.critical(f"No se pudo encontrar la ventana XML: {str(e)}")
             return None
 
+    def xml_list_state(self):
+        """
+        Obtiene el estado de la lista de documentos de la ventana XML.
+
+        Returns:
+            tuple: (número de documentos, texto de la primera fila), o None si la lista
+            no está disponible.
+        """
+        try:
+            listview = self.xml_window.child_window(
+                class_name="SysListView32", found_index=0
+            ).wrapper_object()
+            count = listview.item_count()
+            return count, listview.item(0, 0).text() if count else ""
+        except Exception:
+            return None
+
+    def wait_for_filter_results(self, previous_state, timeout=5):
+        """
+        Espera a que la lista de documentos refleje los filtros aplicados.
+
+        La lista se da por actualizada cuando su estado cambió respecto al anterior a
+        los filtros y se mantiene igual en dos lecturas seguidas (la carga terminó).
+
+        Args:
+            previous_state: Estado de xml_list_state antes de aplicar los filtros.
+            timeout: Tiempo máximo de espera en segundos.
+
+        Returns:
+            WaitResult: Éxito y latencia de la espera.
+        """
+        last = [previous_state]
+
+        def updated():
+            state = self.xml_list_state()
+            stable = state is not None and state != previous_state and state == last[0]
+            last[0] = state
+            return stable
+
+        return poll_until(
+            updated, timeout, min_interval=0.1, max_interval=0.25, site="filtros_aplicados"
+        )
+
+    def focused_field(self):
+        """
+        Obtiene el control con el foco en la ventana XML.
+
+        Returns:
+            tuple: (handle, texto) del control enfocado, o None si no se pudo leer.
+        """
+        try:
+            control = self.xml_window.wrapper_object().get_focus()
+            return control.handle, control.window_text()
+        except Exception:
+            return None
+
+    def wait_for_focused_field(self, condition, site, timeout=0.5):
+        """
+        Espera a que el control enfocado de la ventana XML cumpla una condición.
+
+        El tiempo máximo es la pausa fija que se usaba antes entre teclas, así que en el
+        peor caso (el control no se puede leer) la captura tarda lo mismo que antes.
+
+        Args:
+            condition: Función (handle, texto) -> bool.
+            site: Nombre del sitio de espera para el reporte de tiempos.
+            timeout: Tiempo máximo de espera en segundos.
+
+        Returns:
+            WaitResult: Éxito, (handle, texto) del control y latencia de la espera.
+        """
+        return poll_until(
+            lambda campo: campo if campo is not None and condition(*campo) else None,
+            timeout,
+            sample=self.focused_field,
+            min_interval=0.02,
+            max_interval=0.1,
+            site=site,
+        )
+
     def apply_dynamic_filters(self, fecha_inicio, fecha_final, filters, tipo_xml):
         """
         Aplica filtros dinámicos en la ventana XML.
@@ -110,6 +196,10 @@ class ContabilizadorWindowPage:
             fecha_final (str): Fecha final para la contabilidad.
             filters (dict): Filtros a aplicar.
             tipo_xml (str): Tipo de XML para determinar posiciones de filtros.
+
+        Returns:
+            bool: True si la lista de documentos se actualizó con los filtros, False si no
+            se observó el cambio en el tiempo de espera (o hubo un error).
         """
         try:
             config = Config.get_instance()
@@ -122,17 +212,28 @@ class ContabilizadorWindowPage:
                         "No se pudo obtener la ventana XML para aplicar filtros."
                     )
 
-            time.sleep(0.5)
+            estado_previo = self.xml_list_state()
+            self.wait_for_focused_field(lambda handle, texto: True, "filtro_enfocado")
             self.xml_window.type_keys("^a")
             self.xml_window.type_keys("{BACKSPACE}")
-            time.sleep(0.5)
+            campo = self.wait_for_focused_field(
+                lambda handle, texto: not _digitos(texto), "fecha_inicial_borrada"
+            )
+            campo_inicial = campo.value[0] if campo else None
             self.xml_window.type_keys(f"{fecha_inicio}{{TAB}}")
-            time.sleep(0.5)
+            self.wait_for_focused_field(
+                lambda handle, texto: handle != campo_inicial, "fecha_final_enfocada"
+            )
             self.xml_window.type_keys("^a")
             self.xml_window.type_keys("{BACKSPACE}")
-            time.sleep(0.5)
+            self.wait_for_focused_field(
+                lambda handle, texto: not _digitos(texto), "fecha_final_borrada"
+            )
             self.xml_window.type_keys(f"{fecha_final}{{ENTER}}")
-            time.sleep(0.5)
+            self.wait_for_focused_field(
+                lambda handle, texto: _digitos(texto) == _digitos(fecha_final),
+                "fecha_final_capturada",
+            )
 
             filter_positions = config.get_filter_positions().get(tipo_xml, {})
 
@@ -170,12 +271,23 @@ class ContabilizadorWindowPage:
                     current_position += 1
 
             self.xml_window.type_keys("{ENTER}")
-            time.sleep(5)
+            resultado = self.wait_for_filter_results(estado_previo)
+            if resultado:
+                logger.debug(
+                    f"Lista de documentos actualizada en {resultado.latency:.2f}s: "
+                    f"{self.xml_list_state()}"
+                )
+            else:
+                logger.debug(
+                    "No se observó cambio en la lista de documentos después de los filtros."
+                )
 
             self.xml_window.click_input(coords=(500, 500))
             self.xml_window.type_keys("^a")
 
             logger.debug(f"Filtros aplicados para {tipo_xml}: {filters}")
+            return resultado.success
         except Exception as e:
             logger.error(f"Error al aplicar filtros para {tipo_xml}: {str(e)}")
             print(traceback.format_exc())
+            return False
@@ -1,9 +1,9 @@
 import logging
-import time
 import pywinauto
 from pywinauto import findwindows
 from src.luzzi.helpers.help_bot import WindowHelper
 from src.luzzi.helpers.control_bot import ControlBot
+from src.luzzi.helpers.window_events import WindowEventBus
 
 logger = logging.getLogger(__name__)
 
@@ -200,14 +200,20 @@ class DialogHandler:
             boton_aceptar.click_input()
             tiempo_maximo_espera = 1200
             pausa = 1
-            for _ in range(tiempo_maximo_espera):
-                time.sleep(pausa)
-                if (
+
+            def actualizacion_terminada():
+                return (
                     not self.app.top_window()
                     .window_text()
                     .startswith("Proceso de actualización de esquemas")
-                ):
-                    break
+                )
+
+            WindowEventBus.get_instance().wait_for(
+                actualizacion_terminada,
+                tiempo_maximo_espera,
+                fallback_interval=pausa,
+                site="actualizacion_esquemas",
+            )
             return None
         else:
             logger.info(f"\tInformación no identificada. Mensaje: {message}")
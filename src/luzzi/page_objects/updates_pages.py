@@ -177,15 +177,34 @@ class UpdatePage:
                 },
             }
 
+            rutas = {
+                button_title: ResourceHelper.resource_path(config["imagen"])
+                for button_title, config in botones.items()
+            }
+            coincidencias = {
+                match.template_path: match
+                for match in ImageHelper.find_images(
+                    list(rutas.values()), confidence=0.90, advanced=True
+                )
+            }
+            pantalla_cambiada = False
+
             for button_title, config in botones.items():
                 if estado_actualizaciones[button_title]:
                     continue
 
-                encontrado, posicion = ImageHelper.find_and_click_image_advanced(
-                    config["imagen"], confidence=0.90, double_click=True
-                )
+                if pantalla_cambiada:
+                    encontrado, posicion = ImageHelper.find_and_click_image_advanced(
+                        config["imagen"], confidence=0.90, double_click=True
+                    )
+                else:
+                    match = coincidencias.get(rutas[button_title])
+                    encontrado = match is not None
+                    if encontrado:
+                        ImageHelper.click_match(match, double_click=True)
 
                 if encontrado:
+                    pantalla_cambiada = True
                     logger.info(
                         f"Botón '{button_title}' detectado. Realizando actualización..."
                     )
@@ -1,9 +1,16 @@
 from .company_processor import CompanyProcessor
 from .database_auth_manager import DatabaseAuthManager
 from .entry_processor import EntryProcessor
+from .preflight import CompanyPlan, CompanyPreflight, WorkPlan
+from .prefetch import CompanyPrefetcher, PrefetchedCompany
 
 __all__ = [
     "CompanyProcessor",
     "DatabaseAuthManager",
     "EntryProcessor",
+    "CompanyPlan",
+    "CompanyPreflight",
+    "WorkPlan",
+    "CompanyPrefetcher",
+    "PrefetchedCompany",
 ]
\ No newline at end of file
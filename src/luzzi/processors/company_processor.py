@@ -1,53 +1,126 @@
 import logging
-import time
+from concurrent.futures import Future
 from src.luzzi.page_objects import (
     CompanySelectionPage,
     ContabilizadorWindowPage
     )
+from src.luzzi.helpers.help_bot import ImageHelper
 from src.luzzi.processors.entry_processor import EntryProcessor
+from src.luzzi.processors.preflight import CompanyPreflight
+from src.luzzi.processors.prefetch import CompanyPrefetcher
 from src.config.config import Config
+from src.data.checkpoint import CheckpointJournal, FALLIDO, INICIADO, SIN_POLIZAS
+from src.luzzi.helpers.retry import RetryMetrics, deadline
+from src.luzzi.helpers.waits import WaitBudget
 
 
 logger = logging.getLogger(__name__)
 
+TIEMPO_MAXIMO_ASIENTO = 300
+# Plantillas visibles con el contabilizador abierto, para calibrar la escala de pantalla.
+PLANTILLAS_CALIBRACION = ("img/seleccionar_CFDI.png", "img/contabilizador.png")
+
 
 class CompanyProcessor:
-    def __init__(self, app, data_access_layer):
+    def __init__(self, app, data_access_layer, journal=None, incremental=False):
         self.app = app
         self.data_access_layer = data_access_layer
+        self.incremental = incremental
+        self.omitidos = {}
+        self.journal = journal
+        if self.journal is None:
+            try:
+                self.journal = CheckpointJournal()
+            except Exception as e:
+                logger.warning(
+                    f"Bitácora de avance no disponible, no se podrá reanudar la corrida: {e}"
+                )
         self.config = Config.get_instance()
         self.company_selection_page = CompanySelectionPage(app)
         self.contabilizador_page = ContabilizadorWindowPage(app)
         self.entry_processor = EntryProcessor(app)
 
-    def process_companies(self):
-        try:
-            companies = self.data_access_layer.get_empresas("LUZZI")
-            if not companies:
-                logger.critical("No se pudieron obtener las empresas.")
-                return
+    def build_plan(self):
+        """Valida las empresas configuradas y arma el plan de trabajo."""
+        return CompanyPreflight(
+            self.data_access_layer, self.config.get_companies()
+        ).build_plan()
 
-            config_companies = self.config.get_companies()
-            logger.info(f"Total de empresas encontradas: {len(companies)}")
+    def process_companies(self, plan=None):
+        """
+        Procesa en la interfaz las empresas del plan de trabajo.
 
-            for company in companies:
-                company_name = company["Nombre"]
-                alias_database = company["AliasBDD"]
+        Args:
+            plan: WorkPlan o Future con el WorkPlan de la validación previa (opcional;
+                si no se indica, la validación se hace aquí mismo).
+        """
+        wait_budget = WaitBudget.get_instance()
+        wait_budget.reset()
+        retry_metrics = RetryMetrics.get_instance()
+        retry_metrics.reset()
+        prefetcher = None
+        self.omitidos = {}
+        try:
+            if plan is None:
+                plan = self.build_plan()
+            elif isinstance(plan, Future):
+                plan = plan.result()
+            if not plan.companies:
+                logger.info("No hay empresas válidas por procesar.")
+                return
+            if self.journal:
+                self.journal.begin_run()
 
-                if company_name not in config_companies:
-                    logger.info(
-                        f"La empresa {company_name} no está configurada en el archivo YAML."
+            prefetcher = CompanyPrefetcher(
+                self.data_access_layer,
+                plan.companies,
+                incremental=self._incremental_for,
+            )
+            for datos in prefetcher:
+                company = datos.company
+                company_name = company.name
+                alias_database = company.alias
+                if datos.error:
+                    logger.warning(
+                        f"No se procesará la empresa {company_name}: {datos.error}"
                     )
                     continue
-
-                if not self._validate_company_parameters(alias_database):
+                if not datos.asientos:
+                    logger.info(
+                        f"No hay asientos configurados para la empresa {company_name}."
+                    )
                     continue
 
-                if not self._validate_company_accounts(alias_database, company_name):
+                terminados = self.journal.finished(alias_database) if self.journal else set()
+                asientos = [
+                    asiento
+                    for asiento in datos.asientos
+                    if str(asiento["Codigo"]) not in terminados
+                ]
+                if not asientos:
+                    logger.info(
+                        f"La empresa {company_name} ya se procesó en esta corrida."
+                    )
                     continue
+                if datos.cfdis_pendientes:
+                    asientos = [
+                        asiento
+                        for asiento in asientos
+                        if not self._skip_without_cfdis(company, asiento, datos)
+                    ]
+                    if not asientos:
+                        logger.info(
+                            f"Modo incremental: {company_name} no tiene CFDI por asociar."
+                        )
+                        continue
+                if terminados:
+                    logger.info(
+                        f"Reanudando {company_name}: {len(datos.asientos) - len(asientos)} "
+                        f"asientos ya terminados."
+                    )
 
                 logger.info(f"Procesando empresa: {company_name}")
-                time.sleep(1)
+                wait_budget.sleep(1, "antes_de_abrir_empresa")
 
                 success, result = self.company_selection_page.open_company(company_name)
                 if not success:
@@ -57,33 +130,48 @@ class CompanyProcessor:
                         logger.warning(f"No se pudo abrir la empresa: {result}")
                     continue
 
+                # El periodo se lee una vez al abrir la empresa y se usa en todos sus
+                # asientos: CONTPAQi no lo cambia mientras la empresa está abierta.
+                try:
+                    fechas_periodo = self.data_access_layer.refresh_fiscal_period(
+                        alias_database
+                    )
+                except Exception as e:
+                    logger.warning(
+                        f"No se pudo leer el periodo fiscal de {company_name}: {e}"
+                    )
+                    fechas_periodo = None
+
                 ventana_contabilizador = self.contabilizador_page.open_contabilizador()
                 if not ventana_contabilizador:
                     logger.critical("No se pudo abrir la ventana del contabilizador.")
                     continue
 
                 self.entry_processor.set_contabilizador_window(ventana_contabilizador)
-
-                asientos = self.data_access_layer.get_asientos(alias_database)
-                if not asientos:
-                    logger.info(
-                        f"No hay asientos configurados para la empresa {company_name}."
-                    )
-                    continue
+                self._calibrate_scale()
 
                 for asiento in asientos:
+                    self._record(alias_database, asiento, INICIADO)
                     try:
-                        self.entry_processor.process_entry(
-                            asiento,
-                            config_companies[company_name],
-                            self.data_access_layer,
+                        with deadline(TIEMPO_MAXIMO_ASIENTO):
+                            self.entry_processor.process_entry(
+                                asiento,
+                                company.config,
+                                self.data_access_layer,
+                                alias_database,
+                                alias_database,
+                                fechas_periodo=fechas_periodo,
+                            )
+                        self._record(
                             alias_database,
-                            company["AliasBDD"],
+                            asiento,
+                            self.entry_processor.last_outcome or FALLIDO,
                         )
                         logger.info(
                             f"Asiento contable {asiento['Codigo']} procesado exitosamente."
                         )
                     except Exception as e:
+                        self._record(alias_database, asiento, FALLIDO, str(e))
                         logger.error(
                             f"Error al procesar el asiento contable {asiento['Codigo']}: {str(e)}"
                         )
@@ -94,39 +182,101 @@ class CompanyProcessor:
                 self.company_selection_page.closeCompany()
                 self.company_selection_page.open_catalog()
 
+            if self.journal:
+                self._close_run(plan)
             logger.info("Proceso de todas las empresas completado.")
         except Exception as e:
             logger.error(f"Error general en el procesamiento: {str(e)}")
             raise
-
-    def _validate_company_parameters(self, alias_database):
-        parametros = self.data_access_layer.validar_parametros(alias_database)
-        if not parametros or parametros[0]["estado"] == "Inválido":
-            logger.warning(
-                f"Parámetros inválidos para la empresa con alias {alias_database}."
+        finally:
+            if prefetcher is not None:
+                prefetcher.stop()
+                prefetcher.log_report()
+            self._log_omitidos()
+            wait_budget.log_report()
+            retry_metrics.log_report()
+            logger.info(
+                f"Caché de consultas: {self.data_access_layer.query_cache.get_stats()}"
             )
-            return False
-        return True
 
-    def _validate_company_accounts(self, alias_database, company_name):
-        cuenta_cliente = self.data_access_layer.get_cuenta_for_empresa(
-            alias_database, "cliente"
-        )
-        cuenta_proveedor = self.data_access_layer.get_cuenta_for_empresa(
-            alias_database, "proveedor"
+    def _record(self, alias_database, asiento, estado, detalle=None):
+        if not self.journal:
+            return
+        try:
+            self.journal.record(alias_database, asiento["Codigo"], estado, detalle)
+        except Exception as e:
+            logger.warning(f"No se pudo registrar el avance del asiento {asiento['Codigo']}: {e}")
+
+    def _calibrate_scale(self):
+        """Suma votos de calibración mientras la escala de pantalla no esté fijada."""
+        try:
+            ImageHelper.calibrate_scale(PLANTILLAS_CALIBRACION)
+        except Exception as e:
+            logger.warning(f"No se pudo calibrar la escala de pantalla: {e}")
+
+    def _close_run(self, plan):
+        """
+        Cierra la corrida en la bitácora solo si todos los asientos del plan terminaron.
+
+        Si alguna empresa no se abrió o algún asiento quedó fallido o a medias, la
+        corrida queda abierta para que la siguiente ejecución, dentro de max_run_age,
+        reanude solo lo pendiente.
+        """
+        pendientes = {}
+        for company in plan.companies:
+            terminados = self.journal.finished(company.alias)
+            faltan = [
+                str(asiento["Codigo"])
+                for asiento in company.asientos
+                if str(asiento["Codigo"]) not in terminados
+            ]
+            if faltan:
+                pendientes[company.name] = faltan
+        if not pendientes:
+            self.journal.finish_run()
+            return
+        total = sum(len(codigos) for codigos in pendientes.values())
+        logger.warning(
+            f"La corrida queda abierta: {total} asientos sin terminar en "
+            f"{len(pendientes)} empresas; se reanudarán si el bot se ejecuta en las "
+            f"próximas {self.journal.max_run_age / 3600:.0f} horas."
         )
-        cuentas_invalidas = []
-
-        if cuenta_cliente and cuenta_cliente[0]["estado"] == "Inválido":
-            cuentas_invalidas.append(f"Cliente: {cuenta_cliente[0]['mensaje']}")
-        if cuenta_proveedor and cuenta_proveedor[0]["estado"] == "Inválido":
-            cuentas_invalidas.append(f"Proveedor: {cuenta_proveedor[0]['mensaje']}")
-
-        if cuentas_invalidas:
-            for mensaje in cuentas_invalidas:
-                logger.warning(f"Empresa {company_name}: {mensaje}")
-            logger.warning(
-                f"No se procesará la empresa {company_name} debido a cuentas con formato inválido."
-            )
+        for company_name, codigos in pendientes.items():
+            logger.info(f"    {company_name}: {', '.join(codigos)}")
+
+    def _incremental_for(self, company):
+        """
+        Indica si se aplica el modo incremental a una empresa.
+
+        Hace falta la opción --incremental, "incremental: true" en la configuración de
+        la empresa y al menos una corrida exitosa previa en la bitácora.
+        """
+        if not self.incremental or not company.config.get("incremental", False):
+            return False
+        return bool(self.journal) and self.journal.last_success(company.alias) is not None
+
+    def _skip_without_cfdis(self, company, asiento, datos):
+        codigo = str(asiento["Codigo"])
+        cantidad = datos.cfdis_pendientes.get(codigo)
+        if cantidad is None or cantidad > 0:
+            if cantidad is not None:
+                logger.debug(
+                    f"Modo incremental: el asiento {codigo} de {company.name} tiene "
+                    f"{cantidad} CFDI sin asociar."
+                )
             return False
+        logger.info(
+            f"Modo incremental: se omite el asiento {codigo} de {company.name}, "
+            f"{cantidad} CFDI sin asociar en su ventana de fechas."
+        )
+        self._record(company.alias, asiento, SIN_POLIZAS, "Sin CFDI por asociar")
+        self.omitidos.setdefault(company.name, []).append(codigo)
         return True
+
+    def _log_omitidos(self):
+        if not self.omitidos:
+            return
+        total = sum(len(codigos) for codigos in self.omitidos.values())
+        logger.info(f"Modo incremental: {total} asientos omitidos sin CFDI por asociar.")
+        for company_name, codigos in self.omitidos.items():
+            logger.info(f"    {company_name}: {', '.join(codigos)}")
@@ -3,8 +3,10 @@ import time
 from src.luzzi.page_objects.updates_pages import UpdatePage
 from src.luzzi.helpers.help_bot import WindowHelper, ImageHelper, ResourceHelper, ColorHelper
 from src.config.config import Config
-from src.data.database import SQLServerConnectionPool, DataAccessLayer
 from src.luzzi.page_objects.dialog_handler_page import DialogHandler
+from src.luzzi.helpers.retry import DeadlineExceeded
+from src.luzzi.helpers.waits import poll_until
+from src.data.checkpoint import ERROR_MANEJADO, FALLIDO, POLIZA_GENERADA, SIN_POLIZAS
 logger = logging.getLogger(__name__)
 
 
@@ -13,6 +15,7 @@ class EntryProcessor:
         self.app = app
         self.contabilizador_window = None
         self.update_page = UpdatePage()
+        self.last_outcome = None
 
         if contabilizador_window_page:
             self.contabilizador_window = contabilizador_window_page.open_contabilizador()
@@ -88,6 +91,8 @@ class EntryProcessor:
                         f"El botón 'Generar pólizas' no está visible o habilitado. "
                         f"Visible: {generar_polizas.is_visible()}, Habilitado: {generar_polizas.is_enabled()}"
                     )
+            except DeadlineExceeded:
+                raise
             except Exception as e:
                 logger.debug(f"Error durante el intento {intento + 1}: {e}")
             time.sleep(tiempo_espera)
@@ -98,7 +103,13 @@ class EntryProcessor:
         return False
 
     def process_entry(
-        self, asiento, company_config, data_access_layer, alias_database, company
+        self,
+        asiento,
+        company_config,
+        data_access_layer,
+        alias_database,
+        company,
+        fechas_periodo=None,
     ):
         """
         Procesa un asiento contable completo.
@@ -109,9 +120,12 @@ class EntryProcessor:
             data_access_layer: Capa de acceso a datos.
             alias_database: Alias de la base de datos.
             company: Datos de la empresa.
+            fechas_periodo: (fecha_inicial, fecha_final) del periodo leído al abrir la
+                empresa. Si es None se consultan con get_fechas_for_empresa.
 
         Returns:
-            bool: True si se procesó exitosamente, False en caso contrario.
+            bool: True si se procesó exitosamente, False en caso contrario. El detalle
+            queda en last_outcome (POLIZA_GENERADA, SIN_POLIZAS, ERROR_MANEJADO o FALLIDO).
         """
         from src.luzzi.page_objects.contabilizador_window_page import (
             ContabilizadorWindowPage,
@@ -119,6 +133,7 @@ class EntryProcessor:
         import time
         from PIL import ImageGrab
 
+        self.last_outcome = FALLIDO
         try:
             if not self.contabilizador_window:
                 raise RuntimeError("Ventana del Contabilizador no configurada.")
@@ -143,7 +158,13 @@ class EntryProcessor:
                 asiento_control.set_focus()
                 asiento_control.type_keys(codigo, with_spaces=True)
                 logger.debug(f"Se escribió el asiento contable {codigo}")
-                time.sleep(0.2)
+                if not poll_until(
+                    lambda: codigo in asiento_control.window_text(),
+                    timeout=2,
+                    min_interval=0.02,
+                    site="asiento_escrito",
+                ):
+                    logger.warning(f"El control [Asiento] no muestra el código {codigo}.")
             else:
                 logger.warning("No se encontró el control [Asiento].")
                 return False
@@ -171,28 +192,32 @@ class EntryProcessor:
             fecha_final = filters.get("lastDate", "").strip()
 
             if not (fecha_inicio and fecha_final):
-                connection_pool = SQLServerConnectionPool()
-                data_access_layer_instance = DataAccessLayer(connection_pool)
                 fecha_inicio, fecha_final = (
-                    data_access_layer_instance.get_fechas_for_empresa(alias_database)
+                    fechas_periodo
+                    or data_access_layer.get_fechas_for_empresa(alias_database)
                 )
 
             logger.debug(
                 f"Fechas finales: Inicio: {fecha_inicio}, Final: {fecha_final}"
             )
-            filtros = contabilizadorwindowpage.apply_dynamic_filters(
+            if not contabilizadorwindowpage.apply_dynamic_filters(
                 fecha_inicio, fecha_final, filters, template_config["tipoXML"]
-            )
-            time.sleep(0.5)
+            ):
+                logger.info(
+                    f"No se confirmó la actualización de la lista de CFDI del asiento {codigo}; "
+                    "se continúa con la lista actual."
+                )
 
             image_path = ResourceHelper.resource_path("img/asociar.png")
-            if not ImageHelper.find_and_click_image(image_path):
+            if not ImageHelper.wait_and_click_image(image_path, site="boton_asociar"):
                 logger.error("El botón 'Asociar' no se encontró.")
             else:
                 logger.info("Botón 'Asociar' clickeado.")
 
             image_path = ResourceHelper.resource_path("img/si.png")
-            if not ImageHelper.find_and_click_image(image_path):
+            if not ImageHelper.wait_and_click_image(
+                image_path, timeout=3, site="confirmar_asociar"
+            ):
                 logger.error("El botón 'Sí' no se encontró.")
             else:
                 logger.info("Botón 'Sí' clickeado.")
@@ -202,13 +227,19 @@ class EntryProcessor:
                 image_path = ResourceHelper.resource_path("img/cerrar.png")
                 if not ImageHelper.find_and_click_image(image_path):
                     logger.error("El botón 'Cerrar' no se encontró.")
+                self.last_outcome = SIN_POLIZAS
                 return True
 
             colores_objetivo = [(69, 179, 157)]
             area_a_verificar = (500, 300, 502, 302)
 
-            if ColorHelper.wait_for_colors(colores_objetivo, area_a_verificar, max_attempts=60, interval=0.5):
-                logger.debug("Color verde detectado, procediendo a cerrar...")
+            deteccion = ColorHelper.watch_colors(
+                colores_objetivo, area_a_verificar, timeout=30, max_interval=0.1
+            )
+            if deteccion:
+                logger.debug(
+                    f"Color verde detectado en {deteccion.latency:.2f}s, procediendo a cerrar..."
+                )
                 image_path = ResourceHelper.resource_path("img/cerrar.png")
                 if not ImageHelper.find_and_click_image(image_path):
                     logger.error("El botón 'Cerrar' no se encontró.")
@@ -285,6 +316,11 @@ class EntryProcessor:
                             self.update_page.process_actualizar_productos(
                                 button, self.contabilizador_window, self.app
                             )
+                        # La actualización asigna cuentas en la base de la empresa: las
+                        # consultas de cuentas guardadas en caché dejan de ser válidas.
+                        data_access_layer.invalidate_cache(
+                            alias_database, "cuenta_empresa"
+                        )
                         actualizaciones_completadas[button_title] = True
                         break
 
@@ -297,14 +333,14 @@ class EntryProcessor:
                             "No se encontró botón de actualización, pero hay 'Siguiente'. Avanzando..."
                         )
                         siguiente_button.click_input()
-                        time.sleep(tiempo_espera)
+                        self._wait_for_wizard_step(actualizaciones_completadas, tiempo_espera)
                     elif all(actualizaciones_completadas.values()):
                         logger.info(
                             "Todas las actualizaciones completadas. Forzando avance..."
                         )
                         if siguiente_button.exists() and siguiente_button.is_visible():
                             siguiente_button.click_input()
-                            time.sleep(tiempo_espera)
+                            self._wait_for_wizard_step(actualizaciones_completadas, tiempo_espera)
 
             if not self._llegamos_a_generar_polizas():
                 logger.critical("No se pudo llegar a 'Generar pólizas'.")
@@ -314,30 +350,39 @@ class EntryProcessor:
         
             if resultado == "ERROR_HANDLED":
                 logger.info(f"Error de cargos y abonos manejado para el asiento {codigo}. Continuando con el siguiente.")
+                self.last_outcome = ERROR_MANEJADO
                 return True
             elif resultado is True:
                 logger.info(f"Póliza generada exitosamente para el asiento {codigo}.")
-                time.sleep(0.5)
                 nuevo_button_path = ResourceHelper.resource_path("img/nuevo.png")
-                if not ImageHelper.find_and_click_image(nuevo_button_path, confidence=0.8):
+                if not ImageHelper.wait_and_click_image(
+                    nuevo_button_path, confidence=0.8, site="boton_nuevo"
+                ):
                     logger.warning("No se pudo hacer clic en 'Nuevo' después del éxito.")
+                self.last_outcome = POLIZA_GENERADA
                 return True
             else:
                 logger.warning(f"Fallo en la generación de póliza para el asiento {codigo}.")
                 ImageHelper.find_and_click_image(ResourceHelper.resource_path("img/nuevo.png"), confidence=0.8)
                 return False
 
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.critical(f"Error al procesar el asiento contable {codigo}: {str(e)}")
             return False
         
     def _try_generate_policy(self, generar_polizas):
         """
-        Intenta generar una póliza siguiendo un flujo secuencial:
+        Intenta generar una póliza:
         1. Hace clic en 'Generar pólizas'.
-        2. Detecta si aparece el error de cargos y abonos (durante 8 segundos).
-        3. Si no hay error, espera a que termine el procesamiento.
-        4. Verifica el resultado final ('Póliza creada' en SysListView32).
+        2. Vigila al mismo tiempo la ventana 'Problema' (error de cargos y abonos) y el
+           resultado en SysListView32 ('Póliza creada' o el mensaje de rechazo).
+        3. Decide según lo primero que aparezca.
+
+        Las filas que la lista ya tenía antes del clic son del asiento anterior: solo se
+        acepta un resultado en filas nuevas (o en la lista reescrita), o en toda la lista
+        una vez que el botón se deshabilitó y volvió a habilitarse.
         
         Args:
             generar_polizas: Botón de 'Generar pólizas' en la interfaz.
@@ -346,97 +391,224 @@ class EntryProcessor:
             str o bool: "ERROR_HANDLED" si se manejó un error, True si la póliza se creó, False si falló.
         """
         try:
+            WindowHelper.mark_policy_results(self.contabilizador_window)
             logger.debug("Haciendo clic en 'Generar pólizas'...")
             generar_polizas.click_input()
-            time.sleep(0.5)
+            problema_window = self._problema_window()
+            boton = {"deshabilitado": False}
 
-            logger.debug("Verificando si aparece error de cargos y abonos...")
-            if self._handle_error_window():
-                logger.info("Error de cargos y abonos detectado y manejado.")
-                return "ERROR_HANDLED"
+            def clic_registrado():
+                try:
+                    if not generar_polizas.is_enabled():
+                        boton["deshabilitado"] = True
+                        return True
+                    return problema_window.exists(timeout=0)
+                except Exception:
+                    return True
+
+            def rehabilitado():
+                if not boton["deshabilitado"]:
+                    try:
+                        boton["deshabilitado"] = not generar_polizas.is_enabled()
+                    except Exception:
+                        pass
+                    return False
+                try:
+                    return generar_polizas.is_enabled()
+                except Exception:
+                    return False
+
+            poll_until(
+                clic_registrado,
+                timeout=0.5,
+                min_interval=0.02,
+                site="clic_generar_polizas",
+            )
+
+            logger.debug("Esperando el resultado: 'Problema' o 'Póliza creada'...")
+            resultado = poll_until(
+                lambda: self._policy_outcome(problema_window, rehabilitado),
+                timeout=30,
+                min_interval=0.05,
+                max_interval=0.25,
+                site="resultado_poliza",
+            )
 
-            logger.debug("No se detectó error de cargos y abonos, continuando con el proceso normal...")
+            if not resultado:
+                logger.critical("Timeout (30s) esperando resultado de la póliza.")
+                return False
 
-            logger.debug("Procesamiento terminado, verificando resultado final...")
-            result = WindowHelper.wait_for_policy_created(self.contabilizador_window, timeout=30)
+            logger.debug(f"Resultado '{resultado.value}' detectado en {resultado.latency:.2f}s.")
+            if resultado.value == "PROBLEMA":
+                if self._handle_error_window(timeout=0.5):
+                    logger.info("Error de cargos y abonos detectado y manejado.")
+                    return "ERROR_HANDLED"
+                return False
 
-            if result is True:
+            if resultado.value == "CREADA":
                 logger.info("Póliza creada exitosamente.")
                 return True
-            else:
-                logger.error("La póliza no se creó correctamente o se encontró un error.")
-                return False
 
+            logger.error("La póliza no se creó correctamente o se encontró un error.")
+            return False
+
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.critical(f"Excepción crítica al intentar generar póliza: {str(e)}")
             return False
 
 
-    def _handle_error_window(self):
+    def _policy_outcome(self, problema_window, rehabilitado=None):
+        """
+        Revisa una vez cuál de los resultados posibles de 'Generar pólizas' está a la vista.
+
+        Args:
+            problema_window: Especificación de la ventana 'Problema'.
+            rehabilitado: Función que indica si 'Generar pólizas' ya terminó (el botón
+                se deshabilitó y volvió a habilitarse); entonces se revisa toda la lista.
+
+        Returns:
+            str: "PROBLEMA", "CREADA", "RECHAZADA" o None si todavía no hay resultado.
+        """
+        try:
+            if problema_window.exists(timeout=0) and problema_window.is_visible():
+                return "PROBLEMA"
+        except Exception as e:
+            logger.debug(f"Excepción durante búsqueda de error: {e}")
+
+        estado = WindowHelper.check_policy_created(self.contabilizador_window)
+        if estado is None and rehabilitado is not None and rehabilitado():
+            estado = WindowHelper.check_policy_created(
+                self.contabilizador_window, since_mark=False
+            )
+        if estado is True:
+            return "CREADA"
+        if estado is False:
+            return "RECHAZADA"
+        return None
+
+    def _handle_error_window(self, timeout=3):
         """
         Maneja la ventana 'Problema' si aparece, específicamente el error de cargos y abonos.
+
+        Args:
+            timeout: Tiempo máximo para esperar la ventana, en segundos.
         
         Returns:
             bool: True si se detectó y manejó el error, False si no apareció.
         """
-        max_wait_for_error = 3  # Tiempo máximo para esperar el error
-        start_time = time.time()
+        max_wait_for_error = timeout
+        problema_window = self._problema_window()
 
         logger.debug("Iniciando monitoreo de error de cargos y abonos...")
 
-        while time.time() - start_time < max_wait_for_error:
+        def problema_visible():
             try:
-                problema_window = self.app.window(title="Problema", class_name="SWT_Window1")
-                if problema_window.exists() and problema_window.is_visible():
-                    logger.warning("Ventana 'Problema' detectada.")
-                    
-                    static_control = problema_window.child_window(
-                        title="Los importes de cargos y abonos no son iguales", 
-                        class_name="Static"
+                return problema_window.exists(timeout=0) and problema_window.is_visible()
+            except Exception as e:
+                logger.debug(f"Excepción durante búsqueda de error: {e}")
+                return False
+
+        if not poll_until(
+            problema_visible,
+            max_wait_for_error,
+            min_interval=0.05,
+            max_interval=0.25,
+            site="ventana_problema",
+        ):
+            logger.debug("No se detectó error de cargos y abonos en el tiempo establecido.")
+            return False
+
+        try:
+            logger.warning("Ventana 'Problema' detectada.")
+
+            static_control = problema_window.child_window(
+                title="Los importes de cargos y abonos no son iguales", 
+                class_name="Static"
+            )
+            
+            if static_control.exists():
+                logger.warning("Confirmado: Error de cargos y abonos detectado.")
+                accept_button = problema_window.child_window(
+                    title="&Aceptar", class_name="Button"
+                )
+                
+                if accept_button.exists() and accept_button.is_visible():
+                    logger.info("Haciendo clic en 'Aceptar' para cerrar la ventana de error.")
+                    accept_button.click_input()
+                    WindowHelper.wait_for_window_disappearance(
+                        problema_window, timeout=2, site="cierre_problema"
                     )
                     
-                    if static_control.exists():
-                        logger.warning("Confirmado: Error de cargos y abonos detectado.")
-                        accept_button = problema_window.child_window(
-                            title="&Aceptar", class_name="Button"
-                        )
-                        
-                        if accept_button.exists() and accept_button.is_visible():
-                            logger.info("Haciendo clic en 'Aceptar' para cerrar la ventana de error.")
-                            accept_button.click_input()
-                            time.sleep(1)
-                            
-                            logger.info("Haciendo clic en 'Nuevo' para continuar con el siguiente asiento.")
-                            nuevo_button_path = ResourceHelper.resource_path("img/nuevo.png")
-                            if ImageHelper.find_and_click_image(nuevo_button_path, confidence=0.8):
-                                logger.info("Botón 'Nuevo' clickeado exitosamente.")
-                            else:
-                                logger.warning("No se pudo hacer clic en 'Nuevo', pero continuando...")
-                            
-                            return True
-                        else:
-                            logger.error("No se pudo encontrar el botón 'Aceptar'.")
-                            return True
+                    logger.info("Haciendo clic en 'Nuevo' para continuar con el siguiente asiento.")
+                    nuevo_button_path = ResourceHelper.resource_path("img/nuevo.png")
+                    if ImageHelper.wait_and_click_image(
+                        nuevo_button_path, confidence=0.8, site="boton_nuevo"
+                    ):
+                        logger.info("Botón 'Nuevo' clickeado exitosamente.")
                     else:
-                        logger.warning("Ventana 'Problema' sin mensaje de cargos y abonos.")
-                        try:
-                            accept_button = problema_window.child_window(
-                                title="&Aceptar", class_name="Button"
-                            )
-                            if accept_button.exists():
-                                accept_button.click_input()
-                                time.sleep(1)
-                        except Exception as e:
-                            logger.debug(f"Error al cerrar ventana de problema: {e}")
-                        return True
+                        logger.warning("No se pudo hacer clic en 'Nuevo', pero continuando...")
+                    
+                    return True
+                else:
+                    logger.error("No se pudo encontrar el botón 'Aceptar'.")
+                    return True
+            else:
+                logger.warning("Ventana 'Problema' sin mensaje de cargos y abonos.")
+                try:
+                    accept_button = problema_window.child_window(
+                        title="&Aceptar", class_name="Button"
+                    )
+                    if accept_button.exists():
+                        accept_button.click_input()
+                        WindowHelper.wait_for_window_disappearance(
+                            problema_window, timeout=2, site="cierre_problema"
+                        )
+                except Exception as e:
+                    logger.debug(f"Error al cerrar ventana de problema: {e}")
+                return True
+        except Exception as e:
+            logger.debug(f"Excepción durante el manejo de la ventana 'Problema': {e}")
+            return False
+
+    def _problema_window(self):
+        return self.app.window(title="Problema", class_name="SWT_Window1")
+
+    def _wait_for_wizard_step(self, actualizaciones_completadas, timeout):
+        """
+        Espera a que el asistente muestre 'Generar pólizas' o un botón de actualización pendiente.
+
+        Args:
+            actualizaciones_completadas: Estado de cada botón de actualización.
+            timeout: Tiempo máximo de espera en segundos.
+
+        Returns:
+            bool: True si el asistente avanzó a un paso conocido, False si se agotó el tiempo.
+        """
+        pendientes = [
+            self.contabilizador_window.child_window(title=titulo, class_name="Button")
+            for titulo, completada in actualizaciones_completadas.items()
+            if not completada
+        ]
+        generar_polizas = self.contabilizador_window.child_window(
+            title="&Generar pólizas", class_name="Button"
+        )
+
+        def paso_visible():
+            try:
+                return any(
+                    boton.exists(timeout=0) and boton.is_visible()
+                    for boton in [generar_polizas] + pendientes
+                )
             except Exception as e:
-                logger.debug(f"Excepción durante búsqueda de error: {e}")
-            
-            time.sleep(0.5)  # Pausa antes del siguiente intento
+                logger.debug(f"Error al verificar el paso del asistente: {e}")
+                return False
+
+        return poll_until(
+            paso_visible, timeout, min_interval=0.02, site="avance_asistente"
+        ).success
 
-        logger.debug("No se detectó error de cargos y abonos en el tiempo establecido.")
-        return False
-            
     def _llegamos_a_generar_polizas(self):
         """ 
         Verifica si se llegó a la pantalla de 'Generar pólizas'.
@@ -0,0 +1,214 @@
+import time
+import logging
+import threading
+from dataclasses import dataclass, field
+from queue import Full, Queue
+from typing import Any, Dict, List, Optional
+
+from src.luzzi.processors.preflight import CompanyPlan, invalid_accounts
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PrefetchedCompany:
+    """Datos de una empresa cargados por adelantado para el ciclo de la interfaz."""
+
+    company: CompanyPlan
+    asientos: List[Dict[str, Any]]
+    fechas: Optional[tuple]
+    fetch_time: float
+    error: Optional[str] = None
+    cfdis_pendientes: Dict[str, int] = field(default_factory=dict)
+
+
+class CompanyPrefetcher:
+    """
+    Productor y consumidor: un hilo prepara la siguiente empresa mientras la interfaz
+    procesa la actual. Los asientos son los del WorkPlan (ya cargados en la validación
+    previa); las cuentas se revisan contra la caché de consultas y el periodo fiscal
+    solo se vuelve a consultar si su última verificación es más antigua que
+    period_revalidate_after.
+
+    En modo incremental, para las empresas en que incremental(company) es verdadero
+    también se cuentan los CFDI sin asociar de cada asiento (cfdis_pendientes), de modo
+    que la interfaz no espera esas consultas.
+
+    La cola tiene profundidad acotada (depth) para no adelantarse demasiado: los datos
+    se cargan poco antes de usarse. Se mide cuánto tarda cada carga y cuánto esperó la
+    interfaz por ella.
+    """
+
+    _FIN = object()
+
+    def __init__(
+        self, data_access_layer, companies, depth=1, incremental=None, clock=time.monotonic
+    ):
+        self.data_access_layer = data_access_layer
+        self.companies = list(companies)
+        self.incremental = incremental
+        self.clock = clock
+        self._queue = Queue(maxsize=max(1, depth))
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {"fetched": 0, "fetch_time": 0.0, "stalls": 0, "stall_time": 0.0}
+
+    def _fetch(self, company: CompanyPlan) -> PrefetchedCompany:
+        dal = self.data_access_layer
+        start = self.clock()
+        try:
+            cuentas_invalidas = invalid_accounts(
+                dal.get_cuenta_for_empresa(company.alias, "cliente"),
+                dal.get_cuenta_for_empresa(company.alias, "proveedor"),
+            )
+            if cuentas_invalidas:
+                return PrefetchedCompany(
+                    company, [], None, self.clock() - start, "; ".join(cuentas_invalidas)
+                )
+            fechas = dal.get_fechas_for_empresa(company.alias)
+            pendientes = self._count_pending(company, fechas)
+            return PrefetchedCompany(
+                company, company.asientos, fechas, self.clock() - start,
+                cfdis_pendientes=pendientes,
+            )
+        except Exception as e:
+            logger.warning(
+                f"No se pudieron cargar por adelantado los datos de {company.name}, "
+                f"se usarán los de la validación previa: {e}"
+            )
+            return PrefetchedCompany(company, company.asientos, None, self.clock() - start)
+
+    def _count_pending(self, company: CompanyPlan, fechas) -> Dict[str, int]:
+        """
+        Cuenta los CFDI sin asociar de cada asiento con template, en su ventana de fechas.
+
+        Returns:
+            dict: {código: CFDI sin asociar}; los asientos que no se pudieron revisar no
+            aparecen y se procesan completos.
+        """
+        dal = self.data_access_layer
+        if not self.incremental or not self.incremental(company):
+            return {}
+        if not dal.verify_add_schema(company.alias):
+            return {}
+
+        templates = company.config.get("templates", {})
+        pendientes = {}
+        for asiento in company.asientos:
+            codigo = str(asiento["Codigo"])
+            template = templates.get(codigo)
+            if not template:
+                continue
+            filters = template.get("filters") or {}
+            fecha_inicio = (filters.get("firstDate") or "").strip()
+            fecha_final = (filters.get("lastDate") or "").strip()
+            if not (fecha_inicio and fecha_final):
+                if not fechas:
+                    continue
+                fecha_inicio, fecha_final = fechas
+            cantidad = dal.count_cfdis_sin_asociar(
+                company.alias, asiento.get("TipoXML"), fecha_inicio, fecha_final
+            )
+            if cantidad is not None:
+                pendientes[codigo] = cantidad
+        return pendientes
+
+    def _put(self, item) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.2)
+                return True
+            except Full:
+                continue
+        return False
+
+    def _produce(self):
+        try:
+            for company in self.companies:
+                if self._stop.is_set():
+                    break
+                item = self._fetch(company)
+                self.stats["fetched"] += 1
+                self.stats["fetch_time"] += item.fetch_time
+                logger.debug(
+                    f"Datos de {company.name} cargados en {item.fetch_time * 1000:.0f} ms"
+                )
+                if not self._put(item):
+                    break
+        finally:
+            self._put(self._FIN)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._produce, name="CompanyPrefetcher", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        """Detiene el hilo productor (por ejemplo, si el ciclo de la interfaz se interrumpe)."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def __iter__(self):
+        self.start()
+        while True:
+            start = self.clock()
+            item = self._queue.get()
+            waited = self.clock() - start
+            if item is self._FIN:
+                return
+            if waited >= 0.001:
+                self.stats["stalls"] += 1
+                self.stats["stall_time"] += waited
+            yield item
+
+    def log_report(self):
+        stats = dict(self.stats)
+        logger.info(
+            f"Precarga de empresas: {stats['fetched']} cargas en {stats['fetch_time']:.2f}s, "
+            f"la interfaz esperó {stats['stall_time']:.2f}s en {stats['stalls']} ocasiones"
+        )
+        return stats
+
+
+if __name__ == "__main__":
+
+    class FakeDataAccessLayer:
+        def __init__(self, latencia):
+            self.latencia = latencia
+
+        def get_cuenta_for_empresa(self, alias, tipo):
+            return [{"codigo": "1", "estado": "Válido", "mensaje": ""}]
+
+        def get_fechas_for_empresa(self, alias):
+            time.sleep(self.latencia)
+            return ("01/01/2025", "31/01/2025")
+
+    companies = [
+        CompanyPlan(f"Empresa {i}", f"ct{i}", {}, [{"Codigo": f"ct{i}"}]) for i in range(5)
+    ]
+    latencia, interfaz = 0.1, 0.3
+
+    start = time.monotonic()
+    for company in companies:
+        FakeDataAccessLayer(latencia).get_fechas_for_empresa(company.alias)
+        time.sleep(interfaz)
+    secuencial = time.monotonic() - start
+
+    prefetcher = CompanyPrefetcher(FakeDataAccessLayer(latencia), companies)
+    start = time.monotonic()
+    procesadas = []
+    for item in prefetcher:
+        procesadas.append(item.asientos[0]["Codigo"])
+        time.sleep(interfaz)
+    canalizado = time.monotonic() - start
+    prefetcher.stop()
+
+    assert procesadas == [company.alias for company in companies]
+    assert prefetcher.stats["stall_time"] < 2 * latencia, prefetcher.stats
+    print(
+        f"5 empresas, {latencia}s de base de datos y {interfaz}s de interfaz: "
+        f"{secuencial:.2f}s en secuencia, {canalizado:.2f}s con precarga"
+    )
@@ -0,0 +1,220 @@
+import time
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CompanyPlan:
+    """Empresa lista para procesarse en la interfaz, con sus asientos."""
+
+    name: str
+    alias: str
+    config: Any
+    asientos: List[Dict[str, Any]]
+
+
+@dataclass
+class WorkPlan:
+    """Resultado de la validación previa: empresas a procesar y empresas descartadas."""
+
+    companies: List[CompanyPlan] = field(default_factory=list)
+    rejected: Dict[str, str] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+
+def invalid_parameters(parametros) -> Optional[str]:
+    """
+    Revisa los parámetros de funcionamiento de una empresa.
+
+    Returns:
+        str: Motivo de rechazo, o None si son válidos.
+    """
+    if not parametros or parametros[0]["estado"] == "Inválido":
+        return "Parámetros inválidos"
+    return None
+
+
+def invalid_accounts(cuenta_cliente, cuenta_proveedor) -> List[str]:
+    """
+    Revisa las cuentas de clientes y proveedores de una empresa.
+
+    Returns:
+        list: Mensajes de las cuentas inválidas (vacía si ambas son válidas).
+    """
+    cuentas_invalidas = []
+    if cuenta_cliente and cuenta_cliente[0]["estado"] == "Inválido":
+        cuentas_invalidas.append(f"Cliente: {cuenta_cliente[0]['mensaje']}")
+    if cuenta_proveedor and cuenta_proveedor[0]["estado"] == "Inválido":
+        cuentas_invalidas.append(f"Proveedor: {cuenta_proveedor[0]['mensaje']}")
+    return cuentas_invalidas
+
+
+class CompanyPreflight:
+    """
+    Validación previa de las empresas configuradas, sin tocar la interfaz.
+
+    Primero se intenta la consulta conjunta de DataAccessLayer; si falla, cada empresa
+    se valida en un pool de hilos acotado (por defecto, al tamaño del pool de
+    conexiones) para que ningún hilo espere una conexión libre.
+    """
+
+    def __init__(self, data_access_layer, config_companies, max_workers=None):
+        self.data_access_layer = data_access_layer
+        self.config_companies = config_companies
+        pool_size = getattr(data_access_layer.connection_pool, "size", 4)
+        self.max_workers = max(1, max_workers or pool_size)
+
+    def _validate_parallel(self, aliases):
+        """Valida cada empresa por separado, en paralelo."""
+        with ThreadPoolExecutor(
+            max_workers=min(self.max_workers, len(aliases)),
+            thread_name_prefix="preflight",
+        ) as executor:
+            resultados = executor.map(self.data_access_layer.preflight_empresa, aliases)
+            return dict(zip(aliases, resultados))
+
+    def build_plan(self) -> WorkPlan:
+        """
+        Obtiene las empresas del usuario, valida las configuradas y arma el plan.
+
+        Returns:
+            WorkPlan: Empresas válidas en el orden de la base de datos, con sus asientos.
+        """
+        start = time.monotonic()
+        plan = WorkPlan()
+        companies = self.data_access_layer.get_empresas("LUZZI")
+        if not companies:
+            logger.critical("No se pudieron obtener las empresas.")
+            return plan
+        logger.info(f"Total de empresas encontradas: {len(companies)}")
+
+        configuradas = []
+        for company in companies:
+            if company["Nombre"] in self.config_companies:
+                configuradas.append(company)
+            else:
+                logger.info(
+                    f"La empresa {company['Nombre']} no está configurada en el archivo YAML."
+                )
+
+        validaciones = self.data_access_layer.get_preflight_for_empresas(
+            [company["AliasBDD"] for company in configuradas],
+            fallback=self._validate_parallel,
+        )
+
+        for company in configuradas:
+            company_name = company["Nombre"]
+            alias_database = company["AliasBDD"]
+            motivo = self._rejection(
+                company_name, alias_database, validaciones.get(alias_database, {})
+            )
+            if motivo:
+                plan.rejected[company_name] = motivo
+                continue
+            asientos = validaciones[alias_database]["asientos"]
+            if not asientos:
+                logger.info(f"No hay asientos configurados para la empresa {company_name}.")
+                plan.rejected[company_name] = "Sin asientos"
+                continue
+            plan.companies.append(
+                CompanyPlan(
+                    company_name,
+                    alias_database,
+                    self.config_companies[company_name],
+                    asientos,
+                )
+            )
+
+        plan.elapsed = time.monotonic() - start
+        logger.info(
+            f"Validación previa: {len(plan.companies)} empresas por procesar, "
+            f"{len(plan.rejected)} descartadas, en {plan.elapsed:.2f}s"
+        )
+        return plan
+
+    def _rejection(self, company_name, alias_database, validacion) -> Optional[str]:
+        if "error" in validacion:
+            logger.warning(
+                f"No se pudo validar la empresa {company_name}: {validacion['error']}"
+            )
+            return validacion["error"]
+
+        if invalid_parameters(validacion.get("parametros")):
+            logger.warning(
+                f"Parámetros inválidos para la empresa con alias {alias_database}."
+            )
+            return "Parámetros inválidos"
+
+        cuentas_invalidas = invalid_accounts(
+            validacion.get("cuenta_cliente"), validacion.get("cuenta_proveedor")
+        )
+        if cuentas_invalidas:
+            for mensaje in cuentas_invalidas:
+                logger.warning(f"Empresa {company_name}: {mensaje}")
+            logger.warning(
+                f"No se procesará la empresa {company_name} debido a cuentas con formato inválido."
+            )
+            return "; ".join(cuentas_invalidas)
+        return None
+
+    def start(self) -> Future:
+        """
+        Arma el plan en segundo plano, mientras se abre y se inicia sesión en CONTPAQi.
+
+        Returns:
+            Future: Futuro cuyo resultado es el WorkPlan.
+        """
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="preflight-plan")
+        future = executor.submit(self.build_plan)
+        executor.shutdown(wait=False)
+        return future
+
+
+if __name__ == "__main__":
+    import threading
+
+    class FakeDataAccessLayer:
+        class connection_pool:
+            size = 4
+
+        def __init__(self, latencia):
+            self.latencia = latencia
+            self.activos = 0
+            self.maximo = 0
+            self._lock = threading.Lock()
+
+        def get_empresas(self, usuario):
+            return [{"Nombre": f"Empresa {i}", "AliasBDD": f"ct{i}"} for i in range(12)]
+
+        def get_preflight_for_empresas(self, aliases, fallback):
+            return fallback(aliases)
+
+        def preflight_empresa(self, alias):
+            with self._lock:
+                self.activos += 1
+                self.maximo = max(self.maximo, self.activos)
+            time.sleep(self.latencia)
+            with self._lock:
+                self.activos -= 1
+            cuenta = [{"codigo": "1", "estado": "Válido", "mensaje": ""}]
+            return {
+                "parametros": [{"Id": 1, "estado": "Inválido" if alias == "ct3" else "Válido"}],
+                "cuenta_cliente": cuenta,
+                "cuenta_proveedor": cuenta,
+                "asientos": [{"Codigo": "1"}],
+            }
+
+    logging.basicConfig(level=logging.WARNING)
+    dal = FakeDataAccessLayer(latencia=0.1)
+    config = {f"Empresa {i}": {} for i in range(10)}
+    plan = CompanyPreflight(dal, config).start().result()
+    assert len(plan.companies) == 9 and "Empresa 3" in plan.rejected
+    assert dal.maximo == 4, dal.maximo
+    print(
+        f"10 empresas con 0.1s por validación: {plan.elapsed:.2f}s en paralelo "
+        f"(~1.00s una tras otra), {dal.maximo} hilos"
+    )